@@ -0,0 +1,56 @@
+"""
+Micro-benchmarks: LLM1 diagnostics stages
+
+"cold" cases cycle through more distinct inputs than the memo caches hold,
+so every call misses; "warm" cases repeat one input.
+"""
+import string
+
+
+def _unique_word(index):
+    letters = []
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters.append(string.ascii_lowercase[remainder])
+    return ''.join(letters)
+
+
+def test_extract_source_location_cold(benchmark, diagnostics, corpus, cycle):
+    engine = diagnostics.DiagnosticsEngine()
+    next_trace = cycle([error['error']['stack'] for error in corpus])
+    benchmark(lambda: engine.extract_source_location(next_trace()))
+
+
+def test_extract_source_location_warm(benchmark, diagnostics, corpus):
+    engine = diagnostics.DiagnosticsEngine()
+    trace = corpus[0]['error']['stack']
+    benchmark(engine.extract_source_location, trace)
+
+
+def test_categorize_error_cold(benchmark, diagnostics, corpus, cycle):
+    engine = diagnostics.DiagnosticsEngine()
+    # Digits are masked before memoization, so make messages differ in letters
+    next_error = cycle([
+        (error['error']['type'], f"{error['error']['message']} in {_unique_word(index)}")
+        for index, error in enumerate(corpus)
+    ])
+    benchmark(lambda: engine.categorize_error(*next_error()))
+
+
+def test_categorize_error_warm(benchmark, diagnostics, corpus):
+    engine = diagnostics.DiagnosticsEngine()
+    error = corpus[0]['error']
+    benchmark(engine.categorize_error, error['type'], error['message'])
+
+
+def test_analyze_error_context(benchmark, diagnostics, corpus, cycle):
+    engine = diagnostics.DiagnosticsEngine()
+    next_error = cycle(corpus)
+    benchmark(lambda: engine.analyze_error_context(next_error()))
+
+
+def test_analyze_error_contexts_batch_of_100(benchmark, diagnostics, corpus):
+    engine = diagnostics.DiagnosticsEngine()
+    batch = corpus[:100]
+    benchmark(lambda: list(engine.analyze_error_contexts(batch)))
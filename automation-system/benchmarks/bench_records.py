@@ -0,0 +1,44 @@
+"""
+Micro-benchmarks: compact diagnostic records and wire encodings
+
+Compares encoding one /diagnose response body as nested JSON against a
+compact record in MessagePack, and the cost of converting to and from
+records.
+"""
+import json
+
+import msgpack
+import pytest
+
+from shared.records import DiagnosticRecord
+from shared.wire import diagnostic_fields
+
+
+@pytest.fixture(scope='module')
+def diagnostic(diagnostics, corpus):
+    engine = diagnostics.DiagnosticsEngine()
+    # Round-trip through JSON so it looks like a diagnostic received over HTTP
+    return json.loads(json.dumps(engine.analyze_error_context(corpus[0])))
+
+
+def test_encode_diagnostic_json(benchmark, diagnostic):
+    benchmark(lambda: json.dumps({'success': True, **diagnostic_fields(diagnostic, False)}))
+
+
+def test_encode_diagnostic_msgpack(benchmark, diagnostic):
+    benchmark(lambda: msgpack.packb({'success': True, **diagnostic_fields(diagnostic, True)}))
+
+
+def test_record_from_dict(benchmark, diagnostic):
+    benchmark(DiagnosticRecord.from_dict, diagnostic)
+
+
+def test_record_wire_round_trip(benchmark, diagnostic):
+    record = DiagnosticRecord.from_dict(diagnostic)
+
+    def round_trip():
+        stack_map = {}
+        return DiagnosticRecord.from_wire(record.to_wire(stack_map), stack_map).to_dict()
+
+    assert round_trip() == diagnostic
+    benchmark(round_trip)
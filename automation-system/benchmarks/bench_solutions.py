@@ -0,0 +1,64 @@
+"""
+Micro-benchmarks: LLM2 fix generation
+"""
+import pytest
+
+USERS_FILE = 'src/api/users.js'
+PAYMENTS_FILE = 'src/api/payments.js'
+SERVICE_FILE = 'src/services/userService.js'
+NULL_MESSAGE = "Cannot read property 'id' of undefined"
+
+
+@pytest.fixture(scope='module')
+def generator(solutions):
+    return solutions.CodeFixGenerator()
+
+
+def snippet(generator, file_path):
+    return generator.MOCK_CODE_SNIPPETS[file_path]
+
+
+def test_fix_null_reference(benchmark, generator):
+    benchmark(generator.fix_null_reference, snippet(generator, USERS_FILE), NULL_MESSAGE)
+
+
+def test_fix_unhandled_promise(benchmark, generator):
+    benchmark(generator.fix_unhandled_promise, snippet(generator, PAYMENTS_FILE))
+
+
+def test_fix_math_error(benchmark, generator):
+    benchmark(generator.fix_math_error, snippet(generator, USERS_FILE))
+
+
+def test_fix_resource_leak(benchmark, generator):
+    benchmark(generator.fix_resource_leak, snippet(generator, SERVICE_FILE))
+
+
+def test_fix_engine_null_reference_warm(benchmark, solutions, generator):
+    code = snippet(generator, USERS_FILE)
+    benchmark(solutions.fix_engine.fix, 'NULL_REFERENCE', code, USERS_FILE, 14, NULL_MESSAGE)
+
+
+def test_fix_engine_null_reference_cold(benchmark, solutions, generator, cycle):
+    # More distinct versions than the parse cache holds, so every call parses
+    base = snippet(generator, USERS_FILE)
+    next_code = cycle([f"{base}\n// revision {index}" for index in range(512)])
+    benchmark(lambda: solutions.fix_engine.fix('NULL_REFERENCE', next_code(), USERS_FILE, 14,
+                                               NULL_MESSAGE))
+
+
+def test_generate_code_fix(benchmark, generator):
+    diagnostic = {
+        'error': {'category': 'NULL_REFERENCE', 'message': NULL_MESSAGE},
+        'source': {'file': USERS_FILE, 'line': '14'}
+    }
+    benchmark(generator.generate_code_fix, diagnostic)
+
+
+def test_solve_cache_hit(benchmark, solutions, generator):
+    diagnostic = {
+        'error': {'category': 'MATH_ERROR', 'message': 'Division by zero'},
+        'source': {'file': USERS_FILE, 'line': '14'}
+    }
+    solutions.solve(generator, diagnostic)
+    benchmark(solutions.solve, generator, diagnostic)
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: stack-trace parsing
+Compares the original string-splitting extract_source_location against the
+precompiled stacktrace parser, cold (unique traces) and warm (repeated traces)
+
+Run with: python benchmarks/bench_stacktrace.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'llm1-diagnostics'))
+
+from stacktrace import parse_stack_trace, top_application_frame  # noqa: E402
+
+
+def legacy_extract_source_location(stack_trace):
+    """The original DiagnosticsEngine.extract_source_location, kept for comparison"""
+    if not stack_trace:
+        return None, None
+
+    lines = stack_trace.split('\n')
+    for line in lines:
+        if '/app/src/' in line or 'src/' in line:
+            parts = line.strip().split()
+            for part in parts:
+                if '.js:' in part or '.ts:' in part:
+                    file_and_line = part.strip('()')
+                    if ':' in file_and_line:
+                        file_path = file_and_line.split(':')[0]
+                        line_num = file_and_line.split(':')[1] if len(file_and_line.split(':')) > 1 else None
+                        if '/app/' in file_path:
+                            file_path = file_path.split('/app/')[-1]
+                        return file_path, line_num
+    return None, None
+
+
+def make_js_trace(depth, seed=0):
+    """A long Node trace: library frames first, the application frame at the bottom"""
+    lines = [f"TypeError: Cannot read property 'id' of undefined (#{seed})"]
+    for i in range(depth):
+        lines.append(f"    at Layer.handle [as handle_request] "
+                     f"(/app/node_modules/express/lib/router/layer.js:{95 + i}:5)")
+    lines.append(f"    at UserRouter.get (/app/src/api/users.js:{11 + seed % 50}:51)")
+    return '\n'.join(lines)
+
+
+def new_extract_source_location(stack_trace):
+    frame = top_application_frame(stack_trace)
+    return (frame.file, str(frame.line)) if frame else (None, None)
+
+
+def bench(label, func, traces, number):
+    seconds = timeit.timeit(lambda: [func(t) for t in traces], number=number)
+    per_trace_us = seconds / (number * len(traces)) * 1e6
+    print(f"{label:<40} {per_trace_us:10.2f} us/trace")
+    return per_trace_us
+
+
+def main():
+    for depth in (10, 100, 1000):
+        unique = [make_js_trace(depth, seed) for seed in range(200)]
+        for trace in unique:
+            assert legacy_extract_source_location(trace) == new_extract_source_location(trace)
+
+        print(f"\n-- depth={depth} frames --")
+        number = max(1, 2000 // depth)
+        bench('legacy split parser', legacy_extract_source_location, unique, number)
+
+        def cold(trace):
+            parse_stack_trace.cache_clear()
+            return new_extract_source_location(trace)
+
+        bench('precompiled parser (cold)', cold, unique, number)
+        parse_stack_trace.cache_clear()
+        for trace in unique:
+            new_extract_source_location(trace)
+        bench('precompiled parser (memoized)', new_extract_source_location, unique, number)
+
+
+if __name__ == '__main__':
+    main()
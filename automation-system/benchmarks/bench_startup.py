@@ -0,0 +1,70 @@
+"""
+Startup budget: importing a service and building its app must stay fast
+
+Each check runs in a fresh interpreter, since the session fixtures have
+already imported both services. Heavy dependencies must not be imported
+until first use or the background warmup.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from services import ROOT
+
+# Seconds for "import app; app.create_app()" with warmup off; about twice the
+# measured time on one core
+IMPORT_BUDGET = float(os.getenv('STARTUP_IMPORT_BUDGET', '0.5'))
+READY_TIMEOUT = 30.0
+RUNS = 3
+
+LAZY_MODULES = ('esprima', 'numpy', 'requests', 'msgpack')
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+READY_SCRIPT = f"""
+import json, time
+started = time.perf_counter()
+import app
+client = app.app.test_client()
+health = client.get('/health').status_code
+while client.get('/ready').status_code != 200:
+    if time.perf_counter() - started > {READY_TIMEOUT}:
+        break
+    time.sleep(0.01)
+print(json.dumps({{'health': health, 'ready': client.get('/ready').get_json()}}))
+"""
+
+SERVICES = ['llm1-diagnostics', 'llm2-solution']
+
+
+def run_service(directory, script, warmup_mode):
+    env = dict(os.environ, WARMUP_MODE=warmup_mode)
+    result = subprocess.run([sys.executable, '-c', script], cwd=os.path.join(ROOT, directory),
+                            env=env, capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('directory', SERVICES)
+def test_import_within_budget(directory):
+    runs = [run_service(directory, IMPORT_SCRIPT, 'off') for _ in range(RUNS)]
+    seconds = statistics.median(run['seconds'] for run in runs)
+    assert seconds < IMPORT_BUDGET, f"startup took {seconds:.3f}s (budget {IMPORT_BUDGET}s)"
+    assert runs[0]['loaded'] == [], f"imported at startup: {runs[0]['loaded']}"
+
+
+@pytest.mark.parametrize('directory', SERVICES)
+def test_ready_after_background_warmup(directory):
+    result = run_service(directory, READY_SCRIPT, 'background')
+    assert result['health'] == 200
+    assert result['ready']['ready'] is True
@@ -0,0 +1,142 @@
+"""
+Compare benchmark results against benchmarks/baseline.json
+
+Micro-benchmarks are compared by median (pytest-benchmark JSON), the load
+run by throughput and end-to-end p50/p99 (loadgen.py JSON). A result
+regresses when it is more than --tolerance worse than the baseline and the
+difference is larger than --min-delta-us, which keeps sub-microsecond
+benchmarks from failing on timer noise. Exits 1 on any regression.
+
+Run from automation-system:
+    python -m pytest benchmarks --benchmark-json=micro.json
+    python benchmarks/loadgen.py --events 10000 --output load.json
+    python benchmarks/compare.py --micro micro.json --load load.json
+    python benchmarks/compare.py --micro micro.json --load load.json --update
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Load metrics where a larger value is better
+HIGHER_IS_BETTER = {'throughput'}
+
+
+def load_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def micro_medians(report):
+    """pytest-benchmark JSON -> {test name: median in microseconds}"""
+    return {
+        bench['name']: round(bench['stats']['median'] * 1e6, 3)
+        for bench in report['benchmarks']
+    }
+
+
+def load_metrics(report):
+    """loadgen JSON -> the handful of numbers tracked in the baseline"""
+    return {
+        'throughput': report['throughput'],
+        'endToEndP50Ms': report['endToEnd']['p50Ms'],
+        'endToEndP99Ms': report['endToEnd']['p99Ms'],
+        'diagnoseP50Ms': report['diagnose']['p50Ms'],
+        'solutionP50Ms': report['solution']['p50Ms'],
+        'errors': report['endToEnd']['errors']
+    }
+
+
+def compare(baseline, current, tolerance, min_delta):
+    """Yield (name, baseline, current, change, regressed) for every tracked metric"""
+    for name, before in sorted(baseline.items()):
+        after = current.get(name)
+        if after is None:
+            yield name, before, after, None, False
+            continue
+        change = (after - before) / before if before else 0.0
+        if name == 'errors':
+            regressed = after > before
+        elif name in HIGHER_IS_BETTER:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance and after - before > min_delta
+        yield name, before, after, change, regressed
+
+
+def print_rows(section, rows):
+    print(f"\n{section}")
+    print(f"  {'name':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        shown = '-' if after is None else after
+        delta = 'missing' if change is None else f"{change:+.1%}"
+        flag = '  REGRESSION' if regressed else ''
+        print(f"  {name:<48} {before:>12} {shown:>12} {delta:>8}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check benchmark results against the baseline')
+    parser.add_argument('--micro', help='pytest-benchmark JSON (--benchmark-json)')
+    parser.add_argument('--load', help='loadgen.py JSON (--output)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown (default 0.25 = 25%%)')
+    parser.add_argument('--min-delta-us', type=float, default=1.0,
+                        help='ignore micro slowdowns smaller than this many microseconds')
+    parser.add_argument('--update', action='store_true',
+                        help='rewrite the baseline from the given results instead of comparing')
+    args = parser.parse_args(argv)
+
+    if not args.micro and not args.load:
+        parser.error('pass --micro and/or --load')
+
+    current = {}
+    if args.micro:
+        current['micro'] = micro_medians(load_json(args.micro))
+    if args.load:
+        load_report = load_json(args.load)
+        current['load'] = load_metrics(load_report)
+        current['loadConfig'] = load_report.get('config', {})
+
+    if args.update:
+        baseline = load_json(args.baseline) if os.path.exists(args.baseline) else {}
+        baseline.update(current)
+        baseline['machine'] = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count()
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Updated {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    regressions = 0
+    if 'micro' in current:
+        rows = list(compare(baseline.get('micro', {}), current['micro'],
+                            args.tolerance, args.min_delta_us))
+        print_rows('Micro-benchmarks (median, us)', rows)
+        regressions += sum(row[4] for row in rows)
+    if 'load' in current:
+        # Latencies are in ms; the micro noise floor does not apply
+        rows = list(compare(baseline.get('load', {}), current['load'],
+                            args.tolerance, 0.0))
+        print_rows('Load (diagnose -> solution)', rows)
+        regressions += sum(row[4] for row in rows)
+
+    machine = baseline.get('machine', {})
+    if machine.get('cpus') != os.cpu_count():
+        print(f"\nNote: baseline was recorded on {machine.get('cpus')} CPU(s), "
+              f"this host has {os.cpu_count()}")
+    print(f"\n{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import os
+
+# Keep benchmark runs hermetic: no disk cache, no job queue, and stage timing
+# off unless asked for, so results measure the code under test
+os.environ['CACHE_DISK_PATH'] = ''
+os.environ.pop('JOB_QUEUE_PATH', None)
+os.environ.setdefault('METRICS_ENABLED', '0')
+
+import pytest  # noqa: E402
+
+from corpus import make_error  # noqa: E402
+from services import load_diagnostics, load_solutions  # noqa: E402
+
+# Larger than the parse/categorize memo sizes, so "cold" cases miss every time
+COLD_CORPUS_SIZE = 5000
+
+
+@pytest.fixture(scope='session')
+def diagnostics():
+    return load_diagnostics()
+
+
+@pytest.fixture(scope='session')
+def solutions():
+    return load_solutions()
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    return [make_error(index, seed=1) for index in range(COLD_CORPUS_SIZE)]
+
+
+class Cycle:
+    """Callable returning the next item of a list on each call"""
+
+    def __init__(self, items):
+        self.items = items
+        self.position = -1
+
+    def __call__(self):
+        self.position = (self.position + 1) % len(self.items)
+        return self.items[self.position]
+
+
+@pytest.fixture
+def cycle():
+    return Cycle
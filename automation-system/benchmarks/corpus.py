@@ -0,0 +1,138 @@
+"""
+Synthetic error corpus
+Deterministic New Relic-shaped error records: event i of a given seed is
+always the same, so corpora of any size are generated on demand and never
+held in memory. Stack traces are 8-80 frames deep, mostly framework
+frames, across Node, Python and Java services.
+
+Write a corpus file with:
+    python benchmarks/corpus.py 100000 corpus.ndjson.gz
+"""
+import gzip
+import json
+import random
+import sys
+
+# (scopeId, service, roleInstance, application file, language)
+SERVICES = (
+    ('user-service-prod', 'user-service', 'aks-nodepool1-12345', 'src/api/users.js', 'js'),
+    ('payment-service-prod', 'payment-service', 'aks-nodepool1-67890',
+     'src/services/paymentService.js', 'js'),
+    ('analytics-service-prod', 'analytics-service', 'aks-nodepool1-11223',
+     'src/analytics/report.py', 'python'),
+    ('order-service-prod', 'order-service', 'aks-nodepool1-44556',
+     'src/main/java/com/company/orders/OrderService.java', 'java'),
+    ('inventory-service-prod', 'inventory-service', 'aks-nodepool2-00001',
+     'src/api/inventory.js', 'js'),
+)
+
+# (type, message template); {n} varies per event, {prop} per error family
+ERRORS = (
+    ('TypeError', "Cannot read property '{prop}' of undefined"),
+    ('TypeError', "Cannot read properties of undefined (reading '{prop}')"),
+    ('UnhandledPromiseRejection', 'UnhandledPromiseRejectionWarning: Error: Payment gateway timeout'),
+    ('RangeError', 'Division by zero in batch {n}'),
+    ('Error', 'Database connection lost after {n} ms'),
+    ('TimeoutError', 'Request timeout after {n}ms calling inventory-api'),
+    ('PermissionError', 'Access denied for user {n}'),
+    ('Error', 'Unexpected token in JSON at position {n}'),
+)
+
+PROPERTIES = ('id', 'name', 'email', 'amount', 'items', 'status')
+
+NODE_LIBRARY_FRAMES = (
+    'Layer.handle [as handle_request] (/app/node_modules/express/lib/router/layer.js:{n}:5)',
+    'next (/app/node_modules/express/lib/router/route.js:{n}:13)',
+    'Route.dispatch (/app/node_modules/express/lib/router/route.js:{n}:3)',
+    'processTicksAndRejections (node:internal/process/task_queues:{n}:5)',
+    'Function.process_params (/app/node_modules/express/lib/router/index.js:{n}:12)',
+)
+
+
+def _js_trace(rng, header, app_file, line, depth):
+    frames = [f"    at {rng.choice(NODE_LIBRARY_FRAMES).format(n=rng.randint(10, 400))}"
+              for _ in range(depth)]
+    # Application frame somewhere in the top few frames
+    position = rng.randint(0, min(3, depth))
+    frames.insert(position, f"    at Handler.run (/app/{app_file}:{line}:{rng.randint(1, 80)})")
+    return '\n'.join([header] + frames)
+
+
+def _python_trace(rng, header, app_file, line, depth):
+    frames = ['Traceback (most recent call last):']
+    for _ in range(depth):
+        frames.append(f'  File "/usr/lib/python3.11/site-packages/flask/app.py", '
+                      f'line {rng.randint(100, 2000)}, in full_dispatch_request')
+        frames.append('    rv = self.dispatch_request()')
+    frames.append(f'  File "/app/{app_file}", line {line}, in build_report')
+    frames.append('    mean = total / count')
+    frames.append(header)
+    return '\n'.join(frames)
+
+
+def _java_trace(rng, header, app_file, line, depth):
+    class_name = app_file.rsplit('/', 1)[-1][:-len('.java')]
+    frames = [header, f"\tat com.company.orders.{class_name}.place({class_name}.java:{line})"]
+    for _ in range(depth):
+        frames.append(f"\tat org.springframework.web.servlet.FrameworkServlet.service"
+                      f"(FrameworkServlet.java:{rng.randint(100, 900)})")
+    return '\n'.join(frames)
+
+
+TRACE_BUILDERS = {'js': _js_trace, 'python': _python_trace, 'java': _java_trace}
+
+
+def make_error(index, seed=0):
+    """Return event ``index`` of corpus ``seed`` as a New Relic error record"""
+    rng = random.Random(seed * 1_000_003 + index)
+    scope_id, service, role_instance, app_file, language = rng.choice(SERVICES)
+    # A few error families dominate, as in real incident streams
+    family = min(int(rng.expovariate(0.6)), len(ERRORS) - 1)
+    error_type, template = ERRORS[family]
+    message = template.format(prop=PROPERTIES[family % len(PROPERTIES)], n=rng.randint(1, 10_000))
+    line = 10 + family * 7
+    depth = min(8 + int(rng.expovariate(1 / 16)), 80)
+    stack = TRACE_BUILDERS[language](rng, f"{error_type}: {message}", app_file, line, depth)
+    return {
+        'id': f"err-{seed}-{index}",
+        'transactionId': f"txn-{seed}-{index}",
+        'scopeId': scope_id,
+        'error': {'message': message, 'stack': stack, 'type': error_type},
+        'containerName': f"{service}-pod-{rng.randint(0, 7)}",
+        'roleInstance': role_instance,
+        'occurrenceCount': rng.randint(1, 50),
+        'firstOccurrence': '2024-01-01T00:00:00Z',
+        'lastOccurrence': '2024-01-01T01:00:00Z',
+        'metadata': {'environment': 'production', 'service': service}
+    }
+
+
+def iter_errors(count, seed=0):
+    for index in range(count):
+        yield make_error(index, seed)
+
+
+def transaction_index(transaction_id):
+    """Parse 'txn-<seed>-<index>' back into (seed, index), or None"""
+    parts = transaction_id.split('-')
+    if len(parts) != 3 or parts[0] != 'txn':
+        return None
+    try:
+        return int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+
+
+def write_corpus(path, count, seed=0):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for error_data in iter_errors(count, seed):
+            f.write(json.dumps(error_data) + '\n')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4):
+        print('Usage: python benchmarks/corpus.py <count> <output.ndjson[.gz]> [seed]')
+        sys.exit(1)
+    write_corpus(sys.argv[2], int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) == 4 else 0)
+    print(f"Wrote {sys.argv[1]} events to {sys.argv[2]}")
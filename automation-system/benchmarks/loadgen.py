@@ -0,0 +1,258 @@
+"""
+Load generator: diagnose -> solution pipeline
+
+Starts a stand-in New Relic server that serves the synthetic corpus
+(benchmarks/corpus.py) by transaction ID, starts LLM1 and LLM2 pointed at
+it, then replays N events through POST /diagnose and POST
+/generate-solution from concurrent keep-alive clients. Reports throughput
+and p50/p90/p99 latency per hop and end to end as JSON.
+
+Run from automation-system:
+    python benchmarks/loadgen.py --events 10000 --concurrency 8 --output load.json
+    python benchmarks/compare.py --load load.json
+"""
+import argparse
+import http.server
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from array import array
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import make_error, transaction_index  # noqa: E402
+
+
+# -- Stand-in New Relic --------------------------------------------------------
+
+class NewRelicStandIn(http.server.BaseHTTPRequestHandler):
+    """Serves /api/errors/transaction/txn-<seed>-<index> from the corpus generator"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urllib.parse.urlparse(self.path).path.strip('/').split('/')
+        if path[:3] == ['api', 'errors', 'transaction'] and len(path) == 4:
+            parsed = transaction_index(path[3])
+            if parsed is None:
+                return self._send(404, {'error': 'Transaction not found'})
+            seed, index = parsed
+            return self._send(200, make_error(index, seed))
+        if path[:3] == ['api', 'errors', 'scope'] and len(path) == 4:
+            return self._send(200, {'scopeId': path[3], 'errors': []})
+        return self._send(404, {'error': 'Not found'})
+
+
+def serve_newrelic(port):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), NewRelicStandIn)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+# -- Process management ----------------------------------------------------------
+
+def start_process(args, cwd, env):
+    return subprocess.Popen(args, cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+
+def start_service(directory, port, server, workers, threads, extra_env):
+    env = {
+        **os.environ,
+        **extra_env,
+        'PORT': str(port),
+        'WEB_WORKERS': str(workers),
+        'WEB_THREADS': str(threads),
+        'WEB_ACCESS_LOG': '',
+        'CACHE_DISK_PATH': ''
+    }
+    env.pop('JOB_QUEUE_PATH', None)
+    cwd = os.path.join(ROOT, directory)
+    if server == 'gunicorn':
+        args = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                'app:create_app()']
+    else:
+        # Threaded Werkzeug server without the debugger or reloader
+        args = [sys.executable, '-c',
+                'import os, app; app.create_app().run(host="127.0.0.1", '
+                'port=int(os.environ["PORT"]), threaded=True)']
+    return start_process(args, cwd, env)
+
+
+def wait_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+# -- Replay ----------------------------------------------------------------------
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return round(sorted_values[index] * 1000, 3)
+
+
+def summarize(latencies, errors):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'p50Ms': percentile(values, 0.50),
+        'p90Ms': percentile(values, 0.90),
+        'p99Ms': percentile(values, 0.99),
+        'maxMs': round(values[-1] * 1000, 3) if values else None
+    }
+
+
+def replay(llm1_url, llm2_url, events, seed, concurrency, duration):
+    lock = threading.Lock()
+    next_index = [0]
+    diagnose_latency, solution_latency, total_latency = array('d'), array('d'), array('d')
+    errors = {'diagnose': 0, 'solution': 0}
+    stop_at = time.monotonic() + duration if duration else None
+
+    def claim():
+        with lock:
+            if next_index[0] >= events or (stop_at and time.monotonic() >= stop_at):
+                return None
+            next_index[0] += 1
+            return next_index[0] - 1
+
+    def client():
+        session = requests.Session()
+        while True:
+            index = claim()
+            if index is None:
+                return
+            started = time.perf_counter()
+            response = session.post(f"{llm1_url}/diagnose",
+                                    json={'transactionId': f"txn-{seed}-{index}"})
+            diagnosed = time.perf_counter()
+            if response.status_code != 200:
+                with lock:
+                    errors['diagnose'] += 1
+                continue
+            diagnostic = response.json()['diagnostic']
+            response = session.post(f"{llm2_url}/generate-solution", json={'diagnostic': diagnostic})
+            finished = time.perf_counter()
+            with lock:
+                diagnose_latency.append(diagnosed - started)
+                if response.status_code != 200:
+                    errors['solution'] += 1
+                    continue
+                solution_latency.append(finished - diagnosed)
+                total_latency.append(finished - started)
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'events': next_index[0],
+        'durationSeconds': round(elapsed, 3),
+        'throughput': round(len(total_latency) / elapsed, 2) if elapsed else 0,
+        'diagnose': summarize(diagnose_latency, errors['diagnose']),
+        'solution': summarize(solution_latency, errors['solution']),
+        'endToEnd': summarize(total_latency, errors['diagnose'] + errors['solution'])
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a synthetic corpus through LLM1 and LLM2')
+    parser.add_argument('--events', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=None,
+                        help='stop after this many seconds even if events remain')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--base-port', type=int, default=5900,
+                        help='New Relic stand-in, LLM1 and LLM2 use this port and the next two')
+    parser.add_argument('--output', help='write the report JSON here as well as stdout')
+    parser.add_argument('--serve-newrelic', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_newrelic:
+        serve_newrelic(args.serve_newrelic)
+        return 0
+
+    newrelic_port, llm1_port, llm2_port = args.base_port, args.base_port + 1, args.base_port + 2
+    newrelic_url = f"http://127.0.0.1:{newrelic_port}"
+    llm1_url = f"http://127.0.0.1:{llm1_port}"
+    llm2_url = f"http://127.0.0.1:{llm2_port}"
+
+    processes = [start_process(
+        [sys.executable, os.path.abspath(__file__), '--serve-newrelic', str(newrelic_port)],
+        BENCH_DIR, dict(os.environ))]
+    try:
+        processes.append(start_service('llm1-diagnostics', llm1_port, args.server, args.workers,
+                                       args.threads, {'NEWRELIC_MCP_URL': newrelic_url}))
+        processes.append(start_service('llm2-solution', llm2_port, args.server, args.workers,
+                                       args.threads, {}))
+        wait_ready(f"{newrelic_url}/api/errors/transaction/txn-0-0")
+        wait_ready(f"{llm1_url}/ready")
+        wait_ready(f"{llm2_url}/ready")
+
+        report = replay(llm1_url, llm2_url, args.events, args.seed, args.concurrency, args.duration)
+        report['config'] = {
+            'server': args.server,
+            'workers': args.workers,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'cpus': os.cpu_count()
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
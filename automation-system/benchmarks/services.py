@@ -0,0 +1,12 @@
+"""
+Load the service modules for benchmarking (see shared/services.py)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from shared.services import load_diagnostics, load_service, load_solutions  # noqa: E402,F401
@@ -0,0 +1,38 @@
+"""
+Production server settings for the Python services
+
+Run from a service directory, e.g.:
+    cd llm1-diagnostics && gunicorn -c ../gunicorn.conf.py "app:create_app()"
+    cd llm2-solution && gunicorn -c ../gunicorn.conf.py "app:create_app()"
+
+Every setting is read from the environment (see .env.example). The app is
+not preloaded, so each worker opens its own connection pools, SQLite
+handles and background threads after the fork.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('WEB_BIND', f"0.0.0.0:{os.getenv('PORT', '5001')}")
+
+# Workers are processes; threads > 1 switches to the threaded (gthread) worker
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    # Drain background work (queue consumers, worker pools) before the process exits
+    from shared.serving import shutdown
+    shutdown()
@@ -2,51 +2,81 @@
 LLM1 Diagnostics Layer
 Retrieves error information from New Relic and gathers context
 """
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import requests
 import os
+import sys
 from dotenv import load_dotenv
-import json
+import time
+from itertools import islice
+
+# Shared Python modules live in automation-system/shared
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.cache import build_backend, build_cache
+from shared.jobqueue import SOLUTIONS_QUEUE, open_job_queue
+from shared.metrics import cache_collector, instrument_app, registry, stage, timed
+from shared.serving import (is_ready, module_app, on_shutdown, warmup, warmup_failures,
+                            warmup_status)
+from shared.wire import (BodyError, DiagnosticPacker, diagnostic_fields, read_body, respond,
+                         stream_item, stream_mimetype, wants_msgpack)
+from http_pool import UpstreamPool
+from categorizer import categorize_error, categorize_errors, categorizer_stats
+from error_index import DAY, open_error_index, parse_time_range
+from mappings import open_store
+from fingerprint import ErrorGrouper, fingerprint_error
+from stacktrace import parse_stack_trace, top_application_frame
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+api = Blueprint('diagnostics', __name__)
 
 # MCP Server endpoints
 NEWRELIC_MCP_URL = os.getenv('NEWRELIC_MCP_URL', 'http://localhost:3002')
 AZURE_MCP_URL = os.getenv('AZURE_MCP_URL', 'http://localhost:3003')
 GITHUB_MCP_URL = os.getenv('GITHUB_MCP_URL', 'http://localhost:3004')
 
-# Mock mapping: role instance -> pipeline info
-ROLE_INSTANCE_MAPPING = {
-    'aks-nodepool1-12345': {
-        'pipelineId': 'pipeline-001',
-        'pipelineName': 'user-service-ci-cd',
-        'buildNumber': '234',
-        'repository': 'company/user-service'
-    },
-    'aks-nodepool1-67890': {
-        'pipelineId': 'pipeline-002',
-        'pipelineName': 'payment-service-ci-cd',
-        'buildNumber': '156',
-        'repository': 'company/payment-service'
-    },
-    'aks-nodepool1-11223': {
-        'pipelineId': 'pipeline-003',
-        'pipelineName': 'analytics-service-ci-cd',
-        'buildNumber': '89',
-        'repository': 'company/analytics-service'
-    }
+# Shared keep-alive connection pools (with timeouts, retries and circuit breakers)
+upstreams = UpstreamPool({
+    'newrelic': NEWRELIC_MCP_URL,
+    'azure': AZURE_MCP_URL,
+    'github': GITHUB_MCP_URL
+})
+on_shutdown(upstreams.close)
+
+# Upstream lookup caches, keyed on (transactionId | scopeId, timeRange) and service name
+cache_backend = build_backend()
+error_cache = build_cache('newrelic', default_ttl=60, backend=cache_backend)
+repository_cache = build_cache('repository', default_ttl=600, backend=cache_backend)
+
+# Indexed role instance -> pipeline and service -> repository mappings (hot-reloaded)
+mapping_store = open_store()
+mapping_store.on_reload.append(repository_cache.invalidate)
+
+registry.add_collector(cache_collector({
+    'newrelic': error_cache.stats,
+    'repository': repository_cache.stats,
+    'categories': lambda: categorizer_stats() or {}
+}))
+
+# Durable queue that hands diagnostics to LLM2 workers (disabled when JOB_QUEUE_PATH is unset)
+job_queue = open_job_queue()
+
+# Day-partitioned history of every error seen (disabled when ERROR_INDEX_PATH is unset)
+error_index = open_error_index()
+
+# Context returned when a pipeline or repository cannot be resolved
+UNKNOWN_PIPELINE = {
+    'pipelineId': 'unknown',
+    'pipelineName': 'unknown-pipeline',
+    'buildNumber': 'N/A',
+    'repository': 'unknown/unknown'
 }
 
-# Mock service -> repository mapping
-SERVICE_REPO_MAPPING = {
-    'user-service': 'company/user-service',
-    'payment-service': 'company/payment-service',
-    'analytics-service': 'company/analytics-service',
-    'order-service': 'company/order-service'
+UNKNOWN_REPOSITORY = {
+    'repository': 'unknown/unknown',
+    'branch': 'main',
+    'lastCommit': 'unknown'
 }
 
 
@@ -55,89 +85,169 @@ class DiagnosticsEngine:
     
     def fetch_error_from_newrelic(self, transaction_id=None, scope_id=None, time_range='24h'):
         """Fetch error details from New Relic MCP"""
+        if transaction_id:
+            return self.fetch_transaction_error(transaction_id)
+        if scope_id:
+            # If scope query, get the most recent error
+            errors = self.fetch_scope_errors(scope_id, time_range)
+            return errors[0] if errors else None
+        return None
+    
+    @timed('diagnostics.fetch_transaction_error')
+    def fetch_transaction_error(self, transaction_id):
+        """Fetch a single error by transaction ID from New Relic MCP (cached)"""
+        return error_cache.get_or_load(
+            ('transaction', transaction_id, None),
+            lambda: self._load_transaction_error(transaction_id)
+        )
+    
+    def _load_transaction_error(self, transaction_id):
         try:
-            if transaction_id:
-                url = f"{NEWRELIC_MCP_URL}/api/errors/transaction/{transaction_id}"
-                response = requests.get(url)
-            elif scope_id:
-                url = f"{NEWRELIC_MCP_URL}/api/errors/scope/{scope_id}"
-                params = {'timeRange': time_range}
-                response = requests.get(url, params=params)
-            else:
-                return None
-            
+            response = upstreams['newrelic'].get(f"/api/errors/transaction/{transaction_id}")
+            if response.status_code == 200:
+                error_data = response.json()
+                self.index_errors([error_data])
+                return error_data
+            return None
+        except Exception as e:
+            print(f"Error fetching from New Relic: {e}")
+            return None
+    
+    @timed('diagnostics.fetch_scope_errors')
+    def fetch_scope_errors(self, scope_id, time_range='24h'):
+        """Fetch every error recorded for a scope from New Relic MCP (cached)"""
+        return error_cache.get_or_load(
+            ('scope', scope_id, time_range),
+            lambda: self._load_scope_errors(scope_id, time_range)
+        ) or []
+    
+    def _load_scope_errors(self, scope_id, time_range):
+        if error_index is None:
+            return self._request_scope_errors(scope_id, time_range) or []
+        # Indexed history plus the un-indexed tail from New Relic
+        with stage('diagnostics.index_query'):
+            return error_index.query_scope(
+                scope_id, time_range,
+                lambda upstream_range: self._request_scope_errors(scope_id, upstream_range)
+            )
+    
+    def _request_scope_errors(self, scope_id, time_range):
+        """Scope errors from New Relic MCP, or None if the request failed"""
+        try:
+            params = {'timeRange': time_range}
+            response = upstreams['newrelic'].get(f"/api/errors/scope/{scope_id}", params=params)
             if response.status_code == 200:
                 data = response.json()
-                # If scope query, get the most recent error
                 if isinstance(data, dict) and 'errors' in data:
-                    return data['errors'][0] if data['errors'] else None
-                return data
+                    return data['errors']
+                return [data] if data else []
             return None
         except Exception as e:
             print(f"Error fetching from New Relic: {e}")
             return None
     
+    def index_errors(self, errors):
+        """Append errors fetched from New Relic to the history index, if enabled"""
+        if error_index is None:
+            return
+        try:
+            with stage('diagnostics.index_record'):
+                error_index.record(errors)
+        except Exception as e:
+            print(f"Error indexing errors: {e}")
+    
+    @timed('diagnostics.fetch_pipeline_info')
     def fetch_pipeline_info(self, role_instance):
         """Fetch pipeline info from Azure MCP (or mock mapping)"""
         # In real implementation, would call Azure DevOps API
-        return ROLE_INSTANCE_MAPPING.get(role_instance, {
-            'pipelineId': 'unknown',
-            'pipelineName': 'unknown-pipeline',
-            'buildNumber': 'N/A',
-            'repository': 'unknown/unknown'
-        })
+        pipeline_info = mapping_store.pipeline_for(role_instance)
+        return dict(pipeline_info) if pipeline_info else dict(UNKNOWN_PIPELINE)
     
+    @timed('diagnostics.fetch_repository_info')
     def fetch_repository_info(self, service_name):
-        """Fetch repository info from GitHub MCP"""
-        # Extract service name from scopeId or metadata
-        for service, repo in SERVICE_REPO_MAPPING.items():
-            if service in service_name.lower():
-                return {
-                    'repository': repo,
-                    'branch': 'main',
-                    'lastCommit': 'abc123def456'
-                }
-        return {
-            'repository': 'unknown/unknown',
-            'branch': 'main',
-            'lastCommit': 'unknown'
-        }
+        """Fetch repository info from GitHub MCP (cached)"""
+        return repository_cache.get_or_load(
+            (service_name,),
+            lambda: self._load_repository_info(service_name)
+        )
     
-    def analyze_error_context(self, error_data):
-        """Analyze error and gather full context"""
+    def _load_repository_info(self, service_name):
+        # Service name comes from scopeId or metadata; exact or contained match
+        repo = mapping_store.repository_for(service_name)
+        if repo:
+            return {
+                'repository': repo,
+                'branch': 'main',
+                'lastCommit': 'abc123def456'
+            }
+        return dict(UNKNOWN_REPOSITORY)
+    
+    def _lookup(self, lookups, kind, key, fetch):
+        """Resolve a lookup, memoizing it in ``lookups`` when provided"""
+        if lookups is None:
+            return fetch(key)
+        cache_key = (kind, key)
+        if cache_key not in lookups:
+            lookups[cache_key] = fetch(key)
+        return lookups[cache_key]
+    
+    def context_keys(self, error_data):
+        """Return the (role instance, service name, stack trace) lookup keys for an error"""
+        role_instance = error_data.get('roleInstance', '')
+        service_name = error_data.get('metadata', {}).get('service', 
+                                      error_data.get('scopeId', ''))
+        stack_trace = error_data.get('error', {}).get('stack', '')
+        return role_instance, service_name, stack_trace
+    
+    @timed('diagnostics.analyze_error_context')
+    def analyze_error_context(self, error_data, lookups=None, category=None):
+        """Analyze error and gather full context
+
+        ``lookups`` is an optional dict shared across calls to reuse
+        pipeline/repository lookups for repeated role instances and services.
+        ``category`` skips categorization when it was already done in bulk.
+        """
         if not error_data:
             return None
         
-        # Extract key information
-        error_message = error_data.get('error', {}).get('message', '')
-        error_type = error_data.get('error', {}).get('type', '')
-        stack_trace = error_data.get('error', {}).get('stack', '')
-        container_name = error_data.get('containerName', '')
-        role_instance = error_data.get('roleInstance', '')
-        occurrence_count = error_data.get('occurrenceCount', 0)
+        role_instance, service_name, stack_trace = self.context_keys(error_data)
         
         # Get pipeline info
-        pipeline_info = self.fetch_pipeline_info(role_instance)
+        pipeline_info = self._lookup(lookups, 'pipeline', role_instance,
+                                     self.fetch_pipeline_info)
         
         # Get repository info
-        service_name = error_data.get('metadata', {}).get('service', 
-                                      error_data.get('scopeId', ''))
-        repo_info = self.fetch_repository_info(service_name)
+        repo_info = self._lookup(lookups, 'repository', service_name,
+                                 self.fetch_repository_info)
         
         # Determine error category and source file
-        source_file, line_number = self.extract_source_location(stack_trace)
+        source_location = self.extract_source_location(stack_trace)
+        
+        return self.build_diagnostic(error_data, pipeline_info, repo_info, source_location,
+                                     category)
+    
+    @timed('diagnostics.build_diagnostic')
+    def build_diagnostic(self, error_data, pipeline_info, repo_info, source_location,
+                         category=None):
+        """Assemble the diagnostic payload from an error and its resolved context"""
+        error_message = error_data.get('error', {}).get('message', '')
+        error_type = error_data.get('error', {}).get('type', '')
+        source_file, line_number = source_location
+        if category is None:
+            category = self.categorize_error(error_type, error_message)
         
         return {
             'error': {
                 'message': error_message,
                 'type': error_type,
-                'stack': stack_trace,
-                'category': self.categorize_error(error_type, error_message)
+                'stack': error_data.get('error', {}).get('stack', ''),
+                'category': category
             },
             'context': {
-                'containerName': container_name,
-                'roleInstance': role_instance,
-                'occurrenceCount': occurrence_count,
+                'fingerprint': fingerprint_error(error_data),
+                'containerName': error_data.get('containerName', ''),
+                'roleInstance': error_data.get('roleInstance', ''),
+                'occurrenceCount': error_data.get('occurrenceCount', 0),
                 'firstOccurrence': error_data.get('firstOccurrence'),
                 'lastOccurrence': error_data.get('lastOccurrence')
             },
@@ -149,62 +259,102 @@ class DiagnosticsEngine:
             }
         }
     
+    def analyze_error_contexts(self, errors, chunk_size=64):
+        """Analyze a set of errors in one pass, yielding (error, diagnostic) pairs.
+
+        Pipeline and repository lookups are resolved once per distinct
+        role instance / service name across the whole set, and errors are
+        categorized in bulk per chunk.
+        """
+        lookups = {}
+        errors = iter(errors)
+        while True:
+            chunk = [error_data for error_data in islice(errors, chunk_size) if error_data]
+            if not chunk:
+                return
+            categories = self.categorize_errors([
+                (error_data.get('error', {}).get('type', ''),
+                 error_data.get('error', {}).get('message', ''))
+                for error_data in chunk
+            ])
+            for error_data, category in zip(chunk, categories):
+                yield error_data, self.analyze_error_context(error_data, lookups, category)
+    
+    def analyze_error_groups(self, errors, grouper=None):
+        """Group errors by fingerprint and yield one (error, diagnostic) per group
+        as soon as the group's first chunk is analyzed.
+
+        The diagnostic's occurrenceCount is the sum across the members seen
+        so far, so downstream work scales with distinct bugs rather than raw
+        events. Members that arrive later only grow the group in grouper;
+        grouper.grown() lists those groups once errors is exhausted.
+        """
+        grouper = grouper if grouper is not None else ErrorGrouper()
+        first_seen = (merged for _, merged in grouper.first_seen(errors))
+        for merged, diagnostic in self.analyze_error_contexts(first_seen):
+            fingerprint = diagnostic['context']['fingerprint']
+            summary = grouper.summary(fingerprint)
+            diagnostic['context']['groupedErrors'] = summary['groupedErrors']
+            diagnostic['context']['roleInstances'] = summary['roleInstances']
+            grouper.mark_reported(fingerprint)
+            yield merged, diagnostic
+    
+    @timed('diagnostics.extract_source_location')
     def extract_source_location(self, stack_trace):
         """Extract file and line number from stack trace"""
-        if not stack_trace:
+        # Example: "at /app/src/api/users.js:11:51" -> ('src/api/users.js', '11')
+        frame = top_application_frame(stack_trace)
+        if frame is None:
             return None, None
-        
-        # Parse stack trace to find source file
-        lines = stack_trace.split('\n')
-        for line in lines:
-            if '/app/src/' in line or 'src/' in line:
-                # Extract file path and line number
-                # Example: "at /app/src/api/users.js:11:51"
-                parts = line.strip().split()
-                for part in parts:
-                    if '.js:' in part or '.ts:' in part:
-                        file_and_line = part.strip('()')
-                        if ':' in file_and_line:
-                            file_path = file_and_line.split(':')[0]
-                            line_num = file_and_line.split(':')[1] if len(file_and_line.split(':')) > 1 else None
-                            # Clean up file path
-                            if '/app/' in file_path:
-                                file_path = file_path.split('/app/')[-1]
-                            return file_path, line_num
-        return None, None
+        return frame.file, str(frame.line)
     
+    def extract_frames(self, stack_trace):
+        """Return every application frame in the stack trace, innermost first"""
+        return parse_stack_trace(stack_trace or '')
+    
+    @timed('diagnostics.categorize_error')
     def categorize_error(self, error_type, error_message):
         """Categorize error to determine fix strategy"""
-        error_lower = error_message.lower()
-        
-        if 'cannot read property' in error_lower or 'undefined' in error_lower:
-            return 'NULL_REFERENCE'
-        elif 'unhandled' in error_lower and 'promise' in error_lower:
-            return 'UNHANDLED_PROMISE'
-        elif 'division' in error_lower or 'divide' in error_lower:
-            return 'MATH_ERROR'
-        elif 'access denied' in error_lower or 'permission' in error_lower:
-            return 'ACCESS_CONTROL'
-        elif 'connection' in error_lower:
-            return 'RESOURCE_LEAK'
-        elif 'timeout' in error_lower:
-            return 'TIMEOUT'
-        else:
-            return 'RUNTIME_ERROR'
-
-
-@app.route('/diagnose', methods=['POST'])
+        return categorize_error(error_type, error_message)
+    
+    @timed('diagnostics.categorize_errors')
+    def categorize_errors(self, errors):
+        """Categorize a list of (error_type, error_message) pairs in one call"""
+        return categorize_errors(errors)
+
+
+def solution_job(error_data, diagnostic):
+    """Job payload asking LLM2 for a solution to a diagnostic"""
+    return {
+        'transactionId': error_data.get('transactionId'),
+        'scopeId': error_data.get('scopeId'),
+        'diagnostic': diagnostic
+    }
+
+
+@api.route('/diagnose', methods=['POST'])
 def diagnose():
     """
     Main diagnostics endpoint
-    Input: { transactionId?, scopeId?, docName?, timeRange? }
-    Output: Full diagnostic context
+    Input: { transactionId?, scopeId?, docName?, timeRange?, enqueue? }
+    Output: Full diagnostic context; with enqueue, also the jobId of the
+            queued solution request. With Accept: application/msgpack, a
+            MessagePack body whose diagnostic is a compact record and whose
+            stacks map holds its stack trace.
     """
     try:
-        data = request.json
+        data = read_body() or {}
         transaction_id = data.get('transactionId')
         scope_id = data.get('scopeId')
         time_range = data.get('timeRange', '24h')
+        enqueue = data.get('enqueue', False)
+        binary = wants_msgpack()
+        
+        if enqueue and job_queue is None:
+            return respond({
+                'success': False,
+                'message': 'Job queue not configured (set JOB_QUEUE_PATH)'
+            }, 503, binary)
         
         engine = DiagnosticsEngine()
         
@@ -216,31 +366,280 @@ def diagnose():
         )
         
         if not error_data:
-            return jsonify({
+            return respond({
                 'success': False,
                 'message': 'No error found for the given criteria'
-            }), 404
+            }, 404, binary)
         
         # Analyze and gather full context
         diagnostic = engine.analyze_error_context(error_data)
         
+        if enqueue:
+            with stage('diagnostics.enqueue'):
+                job_id = job_queue.enqueue(SOLUTIONS_QUEUE, solution_job(error_data, diagnostic))
+            with stage('diagnostics.json_encode'):
+                return respond({
+                    'success': True,
+                    **diagnostic_fields(diagnostic, binary),
+                    'jobId': job_id
+                }, 202, binary)
+        
+        with stage('diagnostics.json_encode'):
+            return respond({
+                'success': True,
+                **diagnostic_fields(diagnostic, binary)
+            }, 200, binary)
+    
+    except BodyError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    except Exception as e:
+        print(f"Error diagnosing: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def is_id_list(values):
+    """True for a list of transaction or scope ids (strings or numbers)"""
+    return isinstance(values, list) and all(
+        isinstance(value, (str, int)) and not isinstance(value, bool) for value in values)
+
+
+@api.route('/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    """
+    Batch diagnostics endpoint
+    Input: { transactionIds?: [], scopeIds?: [], scopeId?, timeRange?, deduplicate?, enqueue? }
+    Output: NDJSON stream, one diagnostic per line as it becomes ready,
+            followed by a summary line. Unless deduplicate is false, errors
+            sharing a fingerprint are merged into one diagnostic, sent when
+            the fingerprint is first seen; members that arrive after it are
+            reported at the end in a { groupUpdate } line per grown group
+            with its final counts. With enqueue, each line also carries the
+            jobId of its solution request (queued with the first-seen counts).
+            With Accept: application/msgpack, a stream of MessagePack objects
+            whose diagnostics are compact records; each stack trace is sent
+            once, in the stacks map of the first item that refers to it.
+    """
+    try:
+        data = read_body() or {}
+    except BodyError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not (isinstance(data, dict) and is_id_list(data.get('transactionIds') or [])
+            and is_id_list(data.get('scopeIds') or [])
+            and is_id_list([data['scopeId']] if data.get('scopeId') else [])):
+        return jsonify({
+            'success': False,
+            'message': 'transactionIds and scopeIds must be lists of ids'
+        }), 400
+    transaction_ids = list(dict.fromkeys(data.get('transactionIds') or []))
+    scope_ids = list(dict.fromkeys(
+        (data.get('scopeIds') or []) + ([data['scopeId']] if data.get('scopeId') else [])
+    ))
+    time_range = data.get('timeRange', '24h')
+    deduplicate = data.get('deduplicate', True)
+    enqueue = data.get('enqueue', False)
+    binary = wants_msgpack()
+    
+    if not transaction_ids and not scope_ids:
+        return jsonify({
+            'success': False,
+            'message': 'transactionIds or scopeIds required'
+        }), 400
+    
+    if enqueue and job_queue is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job queue not configured (set JOB_QUEUE_PATH)'
+        }), 503
+    
+    engine = DiagnosticsEngine()
+    
+    def collect_errors(not_found):
+        # One upstream fetch per transaction and per distinct scope
+        for transaction_id in transaction_ids:
+            error_data = engine.fetch_transaction_error(transaction_id)
+            if error_data:
+                yield error_data
+            else:
+                not_found.append({'transactionId': transaction_id})
+        for scope_id in scope_ids:
+            errors = engine.fetch_scope_errors(scope_id, time_range)
+            if not errors:
+                not_found.append({'scopeId': scope_id})
+            yield from errors
+    
+    def generate():
+        not_found = []
+        diagnosed = 0
+        events = 0
+        packer = DiagnosticPacker()
+        grouper = ErrorGrouper()
+        
+        def counted(errors):
+            nonlocal events
+            for error_data in errors:
+                events += 1
+                yield error_data
+        
+        try:
+            errors = counted(collect_errors(not_found))
+            if deduplicate:
+                results = engine.analyze_error_groups(errors, grouper)
+            else:
+                results = engine.analyze_error_contexts(errors)
+            for error_data, diagnostic in results:
+                diagnosed += 1
+                line = {
+                    'success': True,
+                    'transactionId': error_data.get('transactionId'),
+                    'scopeId': error_data.get('scopeId'),
+                    **diagnostic_fields(diagnostic, binary, packer)
+                }
+                if enqueue:
+                    line['jobId'] = job_queue.enqueue(
+                        SOLUTIONS_QUEUE, solution_job(error_data, diagnostic))
+                yield stream_item(line, binary)
+            grown = grouper.grown()
+            for fingerprint in grown:
+                merged = grouper.groups[fingerprint][0]
+                yield stream_item({
+                    'success': True,
+                    'transactionId': merged.get('transactionId'),
+                    'scopeId': merged.get('scopeId'),
+                    'groupUpdate': grouper.summary(fingerprint)
+                }, binary)
+            for missing in not_found:
+                yield stream_item({
+                    'success': False,
+                    **missing,
+                    'message': 'No error found for the given criteria'
+                }, binary)
+            yield stream_item({
+                'summary': {
+                    'errors': events,
+                    'diagnosed': diagnosed,
+                    'groupUpdates': len(grown),
+                    'notFound': len(not_found)
+                }
+            }, binary)
+        except Exception as e:
+            yield stream_item({'success': False, 'error': str(e)}, binary)
+    
+    return Response(stream_with_context(generate()), mimetype=stream_mimetype(binary))
+
+
+@api.route('/history', methods=['GET'])
+def history():
+    """
+    Occurrence history from the local error index
+    Input: ?fingerprint=&scopeId=&timeRange=7d&bucket=day|hour
+    Output: { occurrences, records, firstSeen, lastSeen, buckets: [{ start, occurrences }] }
+            Answered from indexed data only; scope queries through /diagnose
+            keep the index current.
+    """
+    if error_index is None:
+        return jsonify({
+            'success': False,
+            'message': 'Error index not configured (set ERROR_INDEX_PATH)'
+        }), 503
+    
+    fingerprint = request.args.get('fingerprint')
+    scope_id = request.args.get('scopeId')
+    time_range = request.args.get('timeRange', '7d')
+    bucket = 3600 if request.args.get('bucket') == 'hour' else DAY
+    
+    try:
+        end = time.time()
+        start = end - parse_time_range(time_range)
+        with stage('diagnostics.index_query'):
+            summary = error_index.occurrences(start, end, fingerprint=fingerprint,
+                                              scope_id=scope_id, bucket=bucket)
+        covered = error_index.coverage(scope_id) if scope_id else None
         return jsonify({
             'success': True,
-            'diagnostic': diagnostic
+            'fingerprint': fingerprint,
+            'scopeId': scope_id,
+            'timeRange': time_range,
+            'coveredFrom': covered[0] if covered else None,
+            **summary
         })
-    
     except Exception as e:
+        print(f"Error querying history: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok', 'service': 'llm1-diagnostics'})
+    """Liveness: answers as soon as the worker serves, warm or not"""
+    return jsonify({
+        'status': 'ok',
+        'service': 'llm1-diagnostics',
+        'ready': is_ready('llm1-diagnostics'),
+        'upstreams': upstreams.stats(),
+        'warmup': warmup_timings,
+        'mappings': mapping_store.stats(),
+        'jobQueue': job_queue.stats(SOLUTIONS_QUEUE) if job_queue else None,
+        'errorIndex': error_index.stats() if error_index else None,
+        'caches': {
+            'newrelic': error_cache.stats(),
+            'repository': repository_cache.stats(),
+            'categories': categorizer_stats()
+        }
+    })
+
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: 503 until warmup has loaded the parsers, tables and indexes, and
+    for good if a warmup step failed (listed under failed)
+    """
+    status = warmup_status('llm1-diagnostics')
+    return jsonify({
+        'ready': status == 'ready',
+        'status': status,
+        'warmup': warmup_timings,
+        'failed': warmup_failures('llm1-diagnostics')
+    }), 200 if status == 'ready' else 503
+
+
+WARMUP_TRACE = "TypeError: warmup\n    at handler (/app/src/api/warmup.js:1:1)"
+warmup_timings = {}
+
+
+def warm_caches():
+    """Compile matchers, load indexes and open upstream sessions before the first request"""
+    engine = DiagnosticsEngine()
+    return warmup('llm1-diagnostics', [
+        ('categorizer', lambda: engine.categorize_error('TypeError', 'warmup')),
+        ('stacktrace', lambda: engine.extract_source_location(WARMUP_TRACE)),
+        ('mappings', lambda: mapping_store.repository_for('warmup')),
+        ('fingerprint', lambda: fingerprint_error({'error': {'stack': WARMUP_TRACE}})),
+        ('upstreams', lambda: [host.session for host in upstreams.hosts.values()])
+    ])
+
+
+def create_app():
+    """Application factory for gunicorn ("app:create_app()") and the dev server"""
+    global warmup_timings
+    flask_app = Flask(__name__)
+    CORS(flask_app)  # Enable CORS for all routes
+    flask_app.register_blueprint(api)
+    instrument_app(flask_app, 'llm1-diagnostics')
+    warmup_timings = warm_caches()
+    return flask_app
+
+
+# Built on first access (ASGI wrapper, tests); servers call create_app() themselves
+__getattr__ = module_app(create_app)
 
 
 if __name__ == '__main__':
+    # Development server; see gunicorn.conf.py for production serving
     port = int(os.getenv('PORT', 5001))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=True)
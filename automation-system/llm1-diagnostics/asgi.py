@@ -0,0 +1,117 @@
+"""
+ASGI entry point for LLM1 Diagnostics
+Serves /diagnose on the async engine; every other route is delegated to the Flask app
+
+Run with: uvicorn asgi:app --port 5001
+"""
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, job_queue, solution_job
+from async_engine import AsyncDiagnosticsEngine
+from shared.jobqueue import SOLUTIONS_QUEUE
+
+engine = AsyncDiagnosticsEngine()
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def _read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    data = json.loads(body or b'{}')
+    if not isinstance(data, dict):
+        raise ValueError('expected a JSON object')
+    return data
+
+
+async def _send_json(send, payload, status=200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def diagnose(scope, receive, send):
+    """
+    Async diagnostics endpoint
+    Input: { transactionId?, scopeId?, docName?, timeRange?, deadlineMs?, enqueue? }
+    Output: Full diagnostic context, flagged partial when a source was late;
+            with enqueue, also the jobId of the queued solution request
+    """
+    try:
+        data = await _read_json(receive)
+        deadline = data.get('deadlineMs')
+        # Callers may tighten the deadline but not extend it
+        if deadline is not None:
+            deadline = min(float(deadline) / 1000.0, engine.deadline)
+    except (ValueError, TypeError) as e:
+        return await _send_json(send, {
+            'success': False,
+            'message': f'Invalid request body: {e}'
+        }, 400)
+
+    try:
+        enqueue = data.get('enqueue', False)
+
+        if enqueue and job_queue is None:
+            return await _send_json(send, {
+                'success': False,
+                'message': 'Job queue not configured (set JOB_QUEUE_PATH)'
+            }, 503)
+
+        error_data, diagnostic, late_sources = await engine.diagnose(
+            transaction_id=data.get('transactionId'),
+            scope_id=data.get('scopeId'),
+            time_range=data.get('timeRange', '24h'),
+            deadline=deadline
+        )
+
+        if not diagnostic:
+            if 'newrelic' in late_sources:
+                return await _send_json(send, {
+                    'success': False,
+                    'message': 'New Relic lookup exceeded the request deadline'
+                }, 504)
+            return await _send_json(send, {
+                'success': False,
+                'message': 'No error found for the given criteria'
+            }, 404)
+
+        response = {
+            'success': True,
+            'diagnostic': diagnostic,
+            'partial': bool(late_sources),
+            'lateSources': late_sources
+        }
+        if enqueue:
+            # SQLite write; keep it off the event loop
+            response['jobId'] = await asyncio.to_thread(
+                job_queue.enqueue, SOLUTIONS_QUEUE, solution_job(error_data, diagnostic))
+            return await _send_json(send, response, 202)
+        await _send_json(send, response)
+
+    except Exception as e:
+        await _send_json(send, {
+            'success': False,
+            'error': str(e)
+        }, 500)
+
+
+async def app(scope, receive, send):
+    if (scope['type'] == 'http' and scope['path'] == '/diagnose'
+            and scope['method'] == 'POST'):
+        return await diagnose(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
@@ -0,0 +1,149 @@
+"""
+Async Diagnostics Engine
+Fans out pipeline, repository and source-location lookups concurrently
+under a per-request deadline, returning partial context for late sources
+
+A thread cannot be cancelled: a lookup that misses its deadline keeps
+running, and holds its lookup thread, until the upstream answers or its
+HTTP timeout fires. Lookups therefore run on their own bounded pool, so
+a slow upstream can only exhaust that pool (later requests then report
+the source late) and never the event loop's default executor.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import DiagnosticsEngine, UNKNOWN_PIPELINE, UNKNOWN_REPOSITORY
+from shared.serving import on_shutdown
+
+# Default per-request deadline for context resolution, in seconds
+DIAGNOSE_DEADLINE = float(os.getenv('DIAGNOSE_DEADLINE', '5.0'))
+# Lookup threads, and lookups allowed to run or wait for one before new ones are shed
+DIAGNOSE_LOOKUP_THREADS = int(os.getenv('DIAGNOSE_LOOKUP_THREADS', 16))
+DIAGNOSE_LOOKUP_BACKLOG = int(os.getenv('DIAGNOSE_LOOKUP_BACKLOG', 64))
+
+
+class LookupsSaturated(Exception):
+    """Raised instead of queueing a lookup behind a full backlog"""
+
+
+class AsyncDiagnosticsEngine:
+    """asyncio front-end over DiagnosticsEngine
+
+    Blocking lookups run on a dedicated thread pool so they keep using the
+    shared pooled HTTP sessions; the event loop only coordinates them.
+    """
+
+    def __init__(self, engine=None, deadline=DIAGNOSE_DEADLINE,
+                 threads=DIAGNOSE_LOOKUP_THREADS, backlog=DIAGNOSE_LOOKUP_BACKLOG):
+        self.engine = engine or DiagnosticsEngine()
+        self.deadline = deadline
+        self.backlog = backlog
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='diagnose-lookup')
+        on_shutdown(functools.partial(self.executor.shutdown, wait=False, cancel_futures=True))
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.shed = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    def _lookup(self, function, *args, **kwargs):
+        """asyncio future for function(*args, **kwargs) on the lookup pool
+
+        Cancelling it drops the call if it has not started yet. With the
+        backlog full the future fails with LookupsSaturated at once.
+        """
+        with self._lock:
+            saturated = self.pending >= self.backlog
+            if saturated:
+                self.shed += 1
+            else:
+                self.pending += 1
+        if saturated:
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(LookupsSaturated(f"{self.backlog} lookups already pending"))
+            return future
+        future = self.executor.submit(function, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self.pending, 'backlog': self.backlog, 'shed': self.shed}
+
+    async def fetch_error_from_newrelic(self, transaction_id=None, scope_id=None, time_range='24h'):
+        """Fetch error details from New Relic MCP without blocking the loop"""
+        return await self._lookup(
+            self.engine.fetch_error_from_newrelic,
+            transaction_id=transaction_id,
+            scope_id=scope_id,
+            time_range=time_range
+        )
+
+    async def analyze_error_context(self, error_data, deadline=None):
+        """Resolve context sources concurrently
+
+        Returns (diagnostic, late_sources). Sources that miss the deadline
+        are replaced by their "unknown" placeholders and listed in
+        late_sources; a source that raises is treated the same way.
+        """
+        if not error_data:
+            return None, []
+
+        deadline = self.deadline if deadline is None else deadline
+        role_instance, service_name, stack_trace = self.engine.context_keys(error_data)
+
+        tasks = {
+            'pipeline': self._lookup(self.engine.fetch_pipeline_info, role_instance),
+            'repository': self._lookup(self.engine.fetch_repository_info, service_name),
+            'source': self._lookup(self.engine.extract_source_location, stack_trace)
+        }
+        fallbacks = {
+            'pipeline': dict(UNKNOWN_PIPELINE),
+            'repository': dict(UNKNOWN_REPOSITORY),
+            'source': (None, None)
+        }
+
+        await asyncio.wait(tasks.values(), timeout=max(deadline, 0))
+
+        results = {}
+        late_sources = []
+        for name, task in tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                results[name] = task.result()
+            else:
+                if task.done() and not task.cancelled():
+                    print(f"Error resolving {name} context: {task.exception()}")
+                task.cancel()
+                results[name] = fallbacks[name]
+                late_sources.append(name)
+
+        diagnostic = self.engine.build_diagnostic(
+            error_data, results['pipeline'], results['repository'], results['source'])
+        return diagnostic, late_sources
+
+    async def diagnose(self, transaction_id=None, scope_id=None, time_range='24h', deadline=None):
+        """Fetch and analyze one error within a single overall deadline
+
+        Returns (error_data, diagnostic, late_sources); diagnostic is None
+        when no error matched or the New Relic fetch itself missed the deadline.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        started = time.monotonic()
+        try:
+            error_data = await asyncio.wait_for(
+                self.fetch_error_from_newrelic(transaction_id, scope_id, time_range),
+                timeout=deadline
+            )
+        except (asyncio.TimeoutError, LookupsSaturated):
+            return None, None, ['newrelic']
+
+        remaining = deadline - (time.monotonic() - started)
+        diagnostic, late_sources = await self.analyze_error_context(error_data, deadline=remaining)
+        return error_data, diagnostic, late_sources
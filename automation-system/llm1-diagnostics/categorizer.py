@@ -0,0 +1,237 @@
+"""
+Error Categorizer
+Rule-table driven categorization compiled into a single combined matcher
+over error type and message, with results cached per (type, message)
+
+The rule table is loaded on first use. Compile it ahead of time (mmap-loaded,
+no term analysis at startup) with:
+    python categorizer.py build-index category_rules.json category_rules.idx
+"""
+import json
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+
+if __name__ == '__main__':
+    # Shared Python modules live in automation-system/shared
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.artifacts import is_artifact, read_artifact, write_artifact  # noqa: E402
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), 'category_rules.json')
+CATEGORY_CACHE_SIZE = 8192
+
+# Numbers and hex addresses are masked before caching so messages that differ
+# only in IDs share one cache entry; rule terms must not contain digits.
+_VOLATILE = re.compile(r'0x[0-9a-f]+|\d+')
+
+
+class Rule:
+    """One category rule: matches on any type term, or on the message terms"""
+
+    __slots__ = ('category', 'any_terms', 'all_terms', 'type_terms')
+
+    def __init__(self, category, any_terms=(), all_terms=(), type_terms=()):
+        self.category = category
+        self.any_terms = frozenset(term.lower() for term in any_terms)
+        self.all_terms = frozenset(term.lower() for term in all_terms)
+        self.type_terms = frozenset(term.lower() for term in type_terms)
+
+    @classmethod
+    def from_config(cls, config):
+        message = config.get('message', {})
+        return cls(
+            config['category'],
+            any_terms=message.get('any', ()),
+            all_terms=message.get('all', ()),
+            type_terms=config.get('type', ())
+        )
+
+    def to_state(self):
+        return (self.category, self.any_terms, self.all_terms, self.type_terms)
+
+    @classmethod
+    def from_state(cls, state):
+        rule = cls.__new__(cls)
+        rule.category, rule.any_terms, rule.all_terms, rule.type_terms = state
+        return rule
+
+    def matches(self, type_hits, message_hits):
+        if self.type_terms and not self.type_terms.isdisjoint(type_hits):
+            return True
+        if not self.any_terms and not self.all_terms:
+            return False
+        if self.any_terms and self.any_terms.isdisjoint(message_hits):
+            return False
+        return self.all_terms <= message_hits
+
+
+class TermMatcher:
+    """Finds which of a fixed set of terms occur in a text with one regex scan
+
+    The terms are compiled into a single alternation, longest first, inside
+    a lookahead so that the scan tries every start position without
+    consuming text: terms that partially overlap ("out of memory" and
+    "memory leak" in "out of memory leak") are both reported. A match on a
+    longer term also counts every shorter term contained in it, which
+    covers terms sharing a start position.
+    """
+
+    def __init__(self, terms):
+        terms = sorted(set(terms), key=len, reverse=True)
+        self.terms = terms
+        self.implied = {
+            term: frozenset(other for other in terms if other in term)
+            for term in terms
+        }
+        self.pattern = self._compile(terms)
+
+    @staticmethod
+    def _compile(terms):
+        if not terms:
+            return None
+        return re.compile('(?=(' + '|'.join(re.escape(term) for term in terms) + '))')
+
+    def to_state(self):
+        return (self.terms, self.implied)
+
+    @classmethod
+    def from_state(cls, state):
+        matcher = cls.__new__(cls)
+        matcher.terms, matcher.implied = state
+        matcher.pattern = cls._compile(matcher.terms)
+        return matcher
+
+    def find(self, text):
+        if self.pattern is None or not text:
+            return frozenset()
+        hits = set()
+        implied = self.implied
+        for match in self.pattern.finditer(text):
+            hits.update(implied[match.group(1)])
+        return frozenset(hits)
+
+
+class ErrorCategorizer:
+    """Categorizes errors from a rule table, first matching rule wins"""
+
+    def __init__(self, rules, default='RUNTIME_ERROR', type_matcher=None, message_matcher=None):
+        self.rules = tuple(rules)
+        self.default = default
+        self.type_matcher = type_matcher or TermMatcher(
+            t for rule in self.rules for t in rule.type_terms)
+        self.message_matcher = message_matcher or TermMatcher(
+            t for rule in self.rules for t in rule.any_terms | rule.all_terms)
+        # Cache per instance so reloading the rule table starts clean
+        self._cached = lru_cache(maxsize=CATEGORY_CACHE_SIZE)(self._categorize)
+
+    def to_state(self):
+        return {
+            'rules': [rule.to_state() for rule in self.rules],
+            'default': self.default,
+            'typeMatcher': self.type_matcher.to_state(),
+            'messageMatcher': self.message_matcher.to_state()
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(
+            [Rule.from_state(rule) for rule in state['rules']],
+            default=state['default'],
+            type_matcher=TermMatcher.from_state(state['typeMatcher']),
+            message_matcher=TermMatcher.from_state(state['messageMatcher'])
+        )
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        """Load a JSON rule table or a compiled index"""
+        if is_artifact(path):
+            return cls.from_state(read_artifact(path, 'categories'))
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(
+            [Rule.from_config(rule) for rule in config.get('rules', [])],
+            default=config.get('default', 'RUNTIME_ERROR')
+        )
+
+    def categorize(self, error_type, error_message):
+        """Return the category for one error"""
+        return self._cached((error_type or '').lower(),
+                            _VOLATILE.sub('#', (error_message or '').lower()))
+
+    def _categorize(self, error_type, error_message):
+        type_hits = self.type_matcher.find(error_type)
+        message_hits = self.message_matcher.find(error_message)
+        for rule in self.rules:
+            if rule.matches(type_hits, message_hits):
+                return rule.category
+        return self.default
+
+    def categorize_many(self, errors):
+        """Categorize a list of (error_type, error_message) pairs in one call"""
+        categorize = self.categorize
+        return [categorize(error_type, error_message) for error_type, error_message in errors]
+
+    def stats(self):
+        info = self._cached.cache_info()
+        return {
+            'rules': len(self.rules),
+            'hits': info.hits,
+            'misses': info.misses,
+            'entries': info.currsize
+        }
+
+
+_categorizer = None
+_categorizer_lock = threading.Lock()
+
+
+def get_categorizer():
+    """Return the shared categorizer, loading CATEGORY_RULES_PATH on first use"""
+    global _categorizer
+    if _categorizer is None:
+        with _categorizer_lock:
+            if _categorizer is None:
+                _categorizer = ErrorCategorizer.from_file(
+                    os.getenv('CATEGORY_RULES_PATH', DEFAULT_RULES_PATH))
+    return _categorizer
+
+
+def reload_categorizer(path=None):
+    """Recompile the shared categorizer from the rule file"""
+    global _categorizer
+    categorizer = ErrorCategorizer.from_file(
+        path or os.getenv('CATEGORY_RULES_PATH', DEFAULT_RULES_PATH))
+    with _categorizer_lock:
+        _categorizer = categorizer
+    return categorizer
+
+
+def categorizer_stats():
+    """Stats of the shared categorizer, or None before it is loaded"""
+    categorizer = _categorizer
+    return categorizer.stats() if categorizer is not None else None
+
+
+def build_index(rules_path, index_path):
+    """Compile a JSON rule table into an index artifact"""
+    write_artifact(index_path, 'categories', ErrorCategorizer.from_file(rules_path).to_state())
+
+
+def categorize_error(error_type, error_message):
+    return get_categorizer().categorize(error_type, error_message)
+
+
+def categorize_errors(errors):
+    """Bulk categorization of (error_type, error_message) pairs"""
+    return get_categorizer().categorize_many(errors)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'build-index':
+        print('Usage: python categorizer.py build-index <category_rules.json> <category_rules.idx>')
+        sys.exit(1)
+    build_index(sys.argv[2], sys.argv[3])
+    print(f"Wrote {sys.argv[3]}")
@@ -0,0 +1,353 @@
+"""
+Historical Error Index
+Append-only SQLite store of every New Relic error record LLM1 has seen,
+partitioned into one table per UTC day and indexed by scope, fingerprint
+and timestamp. Scope/time-range queries are answered locally; only the
+tail since the scope was last synced is fetched from New Relic.
+
+Each row is one observation of a record at its lastOccurrence, carrying the
+occurrences added since the previous observation, so summing a range gives
+how often an error fired in it rather than a sum of running totals.
+Payloads are stored zlib-compressed.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from fingerprint import fingerprint_error
+
+DAY = 86400
+PARTITION_PREFIX = 'errors_'
+TIME_RANGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': DAY}
+TIME_RANGE_PATTERN = re.compile(r'(\d+)([smhd])')
+
+
+def parse_time_range(time_range, default=DAY):
+    """'24h' / '7d' / '90s' -> seconds, matching the New Relic mock's parser"""
+    match = TIME_RANGE_PATTERN.search(time_range or '')
+    if not match:
+        return default
+    return int(match.group(1)) * TIME_RANGE_UNITS[match.group(2)]
+
+
+def parse_timestamp(value, default=None):
+    """ISO-8601 string (or epoch seconds) -> epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return default
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def partition_name(timestamp):
+    return PARTITION_PREFIX + time.strftime('%Y%m%d', time.gmtime(timestamp))
+
+
+def occurrence_count(value):
+    """Upstream occurrenceCount as a positive int; 1 when missing or not a number"""
+    try:
+        count = int(value)
+    except (ValueError, TypeError):
+        return 1
+    return count if count > 0 else 1
+
+
+def record_key(error_data):
+    """Identity of an upstream record across repeated fetches"""
+    return str(error_data.get('id') or error_data.get('transactionId')
+               or fingerprint_error(error_data))
+
+
+class ErrorIndex:
+    """Day-partitioned error history in one SQLite file; safe across threads and processes"""
+
+    def __init__(self, path, retention_days=30, min_tail=5.0):
+        self.path = path
+        self.retention_days = retention_days
+        # Tails shorter than this (seconds) are served locally without an upstream call
+        self.min_tail = min_tail
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # Last observed running total per record, to turn snapshots into deltas
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS records ('
+            ' record_key TEXT PRIMARY KEY, occurrence_count INTEGER NOT NULL, ts REAL NOT NULL)'
+        )
+        # Window [covered_from, covered_until] of each scope that is fully indexed
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS coverage ('
+            ' scope_id TEXT PRIMARY KEY, covered_from REAL NOT NULL, covered_until REAL NOT NULL)'
+        )
+        self._lock = threading.Lock()
+        self._partitions = set()
+        self.recorded = 0
+        self.local_queries = 0
+        self.tail_fetches = 0
+        self.full_fetches = 0
+        self.upstream_failures = 0
+
+    # -- Partitions -----------------------------------------------------------
+
+    def _ensure_partition(self, name):
+        """Create a day partition and its indexes (caller holds the lock, inside a transaction)"""
+        if name in self._partitions:
+            return False
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {name} ('
+            ' record_key TEXT NOT NULL, scope_id TEXT, fingerprint TEXT NOT NULL,'
+            ' error_type TEXT, ts REAL NOT NULL, occurrences INTEGER NOT NULL,'
+            ' payload BLOB NOT NULL)'
+        )
+        # Covering indexes: aggregates never touch the (large) payload pages
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {name}_scope'
+                           f' ON {name} (scope_id, ts, occurrences, record_key)')
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {name}_fingerprint'
+                           f' ON {name} (fingerprint, ts, occurrences, record_key)')
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {name}_ts ON {name} (ts)')
+        self._partitions.add(name)
+        return True
+
+    def partitions(self):
+        """Names of all day partitions, oldest first (including ones other processes created)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+                (PARTITION_PREFIX + '[0-9]*',)
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def _partitions_between(self, start, end):
+        first, last = partition_name(start), partition_name(end)
+        return [name for name in self.partitions() if first <= name <= last]
+
+    def retained_from(self, now):
+        """Start of the oldest day retention keeps"""
+        return (now - self.retention_days * DAY) // DAY * DAY
+
+    def drop_expired(self, now=None):
+        """Drop partitions older than retention_days; returns how many were dropped
+
+        Coverage is trimmed to the retained days, so a scope whose older
+        history was dropped is fetched from New Relic again.
+        """
+        kept_from = self.retained_from(now or time.time())
+        cutoff = partition_name(kept_from)
+        expired = [name for name in self.partitions() if name < cutoff]
+        with self._lock:
+            for name in expired:
+                self._conn.execute(f'DROP TABLE IF EXISTS {name}')
+                self._partitions.discard(name)
+            self._conn.execute('DELETE FROM coverage WHERE covered_until < ?', (kept_from,))
+            self._conn.execute('UPDATE coverage SET covered_from = ? WHERE covered_from < ?',
+                               (kept_from, kept_from))
+        return len(expired)
+
+    # -- Writes -----------------------------------------------------------------
+
+    def record(self, errors, now=None):
+        """Append observations for upstream error records; returns rows written
+
+        A record seen again with the same running total and lastOccurrence
+        adds nothing, so re-fetching an unchanged scope does not grow the store.
+        """
+        now = now or time.time()
+        observations = []
+        for error_data in errors:
+            if not error_data:
+                continue
+            ts = parse_timestamp(error_data.get('lastOccurrence'), now)
+            observations.append((record_key(error_data), ts, error_data))
+        if not observations:
+            return 0
+
+        written = 0
+        created = False
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for key, ts, error_data in observations:
+                    count = occurrence_count(error_data.get('occurrenceCount'))
+                    previous = self._conn.execute(
+                        'SELECT occurrence_count, ts FROM records WHERE record_key = ?', (key,)
+                    ).fetchone()
+                    if previous is not None and previous[1] >= ts and previous[0] >= count:
+                        continue
+                    # A lower total than last time means the upstream record was reset
+                    delta = count - previous[0] if previous and count >= previous[0] else count
+                    name = partition_name(ts)
+                    created = self._ensure_partition(name) or created
+                    self._conn.execute(
+                        f'INSERT INTO {name} (record_key, scope_id, fingerprint, error_type, ts,'
+                        ' occurrences, payload) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (key, error_data.get('scopeId'), fingerprint_error(error_data),
+                         error_data.get('error', {}).get('type'), ts, delta,
+                         zlib.compress(json.dumps(error_data).encode('utf-8'), 1))
+                    )
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO records (record_key, occurrence_count, ts)'
+                        ' VALUES (?, ?, ?)', (key, count, max(ts, previous[1] if previous else ts))
+                    )
+                    written += 1
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                # Partitions created in the rolled-back transaction are gone too
+                self._partitions.clear()
+                raise
+            self.recorded += written
+        if created:
+            # At most once per new day partition
+            self.drop_expired(now)
+        return written
+
+    def _set_coverage(self, scope_id, covered_from, covered_until):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO coverage (scope_id, covered_from, covered_until)'
+                ' VALUES (?, ?, ?)', (scope_id, covered_from, covered_until)
+            )
+
+    def coverage(self, scope_id):
+        """(covered_from, covered_until) for a scope, or None if it was never synced"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT covered_from, covered_until FROM coverage WHERE scope_id = ?', (scope_id,)
+            ).fetchone()
+
+    # -- Reads ------------------------------------------------------------------
+
+    def scope_errors(self, scope_id, start, end):
+        """Latest observation of each record in a scope whose lastOccurrence is in [start, end]"""
+        latest = {}
+        for name in self._partitions_between(start, end):
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT record_key, ts, payload FROM {name}'
+                    ' WHERE scope_id = ? AND ts >= ? AND ts <= ?', (scope_id, start, end)
+                ).fetchall()
+            for key, ts, payload in rows:
+                if key not in latest or ts > latest[key][0]:
+                    latest[key] = (ts, payload)
+        # Most recent first, so errors[0] is the latest error in the scope
+        ordered = sorted(latest.values(), key=lambda entry: entry[0], reverse=True)
+        return [json.loads(zlib.decompress(payload)) for _, payload in ordered]
+
+    def query_scope(self, scope_id, time_range, fetch, now=None):
+        """Errors for a scope over time_range, fetching only the un-indexed tail upstream
+
+        fetch(time_range) returns the upstream error list, or None on failure.
+        If the scope's coverage does not reach back to the start of the range,
+        the whole range is fetched once; after that only the seconds since
+        the last sync are. When New Relic is unreachable the indexed history
+        is returned as is and coverage is left unchanged.
+        """
+        now = now or time.time()
+        start = now - parse_time_range(time_range)
+        # Days past retention are never indexed, so coverage need not reach them
+        needed_from = max(start, self.retained_from(now))
+        covered = self.coverage(scope_id)
+        if covered is not None and covered[0] <= needed_from and covered[1] >= needed_from:
+            tail = now - covered[1]
+            if tail < self.min_tail:
+                self.local_queries += 1
+            else:
+                self.tail_fetches += 1
+                # Whole seconds, rounded up, with one second of overlap for clock skew
+                self._sync(scope_id, fetch, f"{math.ceil(tail) + 1}s", covered[0], now)
+        else:
+            self.full_fetches += 1
+            self._sync(scope_id, fetch, time_range, start, now)
+        return self.scope_errors(scope_id, start, now)
+
+    def _sync(self, scope_id, fetch, time_range, covered_from, now):
+        errors = fetch(time_range)
+        if errors is None:
+            self.upstream_failures += 1
+            return
+        self.record(errors, now)
+        self._set_coverage(scope_id, max(covered_from, self.retained_from(now)), now)
+
+    def occurrences(self, start, end, fingerprint=None, scope_id=None, bucket=DAY):
+        """Occurrence totals over [start, end], optionally for one fingerprint and/or scope
+
+        Returns occurrences, distinct records, first/last seen and per-bucket
+        counts (bucket is in seconds, aligned to UTC).
+        """
+        conditions = ['ts >= ?', 'ts <= ?']
+        params = [start, end]
+        if fingerprint:
+            conditions.append('fingerprint = ?')
+            params.append(fingerprint)
+        if scope_id:
+            conditions.append('scope_id = ?')
+            params.append(scope_id)
+        where = ' AND '.join(conditions)
+
+        total = 0
+        records = set()
+        first_seen = last_seen = None
+        buckets = {}
+        for name in self._partitions_between(start, end):
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT CAST(ts / ? AS INTEGER) * ?, SUM(occurrences), MIN(ts), MAX(ts)'
+                    f' FROM {name} WHERE {where} GROUP BY 1', [bucket, bucket] + params
+                ).fetchall()
+                records.update(row[0] for row in self._conn.execute(
+                    f'SELECT DISTINCT record_key FROM {name} WHERE {where}', params))
+            for bucket_start, count, earliest, latest in rows:
+                buckets[bucket_start] = buckets.get(bucket_start, 0) + count
+                total += count
+                first_seen = earliest if first_seen is None else min(first_seen, earliest)
+                last_seen = latest if last_seen is None else max(last_seen, latest)
+        return {
+            'occurrences': total,
+            'records': len(records),
+            'firstSeen': first_seen,
+            'lastSeen': last_seen,
+            'buckets': [{'start': start_ts, 'occurrences': count}
+                        for start_ts, count in sorted(buckets.items())]
+        }
+
+    def stats(self):
+        partitions = self.partitions()
+        return {
+            'path': self.path,
+            'partitions': len(partitions),
+            'oldestPartition': partitions[0][len(PARTITION_PREFIX):] if partitions else None,
+            'retentionDays': self.retention_days,
+            'recorded': self.recorded,
+            'localQueries': self.local_queries,
+            'tailFetches': self.tail_fetches,
+            'fullFetches': self.full_fetches,
+            'upstreamFailures': self.upstream_failures
+        }
+
+
+def open_error_index():
+    """ErrorIndex at ERROR_INDEX_PATH, or None when the index is not configured"""
+    path = os.getenv('ERROR_INDEX_PATH')
+    if not path:
+        return None
+    return ErrorIndex(
+        path,
+        retention_days=int(os.getenv('ERROR_INDEX_RETENTION_DAYS', 30)),
+        min_tail=float(os.getenv('ERROR_INDEX_MIN_TAIL', 5))
+    )
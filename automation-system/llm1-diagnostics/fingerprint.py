@@ -0,0 +1,128 @@
+"""
+Error Fingerprinting
+Normalizes message, type and top application frame into a stable fingerprint
+and groups duplicate errors so each distinct bug is diagnosed once
+"""
+import hashlib
+
+from shared.normalize import normalize_message
+from stacktrace import top_application_frame
+
+
+def fingerprint_error(error_data):
+    """Return a short stable fingerprint for a raw New Relic error"""
+    error = error_data.get('error', {})
+    frame = top_application_frame(error.get('stack') or '')
+    if frame is None:
+        location = ''
+    elif frame.function:
+        location = f"{frame.file}:{frame.function}"
+    else:
+        location = f"{frame.file}:{frame.line}"
+
+    key = '\x1f'.join((
+        (error.get('type') or '').lower(),
+        normalize_message(error.get('message')),
+        location
+    ))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _earliest(a, b):
+    return min(v for v in (a, b) if v) if (a or b) else None
+
+
+def _latest(a, b):
+    return max(v for v in (a, b) if v) if (a or b) else None
+
+
+class ErrorGrouper:
+    """Groups errors by fingerprint one at a time, preserving first-seen order
+
+    Each group is [merged_error, members]. The merged error is a copy of the
+    most recent member with occurrenceCount summed and first/last occurrence
+    widened across the group; it is updated in place, so a reference taken
+    when the group was first seen stays current. The same New Relic record
+    (by id) fetched twice is only counted once.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        # Member count of each group when it was last reported downstream
+        self.reported = {}
+        self._seen_ids = set()
+
+    def add(self, error_data):
+        """Merge one error into its group; returns (fingerprint, is_new_group), or
+        None for an empty or already counted record
+        """
+        if not error_data:
+            return None
+        record_id = error_data.get('id')
+        if record_id is not None:
+            if record_id in self._seen_ids:
+                return None
+            self._seen_ids.add(record_id)
+        fingerprint = fingerprint_error(error_data)
+        group = self.groups.get(fingerprint)
+        if group is None:
+            self.groups[fingerprint] = [dict(error_data), [error_data]]
+            return fingerprint, True
+
+        merged, members = group
+        members.append(error_data)
+        last = error_data.get('lastOccurrence')
+        newer = last and (not merged.get('lastOccurrence') or last > merged['lastOccurrence'])
+        total = merged.get('occurrenceCount', 0) + error_data.get('occurrenceCount', 0)
+        first = _earliest(merged.get('firstOccurrence'), error_data.get('firstOccurrence'))
+        last = _latest(merged.get('lastOccurrence'), last)
+        if newer:
+            merged.clear()
+            merged.update(error_data)
+        merged['occurrenceCount'] = total
+        merged['firstOccurrence'] = first
+        merged['lastOccurrence'] = last
+        return fingerprint, False
+
+    def first_seen(self, errors):
+        """Feed errors through the grouper, yielding (fingerprint, merged_error) for each new group"""
+        for error_data in errors:
+            added = self.add(error_data)
+            if added is not None and added[1]:
+                yield added[0], self.groups[added[0]][0]
+
+    def summary(self, fingerprint):
+        """Current counts of a group, as diagnostic context fields"""
+        merged, members = self.groups[fingerprint]
+        return {
+            'fingerprint': fingerprint,
+            'occurrenceCount': merged.get('occurrenceCount', 0),
+            'firstOccurrence': merged.get('firstOccurrence'),
+            'lastOccurrence': merged.get('lastOccurrence'),
+            'groupedErrors': len(members),
+            'roleInstances': sorted({member.get('roleInstance') for member in members
+                                     if member.get('roleInstance')})
+        }
+
+    def mark_reported(self, fingerprint):
+        self.reported[fingerprint] = len(self.groups[fingerprint][1])
+
+    def grown(self):
+        """Fingerprints of reported groups that gained members since"""
+        return [fingerprint for fingerprint, count in self.reported.items()
+                if len(self.groups[fingerprint][1]) > count]
+
+    def results(self):
+        return [(fingerprint, merged, members)
+                for fingerprint, (merged, members) in self.groups.items()]
+
+
+def group_errors(errors):
+    """Group errors by fingerprint, preserving first-seen order
+
+    Returns a list of (fingerprint, merged_error, members); see ErrorGrouper.
+    """
+    grouper = ErrorGrouper()
+    for error_data in errors:
+        grouper.add(error_data)
+    return grouper.results()
@@ -0,0 +1,263 @@
+"""
+Shared HTTP connection pools for the MCP upstreams
+Keep-alive sessions with timeouts, jittered retries and a circuit breaker per host
+"""
+import os
+import random
+import threading
+import time
+
+from shared.lazy import lazy_import
+from shared.metrics import record_upstream
+
+# Imported when the first upstream session is opened
+requests = lazy_import('requests')
+
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the upstream is unhealthy"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go through right now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at >= self.reset_timeout:
+                    # Let a single probe through
+                    self.state = self.HALF_OPEN
+                    return True
+                self.rejected += 1
+                return False
+            if self.state == self.HALF_OPEN:
+                # A probe is already in flight
+                self.rejected += 1
+                return False
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutiveFailures': self.failures,
+                'timesOpened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+
+class UpstreamHost:
+    """A pooled keep-alive session for one upstream base URL"""
+
+    def __init__(self, name, base_url, pool_size=10, connect_timeout=2.0,
+                 read_timeout=10.0, max_retries=2, backoff_base=0.2,
+                 backoff_max=2.0, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The keep-alive session, opened on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # Retries are handled here so the backoff can be jittered
+                    adapter = requests.adapters.HTTPAdapter(
+                        pool_connections=1, pool_maxsize=self.pool_size,
+                        max_retries=0, pool_block=False)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, **kwargs):
+        """Issue a request, retrying connection errors and 502/503/504 responses"""
+        if not self.breaker.allow():
+            record_upstream(self.name, 'circuit_open')
+            raise CircuitOpenError(f"Circuit open for upstream '{self.name}'")
+
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            with self._lock:
+                self.requests += 1
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                outcome = 'timeout' if isinstance(e, requests.Timeout) else 'connection_error'
+                record_upstream(self.name, outcome, time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    raise
+            except requests.RequestException:
+                record_upstream(self.name, 'error', time.perf_counter() - started)
+                self._record_failure()
+                raise
+            except Exception:
+                # Anything else (a broken adapter, say) still settles a half-open probe
+                record_upstream(self.name, 'error', time.perf_counter() - started)
+                self._record_failure()
+                raise
+            else:
+                record_upstream(self.name, response.status_code, time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 500:
+                        self._record_failure()
+                    else:
+                        self.breaker.record_success()
+                    return response
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    return response
+
+            with self._lock:
+                self.retries += 1
+            # The first retry waits up to backoff_base, then the cap doubles
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def _record_failure(self):
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def stats(self):
+        pools = (self._session.get_adapter(self.base_url).poolmanager.pools
+                 if self._session is not None else {})
+        pool_stats = []
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            pool_stats.append({
+                'host': pool.host,
+                'port': pool.port,
+                'idleConnections': pool.pool.qsize() if pool.pool else 0,
+                'connectionsOpened': pool.num_connections
+            })
+        with self._lock:
+            counters = {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures
+            }
+        return {
+            'baseUrl': self.base_url,
+            'poolSize': self.pool_size,
+            'connectTimeout': self.timeout[0],
+            'readTimeout': self.timeout[1],
+            'maxRetries': self.max_retries,
+            **counters,
+            'pools': pool_stats,
+            'breaker': self.breaker.stats()
+        }
+
+
+class UpstreamPool:
+    """Registry of pooled upstream hosts, configured from environment variables
+
+    Per-host settings use the upper-cased host name as prefix, falling back
+    to the global HTTP_* defaults, e.g. NEWRELIC_POOL_SIZE, HTTP_POOL_SIZE.
+    """
+
+    def __init__(self, hosts):
+        self.hosts = {}
+        for name, base_url in hosts.items():
+            self.hosts[name] = self._build_host(name, base_url)
+
+    @staticmethod
+    def _build_host(name, base_url):
+        prefix = name.upper()
+
+        def setting(key, default, parse):
+            return parse(f"{prefix}_{key}", os.getenv(f"HTTP_{key}", default))
+
+        breaker = CircuitBreaker(
+            failure_threshold=setting('BREAKER_THRESHOLD', 5, _env_int),
+            reset_timeout=setting('BREAKER_RESET_TIMEOUT', 30.0, _env_float)
+        )
+        return UpstreamHost(
+            name,
+            base_url,
+            pool_size=setting('POOL_SIZE', 10, _env_int),
+            connect_timeout=setting('CONNECT_TIMEOUT', 2.0, _env_float),
+            read_timeout=setting('READ_TIMEOUT', 10.0, _env_float),
+            max_retries=setting('MAX_RETRIES', 2, _env_int),
+            backoff_base=setting('BACKOFF_BASE', 0.2, _env_float),
+            backoff_max=setting('BACKOFF_MAX', 2.0, _env_float),
+            breaker=breaker
+        )
+
+    def __getitem__(self, name):
+        return self.hosts[name]
+
+    def close(self):
+        """Close every pooled keep-alive connection"""
+        for host in self.hosts.values():
+            if host._session is not None:
+                host._session.close()
+
+    def stats(self):
+        return {name: host.stats() for name, host in self.hosts.items()}
@@ -0,0 +1,457 @@
+"""
+Streaming Ingestion
+Long-running mode that diagnoses errors as they arrive instead of on demand.
+Events flow through a generator pipeline (parse -> fingerprint -> window ->
+categorize -> enrich) with bounded memory, and diagnostics are written as
+NDJSON with occurrence counts over a sliding window.
+
+Sources:
+    file:PATH        tail an NDJSON file (follows appends and rotation; file:- reads stdin)
+    unix:PATH        listen on a Unix socket for NDJSON lines
+    tcp:HOST:PORT    listen on a TCP socket for NDJSON lines
+    newrelic         poll New Relic MCP /api/errors, emitting only new occurrences
+
+Usage:
+    python ingest.py file:./logs/errors.ndjson --window 300 --output diagnostics.ndjson
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app import DiagnosticsEngine, job_queue, solution_job, upstreams
+from fingerprint import fingerprint_error
+from shared.jobqueue import SOLUTIONS_QUEUE
+
+INGEST_WINDOW = float(os.getenv('INGEST_WINDOW', '300'))
+INGEST_EMIT_INTERVAL = float(os.getenv('INGEST_EMIT_INTERVAL', '30'))
+INGEST_POLL_INTERVAL = float(os.getenv('INGEST_POLL_INTERVAL', '5'))
+INGEST_MAX_KEYS = int(os.getenv('INGEST_MAX_KEYS', '10000'))
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '1000'))
+
+# Number of buckets the sliding window is divided into
+WINDOW_BUCKETS = 12
+# Seconds between scans for suppressed counts that are due to be reported
+FLUSH_INTERVAL = 1.0
+
+# Sources yield TICK while idle so time-based stages still run
+TICK = None
+
+
+# -- Sources (each yields raw NDJSON lines or already-decoded events) --------
+
+def tail_file(path, follow=True, from_start=False, poll_interval=0.5, stop=None):
+    """Yield lines appended to path, reopening it when it is rotated or truncated"""
+    if path == '-':
+        yield from sys.stdin
+        return
+
+    handle = None
+    inode = None
+    pending = b''
+    while stop is None or not stop.is_set():
+        if handle is None:
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                # Everything in a file created after we started is new
+                from_start = True
+                time.sleep(poll_interval)
+                continue
+            inode = os.fstat(handle.fileno()).st_ino
+            if not from_start:
+                handle.seek(0, os.SEEK_END)
+            # A rotated-in file is always read from its start
+            from_start = True
+            pending = b''
+
+        line = handle.readline()
+        if line.endswith(b'\n'):
+            yield (pending + line).decode('utf-8', errors='replace')
+            pending = b''
+            continue
+        # Keep a partial line until the writer finishes it
+        pending += line
+        if not follow:
+            # Nobody will finish it: the file's last line has no newline
+            if pending:
+                yield pending.decode('utf-8', errors='replace')
+            break
+
+        time.sleep(poll_interval)
+        yield TICK
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_ino != inode or stat.st_size < handle.tell():
+            handle.close()
+            handle = None
+    if handle is not None:
+        handle.close()
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            # Blocks when the pipeline falls behind, pushing back on the sender
+            self.server.lines.put(line.decode('utf-8', errors='replace'))
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def listen_socket(address, stop=None, queue_size=INGEST_QUEUE_SIZE):
+    """Yield NDJSON lines sent by any number of clients to a Unix path or (host, port)"""
+    if isinstance(address, tuple):
+        server = _ThreadingTCPServer(address, _LineHandler)
+    else:
+        if os.path.exists(address):
+            os.unlink(address)
+        server = _ThreadingUnixServer(address, _LineHandler)
+    server.lines = queue.Queue(maxsize=queue_size)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                yield server.lines.get(timeout=0.5)
+            except queue.Empty:
+                yield TICK
+    finally:
+        server.shutdown()
+        server.server_close()
+        if not isinstance(address, tuple) and os.path.exists(address):
+            os.unlink(address)
+
+
+def poll_newrelic(interval=INGEST_POLL_INTERVAL, stop=None, max_tracked=INGEST_MAX_KEYS):
+    """Poll /api/errors and yield an event per new occurrence since the last poll
+
+    The cursor is the last occurrence count seen per error id; each yielded
+    event carries only the delta in occurrenceCount. The cursor is bounded
+    to the max_tracked most recently changed ids.
+    """
+    cursor = OrderedDict()
+    since = None
+    while stop is None or not stop.is_set():
+        try:
+            params = {'since': since} if since else None
+            response = upstreams['newrelic'].get('/api/errors', params=params)
+            errors = response.json().get('errors', []) if response.status_code == 200 else []
+        except Exception as e:
+            print(f"Error polling New Relic: {e}", file=sys.stderr)
+            errors = []
+
+        for error_data in errors:
+            error_id = error_data.get('id') or error_data.get('transactionId')
+            count = error_data.get('occurrenceCount') or 1
+            seen = cursor.get(error_id, 0)
+            if count > seen:
+                cursor[error_id] = count
+                cursor.move_to_end(error_id)
+                yield {**error_data, 'occurrenceCount': count - seen}
+            last = error_data.get('lastOccurrence')
+            if last and (since is None or last > since):
+                since = last
+        while len(cursor) > max_tracked:
+            cursor.popitem(last=False)
+
+        if stop is not None:
+            stop.wait(interval)
+        else:
+            time.sleep(interval)
+        yield TICK
+
+
+# -- Pipeline stages ---------------------------------------------------------
+
+class IngestStats:
+    def __init__(self):
+        self.lines = 0
+        self.malformed = 0
+        self.events = 0
+        self.occurrences = 0
+        self.emitted = 0
+        self.suppressed = 0
+        self.flushed = 0
+        self.started = time.monotonic()
+
+    def to_dict(self):
+        return {
+            'lines': self.lines,
+            'malformed': self.malformed,
+            'events': self.events,
+            'occurrences': self.occurrences,
+            'emitted': self.emitted,
+            'suppressed': self.suppressed,
+            'flushed': self.flushed,
+            'uptimeSeconds': round(time.monotonic() - self.started, 1)
+        }
+
+
+def parse_events(items, stats):
+    """Decode NDJSON lines into error events, skipping blank and malformed lines"""
+    for item in items:
+        if item is TICK:
+            yield TICK
+            continue
+        if isinstance(item, dict):
+            event = item
+        else:
+            stats.lines += 1
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                event = json.loads(item)
+            except ValueError:
+                stats.malformed += 1
+                continue
+        if not isinstance(event, dict) or not isinstance(event.get('error'), dict):
+            stats.malformed += 1
+            continue
+        stats.events += 1
+        yield event
+
+
+def fingerprint_events(events):
+    for event in events:
+        yield TICK if event is TICK else (fingerprint_error(event), event)
+
+
+class _WindowEntry:
+    __slots__ = ('buckets', 'total', 'events', 'last_emitted')
+
+    def __init__(self):
+        self.buckets = deque()  # [bucket index, occurrences, events]
+        self.total = 0
+        self.events = 0
+        self.last_emitted = None
+
+
+class WindowedCounter:
+    """Per-fingerprint occurrence counts over a sliding window
+
+    The window is split into WINDOW_BUCKETS buckets, so memory per key is
+    constant; keys whose window has emptied, and the least recently seen
+    keys beyond max_keys, are dropped.
+    """
+
+    def __init__(self, window=INGEST_WINDOW, max_keys=INGEST_MAX_KEYS, clock=time.monotonic):
+        self.window = window
+        self.bucket_width = window / WINDOW_BUCKETS
+        self.max_keys = max_keys
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.evicted = 0
+
+    def _expire(self, entry, bucket):
+        oldest = bucket - WINDOW_BUCKETS + 1
+        while entry.buckets and entry.buckets[0][0] < oldest:
+            _, occurrences, events = entry.buckets.popleft()
+            entry.total -= occurrences
+            entry.events -= events
+
+    def add(self, key, occurrences=1):
+        """Record occurrences for key; returns its entry"""
+        bucket = int(self.clock() // self.bucket_width)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = _WindowEntry()
+        else:
+            self.entries.move_to_end(key)
+            self._expire(entry, bucket)
+        if entry.buckets and entry.buckets[-1][0] == bucket:
+            entry.buckets[-1][1] += occurrences
+            entry.buckets[-1][2] += 1
+        else:
+            entry.buckets.append([bucket, occurrences, 1])
+        entry.total += occurrences
+        entry.events += 1
+
+        while len(self.entries) > self.max_keys:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+        return entry
+
+    def current(self, key):
+        """The entry for key with expired buckets dropped, or None if it was evicted"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._expire(entry, int(self.clock() // self.bucket_width))
+        return entry
+
+    def sweep(self):
+        """Drop keys with nothing left in the window"""
+        bucket = int(self.clock() // self.bucket_width)
+        for key in list(self.entries):
+            entry = self.entries[key]
+            self._expire(entry, bucket)
+            if not entry.buckets:
+                del self.entries[key]
+
+    def stats(self):
+        return {'windowSeconds': self.window, 'trackedFingerprints': len(self.entries),
+                'evicted': self.evicted}
+
+
+def window_events(fingerprinted, counter, stats, emit_interval=INGEST_EMIT_INTERVAL):
+    """Count each event in the window and pass on those due for a diagnostic
+
+    A fingerprint is emitted when first seen and then at most once per
+    emit_interval, so a burst produces one diagnostic with a rising count
+    rather than one per event. Suppressed events are reported by the next
+    diagnostic for their fingerprint: a later event, or a flush of the
+    latest suppressed event once emit_interval has passed. The flush also
+    runs at the end of the stream, so a burst that stops still reports its
+    final count.
+    """
+    last_sweep = last_flush = counter.clock()
+    # Latest suppressed event per fingerprint not yet covered by a diagnostic
+    unreported = OrderedDict()
+
+    def flush(now, force=False):
+        for fingerprint, event in list(unreported.items()):
+            entry = counter.current(fingerprint)
+            if entry is None:
+                # Evicted beyond max_keys; counted in the window stats
+                del unreported[fingerprint]
+            elif force or now - entry.last_emitted >= emit_interval:
+                del unreported[fingerprint]
+                entry.last_emitted = now
+                stats.flushed += 1
+                yield fingerprint, event, entry.total, entry.events
+
+    for item in fingerprinted:
+        now = counter.clock()
+        if item is not TICK:
+            fingerprint, event = item
+            occurrences = event.get('occurrenceCount') or 1
+            stats.occurrences += occurrences
+            entry = counter.add(fingerprint, occurrences)
+            if entry.last_emitted is not None and now - entry.last_emitted < emit_interval:
+                stats.suppressed += 1
+                unreported[fingerprint] = event
+            else:
+                unreported.pop(fingerprint, None)
+                entry.last_emitted = now
+                yield fingerprint, event, entry.total, entry.events
+        if unreported and now - last_flush >= FLUSH_INTERVAL:
+            yield from flush(now)
+            last_flush = now
+        if now - last_sweep >= counter.bucket_width:
+            counter.sweep()
+            last_sweep = now
+    yield from flush(counter.clock(), force=True)
+
+
+def categorize_events(windowed, engine):
+    for fingerprint, event, occurrences, events in windowed:
+        error = event.get('error', {})
+        category = engine.categorize_error(error.get('type', ''), error.get('message', ''))
+        yield event, category, occurrences, events
+
+
+def enrich_events(categorized, engine, window):
+    for event, category, occurrences, events in categorized:
+        diagnostic = engine.analyze_error_context(event, category=category)
+        diagnostic['context']['windowSeconds'] = window
+        diagnostic['context']['windowOccurrences'] = occurrences
+        diagnostic['context']['windowEvents'] = events
+        yield event, diagnostic
+
+
+def run_pipeline(source, engine=None, window=INGEST_WINDOW, emit_interval=INGEST_EMIT_INTERVAL,
+                 max_keys=INGEST_MAX_KEYS, stats=None):
+    """Compose the stages over a source; yields (event, diagnostic) as they are ready"""
+    engine = engine or DiagnosticsEngine()
+    stats = stats or IngestStats()
+    counter = WindowedCounter(window, max_keys)
+    events = parse_events(source, stats)
+    fingerprinted = fingerprint_events(events)
+    windowed = window_events(fingerprinted, counter, stats, emit_interval)
+    categorized = categorize_events(windowed, engine)
+    for event, diagnostic in enrich_events(categorized, engine, window):
+        stats.emitted += 1
+        yield event, diagnostic
+
+
+def open_source(spec, stop, from_start=False, follow=True, poll_interval=INGEST_POLL_INTERVAL):
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        return tail_file(target, follow=follow, from_start=from_start, stop=stop)
+    if kind == 'unix':
+        return listen_socket(target, stop=stop)
+    if kind == 'tcp':
+        host, _, port = target.rpartition(':')
+        return listen_socket((host or '127.0.0.1', int(port)), stop=stop)
+    if kind == 'newrelic':
+        return poll_newrelic(poll_interval, stop=stop)
+    raise ValueError(f"Unknown source: {spec}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diagnose errors continuously from a stream')
+    parser.add_argument('source', help='file:PATH, unix:PATH, tcp:HOST:PORT or newrelic')
+    parser.add_argument('--output', default='-', help='NDJSON output file (default stdout)')
+    parser.add_argument('--window', type=float, default=INGEST_WINDOW,
+                        help='sliding window for occurrence counts, in seconds')
+    parser.add_argument('--emit-interval', type=float, default=INGEST_EMIT_INTERVAL,
+                        help='minimum seconds between diagnostics for one fingerprint')
+    parser.add_argument('--poll-interval', type=float, default=INGEST_POLL_INTERVAL)
+    parser.add_argument('--from-start', action='store_true',
+                        help='read an existing file from the beginning instead of its end')
+    parser.add_argument('--no-follow', action='store_true',
+                        help='stop at the end of the file instead of tailing it')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='also queue each diagnostic for LLM2 (requires JOB_QUEUE_PATH)')
+    args = parser.parse_args(argv)
+    if args.enqueue and job_queue is None:
+        parser.error('--enqueue requires JOB_QUEUE_PATH')
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    source = open_source(args.source, stop, from_start=args.from_start,
+                         follow=not args.no_follow, poll_interval=args.poll_interval)
+    stats = IngestStats()
+    output = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    try:
+        for event, diagnostic in run_pipeline(source, window=args.window,
+                                              emit_interval=args.emit_interval, stats=stats):
+            line = {
+                'success': True,
+                'transactionId': event.get('transactionId'),
+                'scopeId': event.get('scopeId'),
+                'diagnostic': diagnostic
+            }
+            if args.enqueue:
+                line['jobId'] = job_queue.enqueue(SOLUTIONS_QUEUE, solution_job(event, diagnostic))
+            output.write(json.dumps(line) + '\n')
+            output.flush()
+            if stop.is_set():
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if output is not sys.stdout:
+            output.close()
+        print(json.dumps({'summary': stats.to_dict()}), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
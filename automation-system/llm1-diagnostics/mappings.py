@@ -0,0 +1,319 @@
+"""
+Mapping Store
+Indexed role-instance -> pipeline and service -> repository lookups loaded
+from a JSON file, SQLite database or compiled index, hot-reloaded when the
+source changes. The index is built on first lookup, not at import.
+
+Build a SQLite store or a compiled index (mmap-loaded, no rebuild at
+startup) from JSON with:
+    python mappings.py build-sqlite mappings.json mappings.db
+    python mappings.py build-index mappings.json mappings.idx
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+if __name__ == '__main__':
+    # Shared Python modules live in automation-system/shared
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.artifacts import is_artifact, read_artifact, write_artifact  # noqa: E402
+
+DEFAULT_MAPPINGS_PATH = os.path.join(os.path.dirname(__file__), 'mappings.json')
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+SQLITE_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS role_instances ('
+    ' role_instance TEXT PRIMARY KEY, pipeline_id TEXT, pipeline_name TEXT,'
+    ' build_number TEXT, repository TEXT)',
+    'CREATE TABLE IF NOT EXISTS services ('
+    ' service TEXT PRIMARY KEY, repository TEXT NOT NULL, position INTEGER NOT NULL)'
+)
+
+
+class SubstringIndex:
+    """Aho-Corasick automaton over service names
+
+    find_first(text) returns the value of the earliest-registered name that
+    occurs anywhere in text, in O(len(text) + matches) regardless of how
+    many names are indexed.
+    """
+
+    def __init__(self, names):
+        # names: iterable of (name, rank, value); lower rank wins
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]  # best (rank, value) ending at this state, incl. via fail links
+        for name, rank, value in names:
+            self._add(name, rank, value)
+        self._build()
+
+    def _add(self, name, rank, value):
+        state = 0
+        for char in name:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+            state = next_state
+        if self.output[state] is None or rank < self.output[state][0]:
+            self.output[state] = (rank, value)
+
+    def to_state(self):
+        return {'goto': self.goto, 'fail': self.fail, 'output': self.output}
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls.__new__(cls)
+        index.goto = state['goto']
+        index.fail = state['fail']
+        index.output = state['output']
+        return index
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                inherited = self.output[self.fail[child]]
+                if inherited is not None and (self.output[child] is None
+                                              or inherited[0] < self.output[child][0]):
+                    self.output[child] = inherited
+
+    def find_first(self, text):
+        goto, fail, output = self.goto, self.fail, self.output
+        best = None
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = output[state]
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+                if best[0] == 0:
+                    break
+        return best[1] if best else None
+
+
+class MappingIndex:
+    """An immutable, fully indexed snapshot of the mappings"""
+
+    def __init__(self, role_instances, services):
+        self.role_instances = dict(role_instances)
+        # services: ordered list of (service, repository); earlier entries win
+        self.services_exact = {}
+        for service, repository in services:
+            self.services_exact.setdefault(service.lower(), repository)
+        self.services = SubstringIndex(
+            (service.lower(), rank, repository)
+            for rank, (service, repository) in enumerate(services)
+        )
+        self.service_count = len(services)
+
+    def to_state(self):
+        return {
+            'roleInstances': self.role_instances,
+            'servicesExact': self.services_exact,
+            'services': self.services.to_state(),
+            'serviceCount': self.service_count
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an index from to_state() without re-running the automaton construction"""
+        index = cls.__new__(cls)
+        index.role_instances = state['roleInstances']
+        index.services_exact = state['servicesExact']
+        index.services = SubstringIndex.from_state(state['services'])
+        index.service_count = state['serviceCount']
+        return index
+
+    def pipeline_for(self, role_instance):
+        return self.role_instances.get(role_instance)
+
+    def repository_for(self, service_name):
+        service_name = (service_name or '').lower()
+        repository = self.services_exact.get(service_name)
+        if repository is None:
+            repository = self.services.find_first(service_name)
+        return repository
+
+
+def load_json(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('roleInstances', {}), list(data.get('services', {}).items())
+
+
+def load_sqlite(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        role_instances = {
+            row[0]: {
+                'pipelineId': row[1],
+                'pipelineName': row[2],
+                'buildNumber': row[3],
+                'repository': row[4]
+            }
+            for row in conn.execute(
+                'SELECT role_instance, pipeline_id, pipeline_name, build_number, repository'
+                ' FROM role_instances')
+        }
+        services = list(conn.execute(
+            'SELECT service, repository FROM services ORDER BY position'))
+    finally:
+        conn.close()
+    return role_instances, services
+
+
+def build_sqlite(json_path, db_path):
+    """Write the mappings from a JSON file into a SQLite store"""
+    role_instances, services = load_json(json_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        for statement in SQLITE_SCHEMA:
+            conn.execute(statement)
+        conn.execute('DELETE FROM role_instances')
+        conn.execute('DELETE FROM services')
+        conn.executemany(
+            'INSERT INTO role_instances VALUES (?, ?, ?, ?, ?)',
+            [(name, info.get('pipelineId'), info.get('pipelineName'),
+              info.get('buildNumber'), info.get('repository'))
+             for name, info in role_instances.items()]
+        )
+        conn.executemany(
+            'INSERT INTO services VALUES (?, ?, ?)',
+            [(service, repository, position)
+             for position, (service, repository) in enumerate(services)]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_source(path):
+    """(role instances, services) from a JSON file or SQLite store"""
+    if path.endswith(SQLITE_SUFFIXES):
+        return load_sqlite(path)
+    return load_json(path)
+
+
+def build_index(source_path, index_path):
+    """Compile the mappings from a JSON file or SQLite store into an index artifact"""
+    write_artifact(index_path, 'mappings', MappingIndex(*load_source(source_path)).to_state())
+
+
+class MappingStore:
+    """Serves lookups from the current MappingIndex and swaps in a new one
+    when the source file's mtime changes (checked at most every
+    reload_interval seconds, on access)
+    """
+
+    def __init__(self, path, reload_interval=5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.on_reload = []
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._index = None
+
+    @property
+    def index(self):
+        """The current MappingIndex, loaded on first use"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._checked_at = time.monotonic()
+                    self._index = self._load()
+        return self._index
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if is_artifact(self.path):
+            index = MappingIndex.from_state(read_artifact(self.path, 'mappings'))
+        else:
+            index = MappingIndex(*load_source(self.path))
+        self._mtime = mtime
+        return index
+
+    def _maybe_reload(self):
+        if self._index is None:
+            # Not loaded yet: the first lookup loads it through .index
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime_ns == self._mtime:
+                    return
+                self._index = self._load()
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"Error reloading mappings from {self.path}: {e}")
+                return
+            self.reloads += 1
+        for callback in self.on_reload:
+            callback()
+
+    def reload(self):
+        """Force a reload from the source"""
+        self._checked_at = 0.0
+        self._mtime = None
+        self._maybe_reload()
+
+    def pipeline_for(self, role_instance):
+        self._maybe_reload()
+        return self.index.pipeline_for(role_instance)
+
+    def repository_for(self, service_name):
+        self._maybe_reload()
+        return self.index.repository_for(service_name)
+
+    def stats(self):
+        index = self._index
+        return {
+            'source': self.path,
+            'loaded': index is not None,
+            'roleInstances': len(index.role_instances) if index else None,
+            'services': index.service_count if index else None,
+            'reloads': self.reloads
+        }
+
+
+def open_store():
+    """Open the store at MAPPINGS_PATH (JSON, SQLite or compiled index), or the bundled JSON"""
+    return MappingStore(
+        os.getenv('MAPPINGS_PATH', DEFAULT_MAPPINGS_PATH),
+        reload_interval=float(os.getenv('MAPPINGS_RELOAD_INTERVAL', '5'))
+    )
+
+
+if __name__ == '__main__':
+    commands = {'build-sqlite': build_sqlite, 'build-index': build_index}
+    if len(sys.argv) != 4 or sys.argv[1] not in commands:
+        print('Usage: python mappings.py build-sqlite <mappings.json> <mappings.db>\n'
+              '       python mappings.py build-index <mappings.json|.db> <mappings.idx>')
+        sys.exit(1)
+    commands[sys.argv[1]](sys.argv[2], sys.argv[3])
+    print(f"Wrote {sys.argv[3]}")
@@ -0,0 +1,122 @@
+"""
+Stack Trace Parser
+Precompiled per-language frame patterns (JavaScript/TypeScript, Python, Java)
+with application-frame filtering and memoization of repeated traces
+"""
+import re
+from functools import lru_cache
+
+# Patterns start with a literal ("at ", 'File "') so the regex engine can skip
+# ahead to candidate frames, and reject library/runtime frames with a
+# lookahead instead of materializing them.
+
+# "at fn (/app/src/api/users.js:11:51)" or "at /app/src/api/users.js:11:51"
+JS_FRAME = re.compile(
+    r'at (?![^\n]*node_modules/)(?![^\n(]*\((?:node|internal)[:/])(?!(?:node|internal)[:/])'
+    r'(?:(?P<function>[^\n(]+) \()?'
+    r'(?P<file>(?:file://)?[^\s():]+\.(?:[cm]?js|jsx|[cm]?ts|tsx)):(?P<line>\d+)(?::(?P<column>\d+))?'
+)
+
+# 'File "/app/src/service.py", line 42, in handler'
+PYTHON_FRAME = re.compile(
+    r'File "(?![^"\n]*(?:site-packages/|dist-packages/|/lib/python|<frozen))'
+    r'(?P<file>[^"\n]+)", line (?P<line>\d+)(?:, in (?P<function>\S+))?'
+)
+
+# "at com.company.UserService.getUser(UserService.java:42)"
+JAVA_FRAME = re.compile(
+    r'at (?!(?:java|javax|jdk|sun|kotlin|scala)\.|org\.springframework\.|org\.apache\.)'
+    r'(?P<function>[\w$.<>]+)\((?P<file>[\w$]+\.(?:java|kt|scala)):(?P<line>\d+)\)'
+)
+
+# (language, pattern, substrings one of which must appear for the pattern to run)
+FRAME_PATTERNS = (
+    ('javascript', JS_FRAME, ('js:', 'ts:', 'sx:')),
+    ('python', PYTHON_FRAME, ('File "',)),
+    ('java', JAVA_FRAME, ('.java:', '.kt:', '.scala:'))
+)
+
+TRACE_CACHE_SIZE = 4096
+
+
+class Frame:
+    """One parsed stack frame"""
+
+    __slots__ = ('file', 'line', 'column', 'function', 'language')
+
+    def __init__(self, file, line, column=None, function=None, language=None):
+        self.file = file
+        self.line = line
+        self.column = column
+        self.function = function
+        self.language = language
+
+    def to_dict(self):
+        return {
+            'file': self.file,
+            'line': self.line,
+            'column': self.column,
+            'function': self.function,
+            'language': self.language
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Frame):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, slot) for slot in self.__slots__))
+
+    def __repr__(self):
+        return f"Frame({self.file}:{self.line} in {self.function or '<anonymous>'})"
+
+
+def normalize_path(file_path):
+    """Strip container prefixes so paths are relative to the repository root"""
+    if file_path.startswith('file://'):
+        file_path = file_path[len('file://'):]
+    if '/app/' in file_path:
+        return file_path.rsplit('/app/', 1)[-1]
+    return file_path
+
+
+@lru_cache(maxsize=TRACE_CACHE_SIZE)
+def parse_stack_trace(stack_trace):
+    """Parse a stack trace into a tuple of application Frames, outermost last
+
+    Results are memoized by trace, so identical traces are parsed once.
+    """
+    if not stack_trace:
+        return ()
+
+    matches = []
+    for language, pattern, markers in FRAME_PATTERNS:
+        if any(marker in stack_trace for marker in markers):
+            matches.extend((match.start(), language, match)
+                           for match in pattern.finditer(stack_trace))
+    if len(matches) > 1:
+        matches.sort(key=lambda item: item[0])
+
+    frames = []
+    for _, language, match in matches:
+        function = match.group('function')
+        column = match.group('column') if language == 'javascript' else None
+        frames.append(Frame(
+            normalize_path(match.group('file')),
+            int(match.group('line')),
+            int(column) if column else None,
+            function.strip() if function else None,
+            language
+        ))
+
+    # Python prints the innermost frame last; report innermost first like JS/Java
+    if frames and all(frame.language == 'python' for frame in frames):
+        frames.reverse()
+    return tuple(frames)
+
+
+def top_application_frame(stack_trace):
+    """Return the innermost application Frame, or None"""
+    frames = parse_stack_trace(stack_trace)
+    return frames[0] if frames else None
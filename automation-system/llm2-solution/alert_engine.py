@@ -0,0 +1,399 @@
+"""
+Adaptive Alert Engine
+Streaming statistics per error fingerprint and per container, used to derive
+alert thresholds and the CODE_FIX vs ALERT_SUGGESTION decision from observed
+traffic instead of fixed numbers.
+
+Each series is one row of fixed-size NumPy arrays (O(1) memory per series):
+  - fast and slow exponentially decayed occurrence rates (events/second)
+    and the variance of the fast rate around the slow one
+  - a log-bucketed (HDR-style) histogram of durations parsed from error
+    messages ("timeout after 5000ms"), for p50/p95/p99
+  - a 64-bit bitmap estimating distinct containers (linear counting)
+
+observe() updates one row in O(1). Derived values (decayed rates, hourly
+thresholds, burst flags, quantiles, the fleet-wide sustained-rate cutoff)
+are recomputed for all rows at once with vectorized NumPy, at most every
+ALERT_RECOMPUTE_INTERVAL seconds, by the first request that finds them stale.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+
+from shared.lazy import LazyModule
+
+# Imported when the series tables are first allocated
+np = LazyModule('numpy')
+
+ALERT_FAST_WINDOW = float(os.getenv('ALERT_FAST_WINDOW', 300))
+ALERT_SLOW_WINDOW = float(os.getenv('ALERT_SLOW_WINDOW', 3600))
+ALERT_BURST_FACTOR = float(os.getenv('ALERT_BURST_FACTOR', 3.0))
+ALERT_MIN_OCCURRENCES = int(os.getenv('ALERT_MIN_OCCURRENCES', 10))
+ALERT_MAX_SERIES = int(os.getenv('ALERT_MAX_SERIES', 4096))
+ALERT_RECOMPUTE_INTERVAL = float(os.getenv('ALERT_RECOMPUTE_INTERVAL', 15))
+
+# Duration histogram: bucket i starts at 2 ** (i / 4) ms (~19% resolution, up to ~4.6 h)
+BUCKETS_PER_DOUBLING = 4
+DURATION_BUCKETS = 96
+QUANTILES = (0.50, 0.95, 0.99)
+
+# Hourly thresholds sit this many standard deviations above the slow rate
+THRESHOLD_SIGMAS = 3.0
+# A burst needs at least this many events in the fast window
+MIN_BURST_EVENTS = 5.0
+# Fingerprints above this quantile of the fleet's slow rates are "sustained"
+SUSTAINED_QUANTILE = 0.90
+
+DURATION_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(ms|milliseconds?|s|secs?|seconds?)\b', re.IGNORECASE)
+
+# Categories whose fix is always in code, or always operational
+CODE_CATEGORIES = ('NULL_REFERENCE', 'UNHANDLED_PROMISE', 'MATH_ERROR')
+OPERATIONAL_CATEGORIES = ('TIMEOUT', 'RESOURCE_LEAK')
+
+
+def parse_duration_ms(message):
+    """First duration mentioned in an error message, in milliseconds, or None"""
+    match = DURATION_PATTERN.search(message or '')
+    if not match:
+        return None
+    value = float(match.group(1))
+    return value if match.group(2).lower().startswith('m') else value * 1000
+
+
+def duration_bucket(duration_ms):
+    if duration_ms <= 1:
+        return 0
+    return min(int(math.log2(duration_ms) * BUCKETS_PER_DOUBLING), DURATION_BUCKETS - 1)
+
+
+@lru_cache(maxsize=1)
+def bucket_mid_ms():
+    """Geometric midpoint (ms) of each bucket, reported as the quantile value (within ~9%)"""
+    return np.exp2((np.arange(DURATION_BUCKETS) + 0.5) / BUCKETS_PER_DOUBLING)
+
+
+def decayed_contribution(occurrences, span, window):
+    """Decayed-rate contribution of occurrences spread evenly over the last span seconds"""
+    if span <= 0:
+        return occurrences / window
+    return occurrences / span * (1 - math.exp(-span / window))
+
+
+def series_key(diagnostic):
+    """Fingerprint series a diagnostic belongs to"""
+    context = diagnostic.get('context', {})
+    return context.get('fingerprint') or (
+        f"{diagnostic.get('error', {}).get('category')}:{diagnostic.get('source', {}).get('file')}")
+
+
+def parse_timestamp(value, default):
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return default
+
+
+class SeriesTable:
+    """Fixed-capacity struct-of-arrays of streaming statistics, LRU-evicted by key"""
+
+    def __init__(self, capacity=ALERT_MAX_SERIES, fast_window=ALERT_FAST_WINDOW,
+                 slow_window=ALERT_SLOW_WINDOW):
+        self.capacity = capacity
+        self.fast_window = fast_window
+        self.slow_window = slow_window
+        self.rows = OrderedDict()  # key -> row, least recently updated first
+        self.free = list(range(capacity - 1, -1, -1))
+        self.fast = np.zeros(capacity)
+        self.slow = np.zeros(capacity)
+        self.variance = np.zeros(capacity)
+        self.updated = np.zeros(capacity)
+        self.total = np.zeros(capacity)
+        self.observations = np.zeros(capacity, dtype=np.int64)
+        self.containers = np.zeros(capacity, dtype=np.uint64)
+        self.histogram = np.zeros((capacity, DURATION_BUCKETS), dtype=np.uint32)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Derived by recompute()
+        self.fast_now = np.zeros(capacity)
+        self.slow_now = np.zeros(capacity)
+        self.hourly_threshold = np.zeros(capacity)
+        self.bursting = np.zeros(capacity, dtype=bool)
+        self.quantiles = np.full((capacity, len(QUANTILES)), np.nan)
+        self.distinct_containers = np.zeros(capacity)
+        self.evictions = 0
+
+    def _row(self, key):
+        row = self.rows.get(key)
+        if row is not None:
+            self.rows.move_to_end(key)
+            return row
+        if self.free:
+            row = self.free.pop()
+        else:
+            _, row = self.rows.popitem(last=False)
+            self.evictions += 1
+        self.rows[key] = row
+        self._reset(row)
+        return row
+
+    def _reset(self, row):
+        for array in (self.fast, self.slow, self.variance, self.updated, self.total,
+                      self.fast_now, self.slow_now, self.hourly_threshold, self.distinct_containers):
+            array[row] = 0
+        self.observations[row] = 0
+        self.containers[row] = 0
+        self.histogram[row] = 0
+        self.bursting[row] = False
+        self.quantiles[row] = np.nan
+        self.active[row] = True
+
+    def observe(self, key, occurrences, at, duration_ms=None, container=None, span=0.0):
+        """Fold occurrences seen at time ``at`` into the series for key
+
+        span spreads them evenly over the preceding seconds (a record's
+        first-to-last occurrence), so a long-lived error seen for the first
+        time does not look like a burst.
+        """
+        row = self._row(key)
+        if self.observations[row]:
+            elapsed = max(at - self.updated[row], 0.0)
+            fast = self.fast[row] * math.exp(-elapsed / self.fast_window)
+            slow = self.slow[row] * math.exp(-elapsed / self.slow_window)
+        else:
+            elapsed, fast, slow = 0.0, 0.0, 0.0
+        fast += decayed_contribution(occurrences, span, self.fast_window)
+        slow += decayed_contribution(occurrences, span, self.slow_window)
+        # Exponentially weighted variance of the short-term rate around the long-term one
+        weight = 1 - math.exp(-max(elapsed, 1.0) / self.slow_window)
+        deviation = fast - slow
+        self.variance[row] = (1 - weight) * (self.variance[row] + weight * deviation * deviation)
+        self.fast[row] = fast
+        self.slow[row] = slow
+        self.updated[row] = max(at, self.updated[row])
+        self.total[row] += occurrences
+        self.observations[row] += 1
+        if duration_ms is not None:
+            self.histogram[row, duration_bucket(duration_ms)] += 1
+        if container:
+            bit = int.from_bytes(hashlib.blake2b(container.encode('utf-8'),
+                                                 digest_size=1).digest(), 'big') % 64
+            self.containers[row] |= np.uint64(1 << bit)
+        return row
+
+    def recompute(self, now):
+        """Vectorized refresh of every derived value; returns the number of live series"""
+        active = self.active
+        age = np.maximum(now - self.updated, 0.0)
+        self.fast_now = np.where(active, self.fast * np.exp(-age / self.fast_window), 0.0)
+        self.slow_now = np.where(active, self.slow * np.exp(-age / self.slow_window), 0.0)
+        spread = np.sqrt(self.variance)
+        self.hourly_threshold = np.ceil((self.slow_now + THRESHOLD_SIGMAS * spread) * 3600)
+        floor = MIN_BURST_EVENTS / self.fast_window
+        self.bursting = active & (self.fast_now >= floor) & (
+            self.fast_now > ALERT_BURST_FACTOR * self.slow_now)
+
+        counts = self.histogram.astype(np.float64)
+        totals = counts.sum(axis=1)
+        cumulative = np.cumsum(counts, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for column, quantile in enumerate(QUANTILES):
+                index = (cumulative >= (quantile * totals)[:, None]).argmax(axis=1)
+                self.quantiles[:, column] = np.where(totals > 0, bucket_mid_ms()[index], np.nan)
+
+        # Linear counting over the 64-bit container bitmap
+        bits = np.zeros(self.capacity)
+        masks = self.containers.copy()
+        for _ in range(64):
+            bits += (masks & np.uint64(1)).astype(np.float64)
+            masks >>= np.uint64(1)
+        empty = np.maximum(64 - bits, 0.5)
+        self.distinct_containers = np.where(bits > 0, -64 * np.log(empty / 64), 0.0)
+        return int(active.sum())
+
+    def sustained_cutoff(self):
+        """Slow rate above which a series is among the fleet's noisiest (NaN if none)"""
+        live = self.slow_now[self.active & (self.observations > 0)]
+        return float(np.quantile(live, SUSTAINED_QUANTILE)) if live.size >= 2 else math.nan
+
+    def snapshot(self, key):
+        """Derived statistics for one series as of the last recompute, or None"""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        p50, p95, p99 = (None if math.isnan(value) else round(float(value), 1)
+                         for value in self.quantiles[row])
+        return {
+            'occurrences': int(self.total[row]),
+            'observations': int(self.observations[row]),
+            'ratePerHour': round(float(self.slow_now[row]) * 3600, 2),
+            'recentRatePerHour': round(float(self.fast_now[row]) * 3600, 2),
+            'hourlyThreshold': int(self.hourly_threshold[row]),
+            'bursting': bool(self.bursting[row]),
+            'containers': round(float(self.distinct_containers[row]), 1),
+            'durationMs': {'p50': p50, 'p95': p95, 'p99': p99}
+        }
+
+    def top(self, limit):
+        """Keys of the series with the highest recent rates, bursting first"""
+        keys = list(self.rows)
+        rows = np.fromiter((self.rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        if not len(rows):
+            return []
+        order = np.lexsort((-self.fast_now[rows], ~self.bursting[rows]))[:limit]
+        return [keys[position] for position in order]
+
+
+class AlertEngine:
+    """Per-fingerprint and per-container statistics behind alert decisions"""
+
+    def __init__(self, capacity=ALERT_MAX_SERIES, recompute_interval=ALERT_RECOMPUTE_INTERVAL,
+                 min_occurrences=ALERT_MIN_OCCURRENCES, clock=time.time):
+        self.capacity = capacity
+        self._fingerprints = None
+        self._containers = None
+        self._allocate_lock = threading.Lock()
+        self.recompute_interval = recompute_interval
+        self.min_occurrences = min_occurrences
+        self.clock = clock
+        # Last running occurrenceCount per (fingerprint, container), to turn totals into deltas
+        self._last_counts = OrderedDict()
+        self._lock = threading.Lock()
+        self._recompute_lock = threading.Lock()
+        self.recomputed_at = 0.0
+        self.recompute_ms = 0.0
+        self.sustained_cutoff = math.nan
+        self.observed = 0
+
+    def _allocate(self):
+        """Allocate the series tables (importing numpy) on first use"""
+        with self._allocate_lock:
+            if self._fingerprints is None:
+                self._containers = SeriesTable(self.capacity)
+                self._fingerprints = SeriesTable(self.capacity)
+
+    @property
+    def fingerprints(self):
+        if self._fingerprints is None:
+            self._allocate()
+        return self._fingerprints
+
+    @property
+    def containers(self):
+        if self._fingerprints is None:
+            self._allocate()
+        return self._containers
+
+    def observe(self, diagnostic):
+        """Record a diagnostic's occurrences; returns its fingerprint key"""
+        error = diagnostic.get('error', {})
+        context = diagnostic.get('context', {})
+        fingerprint = series_key(diagnostic)
+        container = context.get('containerName') or ''
+        now = self.clock()
+        at = min(parse_timestamp(context.get('lastOccurrence'), now), now)
+        count = int(context.get('occurrenceCount') or 1)
+        duration_ms = parse_duration_ms(error.get('message'))
+
+        with self._lock:
+            pair = (fingerprint, container)
+            previous = self._last_counts.pop(pair, None)
+            self._last_counts[pair] = count
+            if len(self._last_counts) > 2 * self.capacity:
+                self._last_counts.popitem(last=False)
+            # Same record re-sent: only the growth is new; a lower total is a reset
+            if previous is not None and count >= previous:
+                delta, span = count - previous, 0.0
+            else:
+                first = parse_timestamp(context.get('firstOccurrence'), at)
+                delta, span = count, max(at - first, 0.0)
+            if delta > 0:
+                self.fingerprints.observe(fingerprint, delta, at, duration_ms, container, span)
+                if container:
+                    self.containers.observe(container, delta, at, duration_ms, span=span)
+            self.observed += 1
+        self.maybe_recompute(now)
+        return fingerprint
+
+    def maybe_recompute(self, now=None):
+        now = self.clock() if now is None else now
+        if now - self.recomputed_at < self.recompute_interval:
+            return False
+        # One thread recomputes; the others keep using the previous results
+        if not self._recompute_lock.acquire(blocking=False):
+            return False
+        try:
+            self.recompute(now)
+        finally:
+            self._recompute_lock.release()
+        return True
+
+    def recompute(self, now=None):
+        now = self.clock() if now is None else now
+        started = time.perf_counter()
+        with self._lock:
+            self.fingerprints.recompute(now)
+            self.containers.recompute(now)
+            self.sustained_cutoff = self.fingerprints.sustained_cutoff()
+            self.recomputed_at = now
+        self.recompute_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def statistics(self, fingerprint, container=None):
+        with self._lock:
+            return {
+                'fingerprint': self.fingerprints.snapshot(fingerprint),
+                'container': self.containers.snapshot(container) if container else None
+            }
+
+    def decide(self, category, fingerprint, occurrence_count):
+        """CODE_FIX or ALERT_SUGGESTION, and the reason
+
+        Code-level categories always get a fix and access control always an
+        alert. For operational ones, a burst is treated as an incident (alert);
+        a fingerprint that fires steadily, above most of the fleet and across
+        several containers, is treated as a bug (code fix).
+        """
+        if category in CODE_CATEGORIES:
+            return 'CODE_FIX', 'category'
+        if category == 'ACCESS_CONTROL':
+            return 'ALERT_SUGGESTION', 'category'
+        if category not in OPERATIONAL_CATEGORIES:
+            return 'CODE_FIX', 'category'
+
+        stats = self.statistics(fingerprint)['fingerprint']
+        if stats is None or stats['occurrences'] < self.min_occurrences:
+            # Not enough history yet: the static rule
+            return ('ALERT_SUGGESTION' if occurrence_count < 10 else 'CODE_FIX'), 'default'
+        if stats['bursting']:
+            return 'ALERT_SUGGESTION', 'burst'
+        sustained = (not math.isnan(self.sustained_cutoff)
+                     and stats['ratePerHour'] / 3600 >= self.sustained_cutoff)
+        if sustained and stats['containers'] >= 2:
+            return 'CODE_FIX', 'sustained'
+        return 'ALERT_SUGGESTION', 'rate'
+
+    def top(self, kind='fingerprint', limit=20):
+        table = self.fingerprints if kind == 'fingerprint' else self.containers
+        with self._lock:
+            return [{'key': key, **table.snapshot(key)} for key in table.top(limit)]
+
+    def stats(self):
+        allocated = self._fingerprints is not None
+        return {
+            'fingerprints': len(self.fingerprints.rows) if allocated else 0,
+            'containers': len(self.containers.rows) if allocated else 0,
+            'capacity': self.capacity,
+            'evictions': self.fingerprints.evictions + self.containers.evictions if allocated else 0,
+            'observed': self.observed,
+            'recomputedAt': self.recomputed_at or None,
+            'recomputeMs': self.recompute_ms,
+            'sustainedRatePerHour': (None if math.isnan(self.sustained_cutoff)
+                                     else round(self.sustained_cutoff * 3600, 2))
+        }
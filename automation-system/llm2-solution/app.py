@@ -2,17 +2,58 @@
 LLM2 Solution Generator Layer
 Analyzes errors and generates code fixes or alert suggestions
 """
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import requests
+import math
 import os
+import sys
 from dotenv import load_dotenv
-import json
+
+# Shared Python modules live in automation-system/shared
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solution_cache import SolutionCache, open_solution_cache
+from worker_pool import QueueFullError, open_worker_pool
+from code_context import open_mirror
+from fix_engine import FixEngine
+from alert_engine import AlertEngine, series_key
+from queue_worker import start_consumer
+from shared.jobqueue import SOLUTIONS_QUEUE, STATUSES, open_job_queue
+from shared.metrics import cache_collector, instrument_app, registry, stage, timed
+from shared.serving import (is_ready, module_app, on_shutdown, warmup, warmup_failures,
+                            warmup_status)
+from shared.wire import (BodyError, body_diagnostic, body_records, diagnostic_fields, read_body,
+                         respond, stream_item, stream_mimetype, wants_msgpack)
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+api = Blueprint('solutions', __name__)
+
+# Generated fixes, keyed by diagnostic fingerprint and source code hash
+solution_cache = open_solution_cache()
+
+# Bounded pool for batch fix generation
+worker_pool = open_worker_pool()
+on_shutdown(worker_pool.shutdown)
+
+# Local git mirror of the target repository (falls back to mock snippets when unset)
+code_mirror = open_mirror()
+CODE_CONTEXT_LINES = int(os.getenv('CODE_CONTEXT_LINES', 20))
+
+# AST transforms, tried before the string templates below
+fix_engine = FixEngine()
+
+# Streaming occurrence statistics behind alert thresholds and the fix-vs-alert decision
+alert_engine = AlertEngine()
+
+# Durable queue of diagnostics enqueued by LLM1 (disabled when JOB_QUEUE_PATH is unset)
+job_queue = open_job_queue()
+queue_consumer = None
+
+registry.add_collector(cache_collector({
+    'solutions': solution_cache.stats,
+    **({'codeMirror': code_mirror.stats} if code_mirror else {})
+}))
 
 
 class CodeFixGenerator:
@@ -80,28 +121,37 @@ router.post('/process', async (req, res, next) => {
   }'''
     }
     
+    @timed('solutions.analyze_error')
     def analyze_error(self, diagnostic):
         """Analyze error to determine if code fix or alert is needed"""
         error_category = diagnostic.get('error', {}).get('category')
         occurrence_count = diagnostic.get('context', {}).get('occurrenceCount', 0)
         
-        # Decision logic
-        if error_category in ['NULL_REFERENCE', 'UNHANDLED_PROMISE', 'MATH_ERROR']:
-            return 'CODE_FIX'
-        elif error_category in ['TIMEOUT', 'RESOURCE_LEAK'] and occurrence_count < 10:
-            return 'ALERT_SUGGESTION'
-        elif error_category == 'ACCESS_CONTROL':
-            return 'ALERT_SUGGESTION'
-        else:
-            return 'CODE_FIX'
+        # Category rules, then observed burst/sustained-rate statistics (see AlertEngine.decide)
+        solution_type, _ = alert_engine.decide(error_category, series_key(diagnostic),
+                                               occurrence_count)
+        return solution_type
+    
+    @timed('solutions.get_code_window')
+    def get_code_window(self, file_path, line_number=None):
+        """Fetch code context from repository as (code, first line number, blob SHA or None)"""
+        # Window of +/- CODE_CONTEXT_LINES around the failing line from the mirror
+        if code_mirror is not None:
+            try:
+                window = code_mirror.window(file_path, line_number, CODE_CONTEXT_LINES)
+                if window:
+                    return window['code'], window['startLine'], window['blobSha']
+            except Exception as e:
+                print(f"Error reading code mirror: {e}")
+        # For demo, use mock snippets
+        return self.MOCK_CODE_SNIPPETS.get(file_path, '// Code not found in mock'), 1, None
     
     def get_code_context(self, file_path, line_number=None):
         """Fetch code context from repository"""
-        # In real implementation, would call GitHub API
-        # For demo, use mock snippets
-        return self.MOCK_CODE_SNIPPETS.get(file_path, '// Code not found in mock')
+        return self.get_code_window(file_path, line_number)[0]
     
-    def generate_code_fix(self, diagnostic):
+    @timed('solutions.generate_code_fix')
+    def generate_code_fix(self, diagnostic, original_code=None, first_line=1, blob_sha=None):
         """Generate code fix for the error"""
         error_category = diagnostic.get('error', {}).get('category')
         error_message = diagnostic.get('error', {}).get('message')
@@ -109,20 +159,35 @@ router.post('/process', async (req, res, next) => {
         source_line = diagnostic.get('source', {}).get('line')
         
         # Get original code
-        original_code = self.get_code_context(source_file, source_line)
+        if original_code is None:
+            original_code, first_line, blob_sha = self.get_code_window(source_file, source_line)
+        
+        # Prefer an AST transform at the faulting node; templates cover the rest.
+        # Mirror files are parsed whole (a window rarely parses) and the window re-cut
+        fixed_code = None
+        if blob_sha is not None:
+            fixed_window = fix_engine.fix_file(
+                error_category, source_file, blob_sha, lambda: code_mirror.source(blob_sha),
+                source_line, error_message, CODE_CONTEXT_LINES)
+            if fixed_window is not None:
+                first_line, original_code, fixed_code = fixed_window
+        else:
+            fixed_code = fix_engine.fix(error_category, original_code, source_file,
+                                        source_line, error_message, first_line)
+        engine = 'ast' if fixed_code is not None else 'template'
         
         # Generate fix based on category
         if error_category == 'NULL_REFERENCE':
-            fixed_code = self.fix_null_reference(original_code, error_message)
+            fixed_code = fixed_code or self.fix_null_reference(original_code, error_message)
             explanation = "Added null/undefined check before accessing properties"
         elif error_category == 'UNHANDLED_PROMISE':
-            fixed_code = self.fix_unhandled_promise(original_code)
+            fixed_code = fixed_code or self.fix_unhandled_promise(original_code)
             explanation = "Added proper error handling with .catch() or try/catch with await"
         elif error_category == 'MATH_ERROR':
-            fixed_code = self.fix_math_error(original_code)
+            fixed_code = fixed_code or self.fix_math_error(original_code)
             explanation = "Added validation to prevent division by zero"
         elif error_category == 'RESOURCE_LEAK':
-            fixed_code = self.fix_resource_leak(original_code)
+            fixed_code = fixed_code or self.fix_resource_leak(original_code)
             explanation = "Added proper resource cleanup"
         else:
             fixed_code = original_code
@@ -134,7 +199,8 @@ router.post('/process', async (req, res, next) => {
             'originalCode': original_code,
             'fixedCode': fixed_code,
             'explanation': explanation,
-            'category': error_category
+            'category': error_category,
+            'engine': engine
         }
     
     def fix_null_reference(self, code, error_message):
@@ -191,6 +257,7 @@ router.post('/process', async (req, res, next) => {
     // Ensure any open connections are closed"""
         )
     
+    @timed('solutions.generate_alert_suggestion')
     def generate_alert_suggestion(self, diagnostic):
         """Generate operational alert/suggestion for non-code issues"""
         error_category = diagnostic.get('error', {}).get('category')
@@ -198,30 +265,49 @@ router.post('/process', async (req, res, next) => {
         occurrence_count = diagnostic.get('context', {}).get('occurrenceCount', 0)
         container = diagnostic.get('context', {}).get('containerName')
         
+        # Thresholds come from observed statistics once a series has enough history
+        statistics = alert_engine.statistics(series_key(diagnostic), container)
+        observed = statistics['fingerprint']
+        if observed and observed['occurrences'] < alert_engine.min_occurrences:
+            observed = None
+        bursting = bool(observed and observed['bursting'])
+        hourly_threshold = observed['hourlyThreshold'] if observed else 50
+        durations = observed['durationMs'] if observed else {}
+        
         suggestions = []
         
         if error_category == 'TIMEOUT':
+            if durations.get('p50'):
+                # Timeouts fire at the configured limit, so the median is the current setting
+                current_ms = round(durations['p50'])
+                recommended_ms = math.ceil(max(durations['p99'], current_ms) * 2 / 1000) * 1000
+                timeout_change = f'{current_ms}ms -> {recommended_ms}ms'
+                alert_ms = round(current_ms * 0.8)
+            else:
+                timeout_change, alert_ms = '30s -> 60s', 25000
             suggestions = [
                 {
                     'type': 'INFRASTRUCTURE',
                     'priority': 'HIGH',
                     'action': 'Increase timeout configuration for payment gateway',
                     'details': f'Payment gateway timeouts occurring {occurrence_count} times',
-                    'recommendedValue': '30s -> 60s'
+                    'recommendedValue': timeout_change
                 },
                 {
                     'type': 'MONITORING',
                     'priority': 'MEDIUM',
                     'action': 'Set up alert for payment gateway response time',
-                    'details': 'Alert when response time > 25s',
-                    'recommendedValue': 'Alert threshold: 25000ms'
+                    'details': f'Alert when response time > {alert_ms / 1000:g}s',
+                    'recommendedValue': f'Alert threshold: {alert_ms}ms'
                 }
             ]
         elif error_category == 'RESOURCE_LEAK':
+            container_stats = statistics['container']
             suggestions = [
                 {
                     'type': 'OPERATIONS',
-                    'priority': 'HIGH',
+                    'priority': ('MEDIUM' if container_stats and not container_stats['bursting']
+                                 and not bursting else 'HIGH'),
                     'action': f'Restart container: {container}',
                     'details': 'Database connections not being properly closed',
                     'recommendedValue': 'Scheduled restart + connection pool monitoring'
@@ -248,10 +334,10 @@ router.post('/process', async (req, res, next) => {
             suggestions = [
                 {
                     'type': 'MONITORING',
-                    'priority': 'MEDIUM',
+                    'priority': 'HIGH' if bursting else 'MEDIUM',
                     'action': 'Monitor error frequency',
                     'details': f'Error occurred {occurrence_count} times',
-                    'recommendedValue': 'Set up alert if occurrences > 50 in 1 hour'
+                    'recommendedValue': f'Set up alert if occurrences > {hourly_threshold} in 1 hour'
                 }
             ]
         
@@ -259,60 +345,424 @@ router.post('/process', async (req, res, next) => {
             'category': error_category,
             'errorMessage': error_message,
             'occurrenceCount': occurrence_count,
-            'suggestions': suggestions
+            'suggestions': suggestions,
+            'thresholds': 'observed' if observed else 'default',
+            'statistics': statistics
         }
 
 
-@app.route('/generate-solution', methods=['POST'])
+def observe_and_decide(generator, diagnostic):
+    """Record the diagnostic in the alert engine and return its solution type
+
+    Must run once per diagnostic: observing it again would count it twice.
+    """
+    alert_engine.observe(diagnostic)
+    return generator.analyze_error(diagnostic)
+
+
+@timed('solutions.solve')
+def solve(generator, diagnostic, original_code=None, first_line=1, blob_sha=None,
+          solution_type=None):
+    """Produce the solution for one diagnostic.
+
+    Returns (solution, cache_status, cache_key_id); solution holds
+    solutionType plus either fix or alert. original_code (starting at
+    first_line of the file at blob_sha) may be passed in when the caller
+    already fetched it, and solution_type when it already called
+    observe_and_decide.
+    """
+    if solution_type is None:
+        solution_type = observe_and_decide(generator, diagnostic)
+    
+    if solution_type == 'CODE_FIX':
+        if original_code is None:
+            source = diagnostic.get('source', {})
+            original_code, first_line, blob_sha = generator.get_code_window(
+                source.get('file'), source.get('line'))
+        # A mirror fix depends on the whole file version, not just the window
+        key = SolutionCache.key_for(diagnostic, blob_sha or original_code)
+        fix, cache_status = solution_cache.get_or_generate(
+            key, lambda: generator.generate_code_fix(diagnostic, original_code, first_line, blob_sha))
+        return {'solutionType': 'CODE_FIX', 'fix': fix}, cache_status, SolutionCache.key_id(key)
+    
+    # Alerts embed live counts and container names, so they are not cached
+    alert = generator.generate_alert_suggestion(diagnostic)
+    return {'solutionType': 'ALERT_SUGGESTION', 'alert': alert}, 'BYPASS', None
+
+
+@api.route('/generate-solution', methods=['POST'])
 def generate_solution():
     """
     Main solution generation endpoint
-    Input: diagnostic data from LLM1
-    Output: Code fix OR Alert suggestion
+    Input: { diagnostic, stacks?, echoDiagnostic? } - diagnostic data from
+           LLM1, as JSON or as a compact record in a MessagePack body
+    Output: Code fix OR Alert suggestion, followed by the diagnostic unless
+            echoDiagnostic is false. MessagePack with Accept: application/msgpack
     """
     try:
-        diagnostic = request.json.get('diagnostic')
+        data = read_body() or {}
+        diagnostic = body_diagnostic(data)
+    except BodyError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid diagnostic: {e}'}), 400
+
+    try:
+        echo = data.get('echoDiagnostic', True)
+        binary = wants_msgpack()
         
         if not diagnostic:
-            return jsonify({
+            return respond({
                 'success': False,
                 'message': 'Diagnostic data required'
-            }), 400
+            }, 400, binary)
         
         generator = CodeFixGenerator()
+        solution, cache_status, key_id = solve(generator, diagnostic)
         
-        # Determine solution type
-        solution_type = generator.analyze_error(diagnostic)
-        
-        if solution_type == 'CODE_FIX':
-            fix = generator.generate_code_fix(diagnostic)
-            return jsonify({
-                'success': True,
-                'solutionType': 'CODE_FIX',
-                'fix': fix,
-                'diagnostic': diagnostic
-            })
-        else:
-            alert = generator.generate_alert_suggestion(diagnostic)
-            return jsonify({
+        with stage('solutions.json_encode'):
+            response = respond({
                 'success': True,
-                'solutionType': 'ALERT_SUGGESTION',
-                'alert': alert,
-                'diagnostic': diagnostic
-            })
+                **solution,
+                **(diagnostic_fields(diagnostic, binary) if echo else {})
+            }, 200, binary)
+        response.headers['X-Solution-Cache'] = cache_status
+        if key_id:
+            response.headers['X-Solution-Key'] = key_id
+        return response
     
     except Exception as e:
+        print(f"Error generating solution: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-@app.route('/health', methods=['GET'])
+def solve_group(group):
+    """Solve every diagnostic in a (category, file) group, fetching each line's window once
+
+    group holds (index, DiagnosticRecord) pairs; each record is expanded
+    only while it is being solved.
+    """
+    generator = CodeFixGenerator()
+    windows = {}
+    results = []
+    for index, record in group:
+        try:
+            diagnostic = record.to_dict()
+            original_code, first_line, blob_sha = None, 1, None
+            solution_type = observe_and_decide(generator, diagnostic)
+            if solution_type == 'CODE_FIX':
+                source = diagnostic.get('source', {})
+                line = source.get('line')
+                if line not in windows:
+                    windows[line] = generator.get_code_window(source.get('file'), line)
+                original_code, first_line, blob_sha = windows[line]
+            solution, cache_status, _ = solve(generator, diagnostic, original_code, first_line,
+                                              blob_sha, solution_type)
+            results.append({
+                'index': index,
+                'success': True,
+                **solution,
+                'cache': cache_status
+            })
+        except Exception as e:
+            results.append({'index': index, 'success': False, 'error': str(e)})
+    return results
+
+
+@api.route('/generate-solution/batch', methods=['POST'])
+def generate_solution_batch():
+    """
+    Batch solution generation endpoint
+    Input: { diagnostics: [diagnostic, ...], stacks? } - JSON dicts, or compact
+           records in a MessagePack body
+    Output: NDJSON stream of { index, success, solutionType, fix|alert, cache }
+            in order of completion, followed by a summary line (a stream of
+            MessagePack objects with Accept: application/msgpack).
+            429 when the worker queue is full.
+    """
+    try:
+        data = read_body() or {}
+    except BodyError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if (not isinstance(data, dict) or not isinstance(data.get('diagnostics'), list)
+            or not data['diagnostics']):
+        return jsonify({
+            'success': False,
+            'message': 'diagnostics list required'
+        }), 400
+    binary = wants_msgpack()
+    
+    # Compact records while queued: shared strings, one copy of each stack
+    try:
+        diagnostics = body_records(data)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid diagnostic: {e}'}), 400
+    
+    if len(diagnostics) > worker_pool.queue_limit:
+        return jsonify({
+            'success': False,
+            'message': f'Batch exceeds queue limit of {worker_pool.queue_limit}'
+        }), 413
+    
+    # Group by category and source file so each file is fetched once
+    groups = {}
+    for index, record in enumerate(diagnostics):
+        groups.setdefault((record.category, record.source_file), []).append((index, record))
+    
+    try:
+        worker_pool.reserve(len(diagnostics))
+    except QueueFullError as e:
+        response = jsonify({'success': False, 'message': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    completed = worker_pool.map_unordered(solve_group, groups.values())
+    
+    def generate():
+        solved = 0
+        failed = 0
+        for results in completed:
+            for result in results:
+                if result['success']:
+                    solved += 1
+                else:
+                    failed += 1
+                yield stream_item(result, binary)
+        yield stream_item({
+            'summary': {
+                'diagnostics': len(diagnostics),
+                'groups': len(groups),
+                'solved': solved,
+                'failed': failed
+            }
+        }, binary)
+    
+    return Response(stream_with_context(generate()), mimetype=stream_mimetype(binary))
+
+
+def solve_job(payload):
+    """Queue handler: solve the diagnostic in a job payload"""
+    solution, cache_status, _ = solve(CodeFixGenerator(), payload['diagnostic'])
+    return {**solution, 'cache': cache_status}
+
+
+def queue_unavailable():
+    return jsonify({
+        'success': False,
+        'message': 'Job queue not configured (set JOB_QUEUE_PATH)'
+    }), 503
+
+
+@api.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    Job queue status
+    Input: ?status=pending|leased|done|dead&limit=50
+    Output: { counts, consumer, jobs: [...] }
+    """
+    if job_queue is None:
+        return queue_unavailable()
+    status = request.args.get('status')
+    if status and status not in STATUSES:
+        return jsonify({'success': False, 'message': f'status must be one of {STATUSES}'}), 400
+    limit = query_limit(50)
+    if limit is None:
+        return invalid_limit()
+    return jsonify({
+        'success': True,
+        'counts': job_queue.counts(SOLUTIONS_QUEUE),
+        'consumer': queue_consumer.stats() if queue_consumer else None,
+        'jobs': [job.to_dict() for job in job_queue.list(SOLUTIONS_QUEUE, status, limit)]
+    })
+
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Job status and, once done, its solution
+    Output: { id, status, attempts, lastError, result, ... }
+    """
+    if job_queue is None:
+        return queue_unavailable()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict(include_payload=True)})
+
+
+@api.route('/jobs', methods=['POST'])
+def enqueue_jobs():
+    """
+    Enqueue diagnostics for asynchronous solution generation
+    Input: { diagnostic } or { diagnostics: [...] }, as JSON or compact records
+           in a MessagePack body
+    Output: 202 { jobIds }
+    """
+    if job_queue is None:
+        return queue_unavailable()
+    try:
+        data = read_body() or {}
+        diagnostic = body_diagnostic(data)
+        diagnostics = ([diagnostic] if diagnostic else
+                       [record.to_dict() for record in body_records(data)])
+    except BodyError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid diagnostic: {e}'}), 400
+    if not diagnostics:
+        return jsonify({'success': False, 'message': 'Diagnostic data required'}), 400
+    job_ids = job_queue.enqueue_many(
+        SOLUTIONS_QUEUE, [{'diagnostic': diagnostic} for diagnostic in diagnostics])
+    return jsonify({'success': True, 'jobIds': job_ids}), 202
+
+
+@api.route('/jobs/dead/requeue', methods=['POST'])
+def requeue_dead_jobs():
+    """
+    Retry dead-lettered jobs
+    Input: { jobId? } - omit jobId to requeue every dead job
+    """
+    if job_queue is None:
+        return queue_unavailable()
+    job_id = (request.json or {}).get('jobId')
+    requeued = job_queue.requeue_dead(SOLUTIONS_QUEUE, job_id)
+    return jsonify({'success': True, 'requeued': requeued})
+
+
+@api.route('/solution-cache/invalidate', methods=['POST'])
+def invalidate_solution_cache():
+    """
+    Drop cached fixes, e.g. after a source file changed upstream
+    Input: { file? } - omit file to clear the whole cache
+    """
+    file_path = (request.json or {}).get('file')
+    if file_path:
+        removed = solution_cache.invalidate_file(file_path)
+        return jsonify({'success': True, 'file': file_path, 'removed': removed})
+    solution_cache.invalidate_all()
+    return jsonify({'success': True, 'file': None})
+
+
+def query_limit(default, maximum=500):
+    """?limit= clamped to [0, maximum]; None if it is not an integer"""
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        return None
+    return max(0, min(limit, maximum))
+
+
+def invalid_limit():
+    return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+
+
+@api.route('/alerts/series', methods=['GET'])
+def alert_series():
+    """
+    Noisiest error series as seen by the alert engine
+    Input: ?kind=fingerprint|container&limit=20
+    Output: { kind, series: [{ key, ratePerHour, hourlyThreshold, bursting, durationMs, ... }] }
+    """
+    kind = request.args.get('kind', 'fingerprint')
+    if kind not in ('fingerprint', 'container'):
+        return jsonify({'success': False, 'message': 'kind must be fingerprint or container'}), 400
+    limit = query_limit(20)
+    if limit is None:
+        return invalid_limit()
+    alert_engine.maybe_recompute()
+    return jsonify({'success': True, 'kind': kind, 'series': alert_engine.top(kind, limit)})
+
+
+@api.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok', 'service': 'llm2-solution'})
+    """Liveness: answers as soon as the worker serves, warm or not"""
+    return jsonify({
+        'status': 'ok',
+        'service': 'llm2-solution',
+        'ready': is_ready('llm2-solution'),
+        'solutionCache': solution_cache.stats(),
+        'workerPool': worker_pool.stats(),
+        'warmup': warmup_timings,
+        'codeMirror': code_mirror.stats() if code_mirror else None,
+        'jobQueue': job_queue.stats(SOLUTIONS_QUEUE) if job_queue else None,
+        'queueConsumer': queue_consumer.stats() if queue_consumer else None,
+        'alertEngine': alert_engine.stats()
+    })
+
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: 503 until warmup has loaded the parsers, tables and indexes, and
+    for good if a warmup step failed (listed under failed)
+    """
+    status = warmup_status('llm2-solution')
+    return jsonify({
+        'ready': status == 'ready',
+        'status': status,
+        'warmup': warmup_timings,
+        'failed': warmup_failures('llm2-solution')
+    }), 200 if status == 'ready' else 503
+
+
+WARMUP_SNIPPETS = (
+    ('warmup.js', 'const total = items.length;\nconst mean = sum / total;'),
+    ('warmup.py', 'total = len(items)\nmean = sum / total')
+)
+warmup_timings = {}
+
+
+def warm_caches():
+    """Load the parsers and resolve the mirror ref before the first request"""
+    steps = [
+        (f"fixEngine:{file_path}",
+         lambda file_path=file_path, code=code: fix_engine.fix('MATH_ERROR', code, file_path, 2, ''))
+        for file_path, code in WARMUP_SNIPPETS
+    ]
+    steps.append(('alertEngine', alert_engine.recompute))
+    if code_mirror is not None:
+        steps.append(('codeMirror', lambda: code_mirror.blob_sha('')))
+    return warmup('llm2-solution', steps)
+
+
+def start_queue_consumer():
+    """Start this process's queue consumer threads (once) and stop them on shutdown"""
+    global queue_consumer
+    if queue_consumer is None:
+        queue_consumer = start_consumer(job_queue, SOLUTIONS_QUEUE, solve_job)
+        if queue_consumer is not None:
+            on_shutdown(queue_consumer.stop)
+    return queue_consumer
+
+
+def create_app(consume_jobs=True):
+    """Application factory for gunicorn ("app:create_app()") and the dev server
+
+    consume_jobs starts the job queue consumer in this process.
+    """
+    global warmup_timings
+    flask_app = Flask(__name__)
+    CORS(flask_app)  # Enable CORS for all routes
+    flask_app.register_blueprint(api)
+    instrument_app(flask_app, 'llm2-solution')
+    warmup_timings = warm_caches()
+    if consume_jobs:
+        start_queue_consumer()
+    return flask_app
+
+
+# Built on first access (tests, tooling), without background consumers; servers
+# call create_app() themselves
+__getattr__ = module_app(lambda: create_app(consume_jobs=False))
 
 
 if __name__ == '__main__':
+    # Development server; see gunicorn.conf.py for production serving
     port = int(os.getenv('PORT', 5002))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Only the reloader's child process serves requests, so only it consumes jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_queue_consumer()
+    create_app(consume_jobs=False).run(host='0.0.0.0', port=port, debug=True)
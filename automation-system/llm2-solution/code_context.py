@@ -0,0 +1,201 @@
+"""
+Code Context
+Reads source windows from a local git mirror (bare or checkout). Blobs are
+materialized once per SHA into a cache directory, memory-mapped, and sliced
+through a precomputed line-offset index, so a window costs O(window) rather
+than a copy of the whole file per request.
+"""
+import mmap
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+class CodeContextError(Exception):
+    """Raised when the mirror cannot be read"""
+
+
+class MappedBlob:
+    """A memory-mapped blob with the byte offset of every line start"""
+
+    def __init__(self, sha, path):
+        self.sha = sha
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+        self.line_offsets = self._index_lines()
+
+    def _index_lines(self):
+        offsets = array('q', [0])
+        find = self._map.find
+        position = find(b'\n')
+        while position != -1:
+            offsets.append(position + 1)
+            position = find(b'\n', position + 1)
+        if offsets[-1] == self.size and len(offsets) > 1:
+            # Trailing newline does not start a new line
+            offsets.pop()
+        return offsets
+
+    @property
+    def line_count(self):
+        return len(self.line_offsets) if self.size else 0
+
+    def window(self, line, radius):
+        """Return (start_line, end_line, text) for line +/- radius (1-based, inclusive)"""
+        count = self.line_count
+        if count == 0:
+            return 1, 0, ''
+        line = min(max(int(line or 1), 1), count)
+        start = max(line - radius, 1)
+        end = min(line + radius, count)
+        begin = self.line_offsets[start - 1]
+        finish = self.line_offsets[end] if end < count else self.size
+        text = self._map[begin:finish].decode('utf-8', errors='replace')
+        return start, end, text.rstrip('\n')
+
+    def text(self):
+        return self._map[:].decode('utf-8', errors='replace')
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class GitMirror:
+    """Resolves repository paths to blob SHAs at a ref and serves line windows"""
+
+    def __init__(self, repo_path, ref='HEAD', cache_dir=None, max_open_blobs=256,
+                 ref_refresh=30.0):
+        self.repo_path = repo_path
+        self.ref = ref
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'llm2-blob-cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_open_blobs = max_open_blobs
+        self.ref_refresh = ref_refresh
+        self._lock = threading.Lock()
+        self._blobs = OrderedDict()
+        self._commit = None
+        self._tree = {}
+        self._resolved_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _git(self, *args):
+        result = subprocess.run(
+            ['git', '-C', self.repo_path, *args],
+            capture_output=True, check=False
+        )
+        if result.returncode != 0:
+            raise CodeContextError(result.stderr.decode('utf-8', errors='replace').strip())
+        return result.stdout
+
+    def _tree_for_ref(self):
+        """Return {path: blob_sha} for the ref's current commit, re-resolving the ref periodically"""
+        now = time.monotonic()
+        if self._commit is not None and now - self._resolved_at < self.ref_refresh:
+            return self._tree
+        commit = self._git('rev-parse', '--verify', f"{self.ref}^{{commit}}").decode().strip()
+        if commit != self._commit:
+            listing = self._git('ls-tree', '-r', '-z', commit)
+            tree = {}
+            for entry in listing.split(b'\0'):
+                if not entry:
+                    continue
+                meta, path = entry.split(b'\t', 1)
+                _, kind, sha = meta.split(b' ')
+                if kind == b'blob':
+                    tree[path.decode('utf-8', errors='replace')] = sha.decode()
+            self._tree = tree
+            self._commit = commit
+        self._resolved_at = now
+        return self._tree
+
+    def blob_sha(self, file_path):
+        with self._lock:
+            return self._tree_for_ref().get(file_path.lstrip('/'))
+
+    def _open_blob(self, sha):
+        with self._lock:
+            blob = self._blobs.get(sha)
+            if blob is not None:
+                self._blobs.move_to_end(sha)
+                self.hits += 1
+                return blob
+            self.misses += 1
+
+        path = os.path.join(self.cache_dir, sha)
+        if not os.path.exists(path):
+            content = self._git('cat-file', 'blob', sha)
+            # Write then rename so concurrent readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        blob = MappedBlob(sha, path)
+        with self._lock:
+            existing = self._blobs.get(sha)
+            if existing is not None:
+                blob.close()
+                return existing
+            self._blobs[sha] = blob
+            # Evicted maps are left for the garbage collector to close, since
+            # another thread may still be slicing them
+            while len(self._blobs) > self.max_open_blobs:
+                self._blobs.popitem(last=False)
+        return blob
+
+    def window(self, file_path, line, radius):
+        """Return a dict describing the code window, or None if the file is not in the mirror"""
+        if not file_path:
+            return None
+        sha = self.blob_sha(file_path)
+        if sha is None:
+            return None
+        blob = self._open_blob(sha)
+        start, end, code = blob.window(line, radius)
+        return {
+            'file': file_path,
+            'blobSha': sha,
+            'startLine': start,
+            'endLine': end,
+            'totalLines': blob.line_count,
+            'code': code
+        }
+
+    def source(self, sha):
+        """Full text of a blob, e.g. to parse the whole file a window was cut from"""
+        return self._open_blob(sha).text()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'repository': self.repo_path,
+                'ref': self.ref,
+                'commit': self._commit,
+                'openBlobs': len(self._blobs),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def open_mirror():
+    """GitMirror for CODE_MIRROR_PATH, or None when no mirror is configured"""
+    repo_path = os.getenv('CODE_MIRROR_PATH')
+    if not repo_path:
+        return None
+    return GitMirror(
+        repo_path,
+        ref=os.getenv('CODE_MIRROR_REF', 'HEAD'),
+        cache_dir=os.getenv('CODE_BLOB_CACHE_DIR'),
+        max_open_blobs=int(os.getenv('CODE_MAX_OPEN_BLOBS', 256)),
+        ref_refresh=float(os.getenv('CODE_MIRROR_REFRESH', 30))
+    )
@@ -0,0 +1,468 @@
+"""
+AST Fix Engine
+Parses the target code once per version (JavaScript via esprima, Python via
+ast), locates the faulting node from the diagnostic's line, and applies
+category-specific transforms as minimal text edits
+
+Files from the code mirror are parsed whole, once per blob SHA; windows cut
+around the failing line rarely parse on their own.
+"""
+import ast
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from shared.lazy import lazy_import
+
+# Imported on the first JavaScript parse (~0.6 s); JavaScript transforms are
+# skipped without esprima
+esprima = lazy_import('esprima')
+
+PARSE_CACHE_SIZE = 256
+
+JS_EXTENSIONS = ('.js', '.jsx', '.mjs', '.cjs')
+PYTHON_EXTENSIONS = ('.py',)
+
+# "Cannot read property 'id' of undefined", "Cannot read properties of undefined (reading 'id')",
+# "'NoneType' object has no attribute 'id'"
+PROPERTY_IN_MESSAGE = re.compile(
+    r"property '(\w+)'|reading '(\w+)'|has no attribute '(\w+)'")
+
+# Variables whose value is a connection/handle that must be released
+RESOURCE_CALL = re.compile(r'connect|acquire|getConnection|createConnection|open', re.IGNORECASE)
+
+
+def language_for(file_path):
+    file_path = (file_path or '').lower()
+    if file_path.endswith(JS_EXTENSIONS):
+        return 'javascript'
+    if file_path.endswith(PYTHON_EXTENSIONS):
+        return 'python'
+    return None
+
+
+def apply_edits(code, edits):
+    """Apply (start, end, replacement) character edits, which must not overlap"""
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        code = code[:start] + replacement + code[end:]
+    return code
+
+
+def line_indent(code, offset):
+    line_start = code.rfind('\n', 0, offset) + 1
+    line = code[line_start:offset]
+    return line[:len(line) - len(line.lstrip())], line_start
+
+
+def property_from_message(message):
+    match = PROPERTY_IN_MESSAGE.search(message or '')
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)
+
+
+class ParsedCode:
+    """A parsed code version with parent links, shared by every fix against it"""
+
+    def __init__(self, language, code, tree, nodes, parents):
+        self.language = language
+        self.code = code
+        self.tree = tree
+        self.nodes = nodes
+        self.parents = parents
+
+    def ancestors(self, node):
+        parent = self.parents.get(id(node))
+        while parent is not None:
+            yield parent
+            parent = self.parents.get(id(parent))
+
+
+def _js_children(node):
+    for value in vars(node).values():
+        if isinstance(value, esprima.nodes.Node):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, esprima.nodes.Node):
+                    yield item
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(language, code):
+    """Parse code into a ParsedCode, or None if it does not parse
+
+    Memoized per (language, code), so several fixes against the same file
+    version cost one parse.
+    """
+    try:
+        if language == 'javascript' and esprima is not None:
+            try:
+                tree = esprima.parseScript(code, {'range': True, 'loc': True})
+            except esprima.Error:
+                tree = esprima.parseModule(code, {'range': True, 'loc': True})
+            children = _js_children
+        elif language == 'python':
+            tree = ast.parse(code)
+            children = ast.iter_child_nodes
+        else:
+            return None
+    except (SyntaxError, ValueError, esprima.Error if esprima else SyntaxError) as e:
+        # Fragments (e.g. a lone class method) do not parse; callers fall back
+        print(f"Could not parse {language} code: {e}")
+        return None
+
+    nodes = []
+    parents = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        for child in children(node):
+            parents[id(child)] = node
+            stack.append(child)
+    return ParsedCode(language, code, tree, nodes, parents)
+
+
+_parsed_sources = OrderedDict()
+_parsed_sources_lock = threading.Lock()
+
+
+def parse_source(language, key, read):
+    """ParsedCode (or None) for a whole file identified by key, e.g. its blob SHA
+
+    read() returns the file's text and is only called on the first request
+    for a key, so repeated fixes against one file version cost one parse.
+    """
+    cache_key = (language, key)
+    with _parsed_sources_lock:
+        if cache_key in _parsed_sources:
+            _parsed_sources.move_to_end(cache_key)
+            return _parsed_sources[cache_key]
+    parsed = parse.__wrapped__(language, read())
+    with _parsed_sources_lock:
+        _parsed_sources[cache_key] = parsed
+        while len(_parsed_sources) > PARSE_CACHE_SIZE:
+            _parsed_sources.popitem(last=False)
+    return parsed
+
+
+def line_of(code, offset):
+    return code.count('\n', 0, offset) + 1
+
+
+# Line ends as ast counts them; str.splitlines() also splits on \f, \x1c, \u2028, ...
+PYTHON_LINE = re.compile(r'[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$')
+
+
+def python_lines(code):
+    """code split into lines (with their endings) numbered the way ast numbers them"""
+    return PYTHON_LINE.findall(code)
+
+
+class FixEngine:
+    """Category-specific AST transforms; returns None when no transform applies
+    so the caller can fall back to its templates
+    """
+
+    def _handler(self, language, category):
+        return getattr(self, f"_{language}_{(category or '').lower()}", None)
+
+    def fix(self, category, code, file_path, line, message, first_line=1):
+        """Fixed code, or None; code may be a window starting at first_line of the file"""
+        language = language_for(file_path)
+        if language is None or not code:
+            return None
+        handler = self._handler(language, category)
+        if handler is None:
+            return None
+        parsed = parse(language, code)
+        if parsed is None:
+            return None
+        # Diagnostic lines are file-relative; code may be a window starting at first_line
+        try:
+            local_line = int(line) - first_line + 1 if line is not None else None
+        except (TypeError, ValueError):
+            local_line = None
+        edits = handler(parsed, local_line, message)
+        if not edits:
+            return None
+        return apply_edits(code, edits)
+
+    def fix_file(self, category, file_path, key, read, line, message, radius):
+        """Fix against a whole file version (parsed once per key, e.g. its blob SHA)
+
+        Returns (first_line, original, fixed): the lines around line +/- radius,
+        widened to cover every edit, before and after the fix. None when no
+        transform applies.
+        """
+        language = language_for(file_path)
+        handler = self._handler(language, category) if language else None
+        if handler is None or key is None:
+            return None
+        try:
+            line = int(line)
+        except (TypeError, ValueError):
+            return None
+        parsed = parse_source(language, key, read)
+        if parsed is None:
+            return None
+        edits = handler(parsed, line, message)
+        if not edits:
+            return None
+
+        code = parsed.code
+        original_lines = code.rstrip('\n').split('\n')
+        fixed_lines = apply_edits(code, edits).rstrip('\n').split('\n')
+        first = max(min([line - radius] + [line_of(code, start) for start, _, _ in edits]), 1)
+        last = min(max([line + radius] + [line_of(code, end) for _, end, _ in edits]),
+                   len(original_lines))
+        # Edits all start at or after first, so the lines after last only shift
+        added = len(fixed_lines) - len(original_lines)
+        return (first, '\n'.join(original_lines[first - 1:last]),
+                '\n'.join(fixed_lines[first - 1:last + added]))
+
+    # -- JavaScript ---------------------------------------------------------
+
+    @staticmethod
+    def _js_statements_at(parsed, line):
+        """Statements spanning line, innermost first"""
+        if line is None:
+            return []
+        statements = [
+            node for node in parsed.nodes
+            if node.type.endswith(('Statement', 'Declaration'))
+            and node.loc.start.line <= line <= node.loc.end.line
+        ]
+        statements.sort(key=lambda node: node.range[1] - node.range[0])
+        return statements
+
+    @staticmethod
+    def _js_function_params(parsed, node):
+        for ancestor in parsed.ancestors(node):
+            if ancestor.type in ('FunctionDeclaration', 'FunctionExpression',
+                                 'ArrowFunctionExpression'):
+                return [param.name for param in ancestor.params if param.type == 'Identifier']
+        return []
+
+    @staticmethod
+    def _js_walk(node):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(_js_children(current))
+
+    def _javascript_null_reference(self, parsed, line, message):
+        statements = self._js_statements_at(parsed, line)
+        if not statements:
+            return None
+        faulting = statements[0]
+        prop = property_from_message(message)
+
+        # Prefer a variable declared on the faulting line, then any identifier
+        declared = set()
+        if faulting.type == 'VariableDeclaration':
+            declared = {d.id.name for d in faulting.declarations if d.id.type == 'Identifier'}
+
+        parent = parsed.parents.get(id(faulting))
+        siblings = getattr(parent, 'body', None) if parent is not None else None
+        if not isinstance(siblings, list) or faulting not in siblings:
+            siblings = [faulting]
+        candidates = siblings[siblings.index(faulting):]
+
+        for statement in candidates:
+            for node in self._js_walk(statement):
+                if (node.type == 'MemberExpression' and not node.computed
+                        and node.object.type == 'Identifier'
+                        and (prop is None or node.property.name == prop)
+                        and (not declared or node.object.name in declared)):
+                    if node.object.name in ('this', 'console'):
+                        continue
+                    return [self._js_guard(parsed, statement, node.object.name)]
+        return None
+
+    def _js_guard(self, parsed, statement, variable):
+        indent, line_start = line_indent(parsed.code, statement.range[0])
+        if 'res' in self._js_function_params(parsed, statement):
+            body = f"return res.status(404).json({{ error: '{variable} not found' }});"
+        else:
+            body = "return null;"
+        guard = (f"{indent}if (!{variable}) {{\n"
+                 f"{indent}  {body}\n"
+                 f"{indent}}}\n\n")
+        return line_start, line_start, guard
+
+    @staticmethod
+    def _js_then_statement(node):
+        return (node.type == 'ExpressionStatement' and node.expression.type == 'CallExpression'
+                and node.expression.callee.type == 'MemberExpression'
+                and node.expression.callee.property.name == 'then')
+
+    def _javascript_unhandled_promise(self, parsed, line, message):
+        statements = self._js_statements_at(parsed, line)
+        if not statements:
+            return None
+        faulting = statements[0]
+        # .then chains in the faulting statement, else the chain whose callback it is in;
+        # never chains elsewhere in the file
+        chains = [node for node in self._js_walk(faulting) if self._js_then_statement(node)]
+        if not chains:
+            chains = next(([a] for a in parsed.ancestors(faulting) if self._js_then_statement(a)), [])
+        edits = []
+        for node in chains:
+            call = node.expression
+            params = self._js_function_params(parsed, node)
+            handler = 'next' if 'next' in params else 'error => console.error(error)'
+            edits.append((call.range[1], call.range[1], f"\n      .catch({handler})"))
+        return edits or None
+
+    @classmethod
+    def _js_pure(cls, node):
+        """True for expressions safe to evaluate twice: names, literals, property reads"""
+        if node.type in ('Identifier', 'Literal', 'ThisExpression'):
+            return True
+        return (node.type == 'MemberExpression' and cls._js_pure(node.object)
+                and (not node.computed or cls._js_pure(node.property)))
+
+    def _javascript_math_error(self, parsed, line, message):
+        statements = self._js_statements_at(parsed, line)
+        if not statements:
+            return None
+        divisions = [
+            node for node in self._js_walk(statements[0])
+            if node.type == 'BinaryExpression' and node.operator in ('/', '%')
+            and not (node.right.type == 'Literal' and node.right.value)
+        ]
+        if not divisions:
+            return None
+        # Outermost first would overlap inner edits; guard the innermost only
+        node = min(divisions, key=lambda n: n.range[1] - n.range[0])
+        # The guard repeats the divisor, so a call like next() would run twice
+        if not self._js_pure(node.right):
+            return None
+        code = parsed.code
+        left = code[node.left.range[0]:node.left.range[1]]
+        right = code[node.right.range[0]:node.right.range[1]]
+        replacement = f"({right} !== 0 ? {left} {node.operator} {right} : 0)"
+        return [(node.range[0], node.range[1], replacement)]
+
+    def _javascript_resource_leak(self, parsed, line, message):
+        statements = self._js_statements_at(parsed, line)
+        if not statements:
+            return None
+        function = next(
+            (a for a in parsed.ancestors(statements[0])
+             if a.type in ('FunctionDeclaration', 'FunctionExpression', 'ArrowFunctionExpression')),
+            None
+        )
+        if function is None or function.body.type != 'BlockStatement':
+            return None
+        body = function.body.body
+        if any(node.type == 'TryStatement' and node.finalizer for node in body):
+            return None
+
+        # const conn = await pool.getConnection(); ...rest  ->  try { ...rest } finally { release }
+        code = parsed.code
+        for position, statement in enumerate(body[:-1]):
+            if statement.type != 'VariableDeclaration' or len(statement.declarations) != 1:
+                continue
+            declaration = statement.declarations[0]
+            init = declaration.init
+            if init is not None and init.type == 'AwaitExpression':
+                init = init.argument
+            if not (declaration.id.type == 'Identifier' and init is not None
+                    and init.type == 'CallExpression'
+                    and RESOURCE_CALL.search(code[init.callee.range[0]:init.callee.range[1]])):
+                continue
+
+            name = declaration.id.name
+            rest = body[position + 1:]
+            indent, rest_start = line_indent(code, rest[0].range[0])
+            rest_end = rest[-1].range[1]
+            inner = '\n'.join(
+                f"  {text}" if text.strip() else text
+                for text in code[rest_start:rest_end].split('\n')
+            )
+            replacement = (f"{indent}try {{\n{inner}\n{indent}}} finally {{\n"
+                           f"{indent}  if ({name}) {{\n{indent}    {name}.release();\n{indent}  }}\n"
+                           f"{indent}}}")
+            return [(rest_start, rest_end, replacement)]
+        return None
+
+    # -- Python -------------------------------------------------------------
+
+    @staticmethod
+    def _py_offset(code_lines, lineno, col_offset):
+        """Character offset for an ast (1-based line, utf-8 byte column) position"""
+        prefix = sum(len(line) for line in code_lines[:lineno - 1])
+        column = len(code_lines[lineno - 1].encode('utf-8')[:col_offset].decode('utf-8', 'replace'))
+        return prefix + column
+
+    @classmethod
+    def _py_pure(cls, node):
+        """True for expressions safe to evaluate twice: names, constants, attribute and
+        subscript reads, and len() of those
+        """
+        if isinstance(node, (ast.Name, ast.Constant)):
+            return True
+        if isinstance(node, ast.Attribute):
+            return cls._py_pure(node.value)
+        if isinstance(node, ast.Subscript):
+            return cls._py_pure(node.value) and cls._py_pure(node.slice)
+        return (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == 'len' and len(node.args) == 1 and not node.keywords
+                and cls._py_pure(node.args[0]))
+
+    @staticmethod
+    def _py_statement_at(parsed, line):
+        if line is None:
+            return None
+        statements = [
+            node for node in parsed.nodes
+            if isinstance(node, ast.stmt) and node.lineno <= line <= node.end_lineno
+        ]
+        return min(statements, key=lambda n: n.end_lineno - n.lineno, default=None)
+
+    def _python_null_reference(self, parsed, line, message):
+        statement = self._py_statement_at(parsed, line)
+        if statement is None:
+            return None
+        prop = property_from_message(message)
+        for node in ast.walk(statement):
+            if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                    and (prop is None or node.attr == prop) and node.value.id != 'self'):
+                lines = python_lines(parsed.code)
+                start = self._py_offset(lines, statement.lineno, 0)
+                indent = ' ' * statement.col_offset
+                in_function = any(isinstance(a, (ast.FunctionDef, ast.AsyncFunctionDef))
+                                  for a in parsed.ancestors(statement))
+                action = 'return None' if in_function else f"raise ValueError('{node.value.id} is None')"
+                guard = f"{indent}if {node.value.id} is None:\n{indent}    {action}\n"
+                return [(start, start, guard)]
+        return None
+
+    def _python_math_error(self, parsed, line, message):
+        statement = self._py_statement_at(parsed, line)
+        if statement is None:
+            return None
+        divisions = [
+            node for node in ast.walk(statement)
+            if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod))
+            and not (isinstance(node.right, ast.Constant) and node.right.value)
+        ]
+        if not divisions:
+            return None
+        node = min(divisions, key=lambda n: (n.end_lineno - n.lineno, n.end_col_offset - n.col_offset))
+        if not self._py_pure(node.right):
+            return None
+        code = parsed.code
+        lines = python_lines(code)
+        start = self._py_offset(lines, node.lineno, node.col_offset)
+        end = self._py_offset(lines, node.end_lineno, node.end_col_offset)
+        left = ast.get_source_segment(code, node.left)
+        right = ast.get_source_segment(code, node.right)
+        operator = code[self._py_offset(lines, node.left.end_lineno, node.left.end_col_offset):
+                        self._py_offset(lines, node.right.lineno, node.right.col_offset)].strip()
+        return [(start, end, f"({left} {operator} {right} if {right} else 0)")]
@@ -0,0 +1,135 @@
+"""
+Queue Worker
+Threads that drain the durable job queue, so solution throughput scales
+with the number of workers rather than with open HTTP requests
+"""
+import os
+import socket
+import threading
+import time
+
+DAY = 86400
+PURGE_INTERVAL = 3600
+
+
+class QueueConsumer:
+    """Runs handler(job.payload) for leased jobs on a fixed number of threads
+
+    The handler's return value is stored as the job result; an exception
+    fails the attempt, which the queue retries or dead-letters. Done jobs
+    older than retention_days are purged at most once per PURGE_INTERVAL
+    (never when retention_days is 0).
+    """
+
+    def __init__(self, job_queue, queue, handler, workers=2, poll_interval=1.0,
+                 retention_days=7):
+        self.job_queue = job_queue
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention_days = retention_days
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.queue_errors = 0
+        self.purged = 0
+
+    def start(self):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{prefix}:{number}",),
+                                      name=f"queue-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _maybe_purge(self):
+        if self.retention_days <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + PURGE_INTERVAL
+        try:
+            purged = self.job_queue.purge_done(self.retention_days * DAY)
+        except Exception as e:
+            print(f"Error purging done jobs: {e}")
+            return
+        with self._lock:
+            self.purged += purged
+
+    def _settle(self, settle, job_id, worker, value):
+        """ack/fail a job; a write error (e.g. a locked database) must not end the thread.
+        The job stays leased and is retried once its lease expires.
+        """
+        try:
+            settle(job_id, worker, value)
+        except Exception as e:
+            print(f"Error settling job {job_id}: {e}")
+            with self._lock:
+                self.queue_errors += 1
+
+    def _run(self, worker):
+        while not self._stop.is_set():
+            self._maybe_purge()
+            try:
+                job = self.job_queue.lease(self.queue, worker)
+            except Exception as e:
+                print(f"Error leasing job: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            with self._lock:
+                self.active += 1
+            try:
+                result = self.handler(job.payload)
+            except Exception as e:
+                print(f"Error processing job {job.id}: {e}")
+                self._settle(self.job_queue.fail, job.id, worker, e)
+                with self._lock:
+                    self.failed += 1
+            else:
+                self._settle(self.job_queue.ack, job.id, worker, result)
+                with self._lock:
+                    self.processed += 1
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def stop(self, timeout=None):
+        """Stop leasing new jobs and wait for in-flight ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'active': self.active,
+                'processed': self.processed,
+                'failed': self.failed,
+                'queueErrors': self.queue_errors,
+                'purged': self.purged
+            }
+
+
+def start_consumer(job_queue, queue, handler):
+    """Start QUEUE_WORKERS consumer threads, or return None when set to 0"""
+    workers = int(os.getenv('QUEUE_WORKERS', 2))
+    if job_queue is None or workers <= 0:
+        return None
+    return QueueConsumer(
+        job_queue, queue, handler,
+        workers=workers,
+        poll_interval=float(os.getenv('QUEUE_POLL_INTERVAL', 1.0)),
+        retention_days=float(os.getenv('JOB_RETENTION_DAYS', 7))
+    ).start()
@@ -0,0 +1,65 @@
+"""
+Solution Cache
+Content-addressed cache of generated code fixes, keyed on
+(file, category, line, normalized message, code hash)
+"""
+import hashlib
+import json
+
+from shared.cache import build_backend, build_cache
+from shared.normalize import normalize_message
+
+
+def code_hash(code):
+    return hashlib.sha256((code or '').encode('utf-8')).hexdigest()[:16]
+
+
+class SolutionCache:
+    """LRU+TTL cache of fixes; a changed source file changes the key, and
+    invalidate_file drops every entry for a file explicitly
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @staticmethod
+    def key_for(diagnostic, original_code):
+        error = diagnostic.get('error', {})
+        source = diagnostic.get('source', {})
+        return (
+            source.get('file'),
+            error.get('category'),
+            str(source.get('line')),
+            normalize_message(error.get('message')),
+            code_hash(original_code)
+        )
+
+    @staticmethod
+    def key_id(key):
+        """Short stable identifier for a key, safe to return in a header"""
+        return hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()[:16]
+
+    def get_or_generate(self, key, generate):
+        """Return (fix, status) where status is 'HIT' or 'MISS'"""
+        generated = []
+
+        def load():
+            generated.append(True)
+            return generate()
+
+        fix = self.cache.get_or_load(key, load)
+        return fix, ('MISS' if generated else 'HIT')
+
+    def invalidate_file(self, file_path):
+        return self.cache.invalidate_prefix((file_path,))
+
+    def invalidate_all(self):
+        self.cache.invalidate()
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def open_solution_cache():
+    """Solution cache configured by CACHE_TTL_SOLUTIONS / CACHE_MAX_ENTRIES / CACHE_DISK_PATH"""
+    return SolutionCache(build_cache('solutions', default_ttl=3600, backend=build_backend()))
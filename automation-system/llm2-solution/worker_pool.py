@@ -0,0 +1,83 @@
+"""
+Worker Pool
+Bounded thread pool for fix generation with admission control, so a flood
+of incidents is rejected up front instead of queueing without limit
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class QueueFullError(Exception):
+    """Raised when admitting a batch would exceed the queue limit"""
+
+    def __init__(self, requested, pending, limit):
+        super().__init__(
+            f"Queue limit reached: {pending} pending + {requested} requested > {limit}")
+        self.requested = requested
+        self.pending = pending
+        self.limit = limit
+
+
+class WorkerPool:
+    """ThreadPoolExecutor plus a counter of admitted-but-unfinished items"""
+
+    def __init__(self, workers=4, queue_limit=1000):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='solution-worker')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def reserve(self, count):
+        """Admit count items or raise QueueFullError"""
+        with self._lock:
+            if self.pending + count > self.queue_limit:
+                self.rejected += 1
+                raise QueueFullError(count, self.pending, self.queue_limit)
+            self.pending += count
+
+    def release(self, count=1):
+        with self._lock:
+            self.pending -= count
+            self.completed += count
+
+    def map_unordered(self, func, tasks):
+        """Submit func over tasks (each admitted as len(task) items via reserve)
+        and return an iterator of results in order of completion.
+
+        Tasks are submitted immediately and each task's reservation is
+        released when it finishes, even if the consumer never iterates.
+        """
+        def run(task):
+            try:
+                return func(task)
+            finally:
+                self.release(len(task))
+
+        futures = [self._executor.submit(run, task) for task in tasks]
+        return (future.result() for future in as_completed(futures))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queueLimit': self.queue_limit,
+                'pending': self.pending,
+                'completed': self.completed,
+                'rejectedBatches': self.rejected
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def open_worker_pool():
+    """Worker pool sized by SOLUTION_WORKERS and SOLUTION_QUEUE_LIMIT"""
+    return WorkerPool(
+        workers=int(os.getenv('SOLUTION_WORKERS', 4)),
+        queue_limit=int(os.getenv('SOLUTION_QUEUE_LIMIT', 1000))
+    )
@@ -2,6 +2,7 @@ require('dotenv').config();
 const express = require('express');
 const cors = require('cors');
 const axios = require('axios');
+const { binary, requestConfig, decodeBody, unpackDiagnostic } = require('./wire');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
@@ -36,9 +37,11 @@ app.post('/api/diagnose', async (req, res) => {
       scopeId,
       docName,
       timeRange: timeRange || '24h'
-    });
+    }, requestConfig());
+    const diagnosticBody = decodeBody(diagnosticResponse.data,
+                                      diagnosticResponse.headers['content-type']);
     
-    if (!diagnosticResponse.data.success) {
+    if (!diagnosticBody.success) {
       return res.status(404).json({
         success: false,
         message: 'No error found for the given criteria',
@@ -46,7 +49,7 @@ app.post('/api/diagnose', async (req, res) => {
       });
     }
     
-    const diagnostic = diagnosticResponse.data.diagnostic;
+    const diagnostic = unpackDiagnostic(diagnosticBody.diagnostic, diagnosticBody.stacks);
     console.log('[Step 1] ✓ Diagnostic completed');
     console.log(`   Error: ${diagnostic.error.message}`);
     console.log(`   Category: ${diagnostic.error.category}`);
@@ -54,11 +57,14 @@ app.post('/api/diagnose', async (req, res) => {
     
     // Step 2: Call LLM2 for solution generation
     console.log('\n[Step 2] Calling LLM2 Solution Generator...');
+    // Forward the diagnostic as received and skip the echo; we already have it
     const solutionResponse = await axios.post(`${LLM2_URL}/generate-solution`, {
-      diagnostic
-    });
+      diagnostic: diagnosticBody.diagnostic,
+      stacks: diagnosticBody.stacks,
+      echoDiagnostic: false
+    }, requestConfig());
     
-    const solution = solutionResponse.data;
+    const solution = decodeBody(solutionResponse.data, solutionResponse.headers['content-type']);
     console.log(`[Step 2] ✓ Solution generated`);
     console.log(`   Solution Type: ${solution.solutionType}`);
     
@@ -130,7 +136,9 @@ app.post('/api/diagnose', async (req, res) => {
     res.status(500).json({
       success: false,
       error: error.message,
-      details: (error.response && error.response.data) || null
+      details: error.response
+        ? decodeBody(error.response.data, error.response.headers['content-type'])
+        : null
     });
   }
 });
@@ -200,7 +208,8 @@ app.listen(PORT, () => {
   console.log(`Connected Services:`);
   console.log(`  LLM1 (Diagnostics): ${LLM1_URL}`);
   console.log(`  LLM2 (Solution):    ${LLM2_URL}`);
-  console.log(`  GitHub Service:     ${GITHUB_SERVICE_URL}\n`);
+  console.log(`  GitHub Service:     ${GITHUB_SERVICE_URL}`);
+  console.log(`  Wire format:        ${binary ? 'msgpack' : 'json'}\n`);
 });
 
 module.exports = app;
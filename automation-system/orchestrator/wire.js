@@ -0,0 +1,110 @@
+/**
+ * Wire format for calls to LLM1 and LLM2
+ *
+ * With SERVICE_WIRE_FORMAT=msgpack (and @msgpack/msgpack installed), the
+ * orchestrator asks both services for MessagePack bodies. Diagnostics then
+ * travel as compact positional records whose stack traces are sent once in
+ * a separate { hash: stack } map. The layout mirrors
+ * automation-system/shared/records.py. Otherwise plain JSON is used.
+ */
+let msgpack = null;
+try {
+  msgpack = require('@msgpack/msgpack');
+} catch {
+  // Optional: npm install @msgpack/msgpack to enable the binary format
+}
+
+const MSGPACK_MIMETYPE = 'application/msgpack';
+const WIRE_VERSION = 1;
+
+// Must match WIRE_FIELDS in shared/records.py
+const WIRE_FIELDS = [
+  'message', 'errorType', 'category', 'stackHash', 'fingerprint', 'containerName',
+  'roleInstance', 'occurrenceCount', 'firstOccurrence', 'lastOccurrence', 'pipeline',
+  'repository', 'sourceFile', 'sourceLine', 'contextExtra', 'extra'
+];
+
+const requested = (process.env.SERVICE_WIRE_FORMAT || 'json').toLowerCase();
+if (requested === 'msgpack' && !msgpack) {
+  console.warn('SERVICE_WIRE_FORMAT=msgpack but @msgpack/msgpack is not installed; using JSON');
+}
+const binary = requested === 'msgpack' && msgpack !== null;
+
+/**
+ * axios options for a POST of body to a Python service
+ */
+function requestConfig() {
+  if (!binary) {
+    return {};
+  }
+  return {
+    headers: { Accept: MSGPACK_MIMETYPE, 'Content-Type': MSGPACK_MIMETYPE },
+    responseType: 'arraybuffer',
+    transformRequest: [(data) => Buffer.from(msgpack.encode(data))]
+  };
+}
+
+/**
+ * Decode a response body (also used for error responses)
+ */
+function decodeBody(data, contentType) {
+  if (binary && contentType && contentType.startsWith(MSGPACK_MIMETYPE)) {
+    return msgpack.decode(Buffer.from(data));
+  }
+  if (Buffer.isBuffer(data) || data instanceof ArrayBuffer) {
+    const text = Buffer.from(data).toString('utf8');
+    try {
+      return JSON.parse(text);
+    } catch {
+      return text;
+    }
+  }
+  return data;
+}
+
+/**
+ * Compact record (or an already nested diagnostic) -> nested diagnostic
+ */
+function unpackDiagnostic(value, stacks) {
+  if (!Array.isArray(value)) {
+    return value;
+  }
+  if (value[0] !== WIRE_VERSION || value.length !== WIRE_FIELDS.length + 1) {
+    throw new Error('Unsupported diagnostic wire format');
+  }
+  const record = {};
+  WIRE_FIELDS.forEach((field, index) => {
+    record[field] = value[index + 1];
+  });
+  return {
+    error: {
+      message: record.message,
+      type: record.errorType,
+      stack: record.stackHash ? (stacks || {})[record.stackHash] : null,
+      category: record.category
+    },
+    context: {
+      fingerprint: record.fingerprint,
+      containerName: record.containerName,
+      roleInstance: record.roleInstance,
+      occurrenceCount: record.occurrenceCount,
+      firstOccurrence: record.firstOccurrence,
+      lastOccurrence: record.lastOccurrence,
+      ...(record.contextExtra || {})
+    },
+    pipeline: record.pipeline || {},
+    repository: record.repository || {},
+    source: {
+      file: record.sourceFile,
+      line: record.sourceLine
+    },
+    ...(record.extra || {})
+  };
+}
+
+module.exports = {
+  binary,
+  requestConfig,
+  decodeBody,
+  unpackDiagnostic
+};
@@ -0,0 +1,643 @@
+"""
+Offline Replay
+Runs exported New Relic error dumps through the whole pipeline (LLM1
+DiagnosticsEngine, then LLM2 solution generation) in-process, without one
+HTTP call per error, for post-mortems and backfills.
+
+The input is streamed: a JSON array, a {"errors": [...]} export, or NDJSON,
+optionally gzip-compressed ("-" reads stdin). Events are sharded by
+fingerprint across worker processes, so every occurrence of a bug lands in
+the same process (one solution cache entry, one alert-engine series). Each
+worker diagnoses and solves its events in batches and appends the results
+to its own part file in the output directory:
+
+    part-003.ndjson              one line per event (--format ndjson)
+    part-003-00012.parquet       one file per checkpoint (--format parquet)
+    checkpoint-003.json          last committed event of shard 3
+    manifest.json                input, workers and format of the run
+
+Queues between the reader and the workers are bounded, so memory stays flat
+whatever the input size. An interrupted run continues with --resume: each
+shard skips the events it had committed and drops output written after its
+last checkpoint, so every event is written exactly once.
+
+Usage:
+    python replay.py errors.ndjson.gz --output ./replay-out --workers 4
+    python replay.py errors.ndjson.gz --output ./replay-out --workers 4 --resume
+"""
+import argparse
+import glob
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'llm1-diagnostics'))
+
+from fingerprint import fingerprint_error  # noqa: E402
+from shared.records import DiagnosticRecord  # noqa: E402
+from shared.services import load_diagnostics, load_solutions  # noqa: E402
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+REPLAY_WORKERS = int(os.getenv('REPLAY_WORKERS', os.cpu_count() or 1))
+REPLAY_BATCH_SIZE = int(os.getenv('REPLAY_BATCH_SIZE', 256))
+REPLAY_CHECKPOINT_EVERY = int(os.getenv('REPLAY_CHECKPOINT_EVERY', 10000))
+
+# Batches queued per worker before the reader blocks
+QUEUE_DEPTH = 2
+MANIFEST_VERSION = 1
+READ_SIZE = 1 << 16
+# A malformed array element is buffered at most this far while looking for its end
+MAX_ELEMENT_SIZE = 1 << 24
+
+
+# -- Input -------------------------------------------------------------------
+
+def open_input(path):
+    """Text stream over a (possibly gzip-compressed) file, or stdin for "-" """
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    if raw.peek(2)[:2] == b'\x1f\x8b':
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+
+
+# Stand-in for a record (NDJSON line or array element) that is not valid JSON
+MALFORMED = object()
+
+
+class ElementScanner:
+    """Finds where an array element ends (the next top-level "," or the
+    array's "]") across chunks, without decoding it
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text, start=0):
+        """Index of the element's end in text, or None if it continues past it"""
+        for index in range(start, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth < 0:
+                    return index
+            elif char == ',' and self.depth == 0:
+                return index
+        return None
+
+
+def iter_json_array(handle, buffer):
+    """Yield the elements of a JSON array one at a time
+
+    buffer holds text already read from handle, starting just after the
+    array's "[". Only the element being decoded is kept in memory. An
+    element that does not decode is yielded as MALFORMED and skipped.
+    """
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                break
+            buffer, position = handle.read(READ_SIZE), 0
+            if not buffer:
+                raise ValueError('Unterminated JSON array')
+        if buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            scanner = ElementScanner()
+            end = scanner.feed(buffer, position)
+            if end is None and len(buffer) - position < MAX_ELEMENT_SIZE:
+                # Element cut off at the end of the buffer: read more (doubling) and retry
+                more = handle.read(max(READ_SIZE, len(buffer) - position))
+                if not more:
+                    raise ValueError('Unterminated JSON array')
+                buffer, position = buffer[position:] + more, 0
+                continue
+            # Malformed: skip to its end, reading on without keeping what was skipped
+            while end is None:
+                buffer = handle.read(READ_SIZE)
+                if not buffer:
+                    raise ValueError('Unterminated JSON array')
+                end = scanner.feed(buffer)
+            value = MALFORMED
+        yield value
+        position = end
+        if position >= READ_SIZE:
+            buffer, position = buffer[position:], 0
+
+
+def read_records(handle):
+    """Yield the top-level error records of an export in any supported layout"""
+    head = handle.read(READ_SIZE)
+    # Read until the first non-blank line is complete
+    while head and '\n' not in head.lstrip():
+        chunk = handle.read(READ_SIZE)
+        if not chunk:
+            break
+        head += chunk
+    if not head.strip():
+        return
+    start = len(head) - len(head.lstrip())
+    if head[start] == '[':
+        yield from iter_json_array(handle, head[start + 1:])
+        return
+
+    try:
+        json.loads(head.lstrip().partition('\n')[0])
+    except ValueError:
+        # A pretty-printed document: stream the array under its "errors" key
+        while '"errors"' not in head or '[' not in head[head.index('"errors"'):]:
+            chunk = handle.read(READ_SIZE)
+            if not chunk:
+                raise ValueError('Expected a JSON array, {"errors": [...]} or NDJSON')
+            head += chunk
+        bracket = head.index('[', head.index('"errors"'))
+        yield from iter_json_array(handle, head[bracket + 1:])
+        return
+
+    # NDJSON; a line holding a whole {"errors": [...]} response is expanded
+    lines = io.StringIO(head)
+    pending = ''
+    while True:
+        for line in lines:
+            if not line.endswith('\n'):
+                pending = line
+                break
+            yield _decode_line(pending + line)
+            pending = ''
+        chunk = handle.read(READ_SIZE)
+        if not chunk:
+            break
+        lines = io.StringIO(chunk)
+    if pending:
+        yield _decode_line(pending)
+
+
+def _decode_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return MALFORMED
+
+
+def read_events(handle, stats):
+    """Error events of an export, skipping blank and malformed records"""
+    for record in read_records(handle):
+        if record is None:
+            continue
+        items = record.get('errors') if isinstance(record, dict) and 'error' not in record else None
+        for event in items if isinstance(items, list) else (record,):
+            if not isinstance(event, dict) or not isinstance(event.get('error'), dict):
+                stats['malformed'] += 1
+                continue
+            yield event
+
+
+def shard_for(fingerprint, workers):
+    return int(fingerprint, 16) % workers
+
+
+# -- Output ------------------------------------------------------------------
+
+class NdjsonSink:
+    """Appends result lines to one file per shard; the checkpoint is its byte size"""
+
+    def __init__(self, directory, shard, state=None):
+        self.path = os.path.join(directory, f'part-{shard:03d}.ndjson')
+        self.handle = open(self.path, 'a+b')
+        # Drop lines written after the last checkpoint
+        self.handle.truncate((state or {}).get('bytes', 0))
+        self.handle.seek(0, os.SEEK_END)
+
+    def write(self, rows):
+        self.handle.write(b''.join(json.dumps(row, default=str).encode('utf-8') + b'\n'
+                                   for row in rows))
+
+    def commit(self):
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        return {'bytes': self.handle.tell()}
+
+    def close(self):
+        self.handle.close()
+
+
+PARQUET_COLUMNS = (
+    ('seq', 'int64'), ('transactionId', 'string'), ('scopeId', 'string'),
+    ('fingerprint', 'string'), ('category', 'string'), ('sourceFile', 'string'),
+    ('sourceLine', 'string'), ('occurrenceCount', 'int64'), ('success', 'bool_'),
+    ('solutionType', 'string'), ('cache', 'string'), ('error', 'string'),
+    # Nested payloads as JSON text, so the schema does not depend on the solution type
+    ('solution', 'string'), ('diagnostic', 'string')
+)
+
+
+class ParquetSink:
+    """Writes each checkpoint interval of a shard as its own Parquet file
+
+    A Parquet file is only readable once closed, so a file is closed at
+    every checkpoint; the checkpoint records how many are complete.
+    """
+
+    def __init__(self, directory, shard, state=None):
+        if pyarrow is None:
+            raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow)')
+        self.directory = directory
+        self.shard = shard
+        self.segment = (state or {}).get('segments', 0)
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, kind)())
+                                      for name, kind in PARQUET_COLUMNS])
+        self.writer = None
+        # Drop files written after the last checkpoint
+        for path in glob.glob(os.path.join(directory, f'part-{shard:03d}-*.parquet')):
+            if int(path.rsplit('-', 1)[1].split('.')[0]) >= self.segment:
+                os.remove(path)
+
+    def write(self, rows):
+        if self.writer is None:
+            path = os.path.join(self.directory, f'part-{self.shard:03d}-{self.segment:05d}.parquet')
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd')
+        table = pyarrow.Table.from_pylist([parquet_row(row) for row in rows], schema=self.schema)
+        self.writer.write_table(table)
+
+    def commit(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.segment += 1
+        return {'segments': self.segment}
+
+    def close(self):
+        self.commit()
+
+
+def parquet_row(row):
+    diagnostic = row.get('diagnostic')
+    solution = row.get('fix') or row.get('alert')
+    return {
+        'seq': row['seq'],
+        'transactionId': row.get('transactionId'),
+        'scopeId': row.get('scopeId'),
+        'fingerprint': row.get('fingerprint'),
+        'category': row.get('category'),
+        'sourceFile': row.get('sourceFile'),
+        'sourceLine': None if row.get('sourceLine') is None else str(row['sourceLine']),
+        'occurrenceCount': row.get('occurrenceCount'),
+        'success': row['success'],
+        'solutionType': row.get('solutionType'),
+        'cache': row.get('cache'),
+        'error': row.get('error'),
+        'solution': json.dumps(solution, default=str) if solution is not None else None,
+        'diagnostic': json.dumps(diagnostic, default=str) if diagnostic is not None else None
+    }
+
+
+SINKS = {'ndjson': NdjsonSink, 'parquet': ParquetSink}
+
+
+def checkpoint_path(directory, shard):
+    return os.path.join(directory, f'checkpoint-{shard:03d}.json')
+
+
+def read_json(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def write_json(path, value):
+    """Atomically replace path with value"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(value, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+# -- Workers -----------------------------------------------------------------
+
+class EventClock:
+    """Replay time: the latest lastOccurrence seen, so alert statistics age by event time"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, events):
+        for event in events:
+            value = event.get('lastOccurrence') or event.get('timestamp')
+            try:
+                at = datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                continue
+            self.now = max(self.now, at)
+
+    def __call__(self):
+        return self.now or time.time()
+
+
+class ShardWorker:
+    """Diagnoses and solves the batches of one shard"""
+
+    def __init__(self, include_diagnostic=True):
+        self.diagnostics = load_diagnostics()
+        self.solutions = load_solutions()
+        self.engine = self.diagnostics.DiagnosticsEngine()
+        self.clock = EventClock()
+        self.solutions.alert_engine.clock = self.clock
+        self.include_diagnostic = include_diagnostic
+
+    def diagnose(self, events):
+        """(diagnostic or None, error) per event; one bulk pass when the batch is clean"""
+        try:
+            return [(diagnostic, None) for _, diagnostic in
+                    self.engine.analyze_error_contexts(events, chunk_size=len(events))]
+        except Exception:
+            results = []
+            for event in events:
+                try:
+                    results.append((self.engine.analyze_error_context(event), None))
+                except Exception as e:
+                    results.append((None, str(e)))
+            return results
+
+    def solve_batch(self, batch):
+        """Result rows, in input order, for a list of (seq, event)"""
+        events = [event for _, event in batch]
+        self.clock.advance(events)
+        rows = []
+        groups = {}
+        for index, ((seq, event), (diagnostic, error)) in enumerate(
+                zip(batch, self.diagnose(events))):
+            row = {
+                'seq': seq,
+                'transactionId': event.get('transactionId'),
+                'scopeId': event.get('scopeId')
+            }
+            rows.append(row)
+            if diagnostic is None:
+                row.update({'success': False, 'stage': 'diagnose', 'error': error})
+                continue
+            context = diagnostic['context']
+            source = diagnostic['source']
+            row.update({
+                'fingerprint': context.get('fingerprint'),
+                'category': diagnostic['error'].get('category'),
+                'sourceFile': source.get('file'),
+                'sourceLine': source.get('line'),
+                'occurrenceCount': context.get('occurrenceCount')
+            })
+            if self.include_diagnostic:
+                row['diagnostic'] = diagnostic
+            # Same grouping as /generate-solution/batch: each file window is fetched once
+            record = DiagnosticRecord.from_dict(diagnostic)
+            groups.setdefault((record.category, record.source_file), []).append((index, record))
+
+        for group in groups.values():
+            for result in self.solutions.solve_group(group):
+                row = rows[result.pop('index')]
+                if not result.get('success'):
+                    result['stage'] = 'solve'
+                row.update(result)
+        return rows
+
+
+def run_shard(shard, inbox, results, options):
+    """Worker process: solve batches from inbox until None, checkpointing as it goes"""
+    # Ctrl-C goes to the whole process group; the reader stops and workers drain
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    summary = {'shard': shard, 'events': 0, 'failed': 0, 'codeFixes': 0, 'alerts': 0}
+    try:
+        checkpoint = read_json(checkpoint_path(options['output'], shard)) or {}
+        worker = ShardWorker(options['includeDiagnostic'])
+        sink = SINKS[options['format']](options['output'], shard, checkpoint.get('output'))
+        last_seq = checkpoint.get('seq', -1)
+        written = checkpoint.get('events', 0)
+        uncommitted = 0
+
+        def commit():
+            write_json(checkpoint_path(options['output'], shard), {
+                'shard': shard, 'seq': last_seq, 'events': written, 'output': sink.commit()
+            })
+
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                break
+            rows = worker.solve_batch(batch)
+            sink.write(rows)
+            for row in rows:
+                if not row['success']:
+                    summary['failed'] += 1
+                elif row.get('solutionType') == 'CODE_FIX':
+                    summary['codeFixes'] += 1
+                else:
+                    summary['alerts'] += 1
+            summary['events'] += len(rows)
+            last_seq = batch[-1][0]
+            written += len(rows)
+            uncommitted += len(rows)
+            if uncommitted >= options['checkpointEvery']:
+                commit()
+                uncommitted = 0
+        commit()
+        sink.close()
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+    results.put(summary)
+
+
+# -- Reader ------------------------------------------------------------------
+
+def check_manifest(args, manifest):
+    """The manifest for this run, or an error message when it cannot resume an earlier one"""
+    input_bytes = None if args.input == '-' else os.path.getsize(args.input)
+    current = {
+        'version': MANIFEST_VERSION,
+        'input': os.path.abspath(args.input) if args.input != '-' else '-',
+        'inputBytes': input_bytes,
+        'workers': args.workers,
+        'format': args.format
+    }
+    if manifest is None:
+        return current, None
+    if not args.resume:
+        return current, f'{args.output} holds an earlier run; pass --resume or use a new directory'
+    for key in ('version', 'workers', 'format', 'inputBytes'):
+        if manifest.get(key) != current[key]:
+            return current, (f'Cannot resume: {key} was {manifest.get(key)!r}, '
+                             f'now {current[key]!r}')
+    return current, None
+
+
+def dispatch(events, workers, batch_size, done, put, stop, stats):
+    """Shard events by fingerprint into batches; events a shard already committed are skipped"""
+    buffers = [[] for _ in range(workers)]
+    for seq, event in enumerate(events):
+        if stop.is_set():
+            # Buffered events are after each shard's last dispatched batch; --resume rereads them
+            return
+        stats['events'] += 1
+        shard = shard_for(fingerprint_error(event), workers)
+        if seq <= done[shard]:
+            stats['skipped'] += 1
+            continue
+        buffer = buffers[shard]
+        buffer.append((seq, event))
+        if len(buffer) >= batch_size:
+            put(shard, buffer)
+            buffers[shard] = []
+    for shard, buffer in enumerate(buffers):
+        if buffer:
+            put(shard, buffer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay an exported error dump through LLM1 and LLM2')
+    parser.add_argument('input', help='JSON, {"errors": [...]} or NDJSON export, optionally .gz (- for stdin)')
+    parser.add_argument('--output', required=True, help='output directory')
+    parser.add_argument('--format', choices=sorted(SINKS), default='ndjson')
+    parser.add_argument('--workers', type=int, default=REPLAY_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=REPLAY_BATCH_SIZE)
+    parser.add_argument('--checkpoint-every', type=int, default=REPLAY_CHECKPOINT_EVERY,
+                        help='events per shard between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run')
+    parser.add_argument('--no-diagnostic', action='store_true',
+                        help='leave the full diagnostic out of each result')
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error('--workers and --batch-size must be positive')
+    if args.format == 'parquet' and pyarrow is None:
+        parser.error('--format parquet requires pyarrow')
+    if args.input != '-' and not os.path.isfile(args.input):
+        parser.error(f'{args.input} not found')
+    if args.resume and args.input == '-':
+        parser.error('--resume needs a file input')
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, 'manifest.json')
+    manifest, problem = check_manifest(args, read_json(manifest_path))
+    if problem:
+        parser.error(problem)
+    write_json(manifest_path, manifest)
+    done = [(read_json(checkpoint_path(args.output, shard)) or {}).get('seq', -1)
+            for shard in range(args.workers)]
+
+    options = {
+        'output': args.output,
+        'format': args.format,
+        'checkpointEvery': args.checkpoint_every,
+        'includeDiagnostic': not args.no_diagnostic
+    }
+    inboxes = [multiprocessing.Queue(QUEUE_DEPTH) for _ in range(args.workers)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_shard, args=(shard, inboxes[shard], results, options),
+                                         name=f'replay-{shard}', daemon=True)
+                 for shard in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    def put(shard, batch):
+        while True:
+            try:
+                inboxes[shard].put(batch, timeout=1)
+                return
+            except queue.Full:
+                if not processes[shard].is_alive():
+                    raise RuntimeError(f'Replay worker {shard} exited')
+
+    stats = {'events': 0, 'skipped': 0, 'malformed': 0}
+    started = time.monotonic()
+    failure = None
+    try:
+        with open_input(args.input) as handle:
+            dispatch(read_events(handle, stats), args.workers, args.batch_size, done, put, stop,
+                     stats)
+    except (ValueError, OSError, RuntimeError) as e:
+        failure = str(e)
+    for shard in range(args.workers):
+        if processes[shard].is_alive():
+            put(shard, None)
+
+    shards = []
+    alive = True
+    while len(shards) < args.workers:
+        try:
+            shards.append(results.get(timeout=1))
+        except queue.Empty:
+            # Workers flush their summary before exiting: one more wait once all are gone
+            if not alive:
+                break
+            alive = any(process.is_alive() for process in processes)
+    for process in processes:
+        process.join()
+
+    shards.sort(key=lambda summary: summary['shard'])
+    seconds = time.monotonic() - started
+    processed = sum(summary['events'] for summary in shards)
+    errors = [f"shard {summary['shard']}: {summary['error']}" for summary in shards
+              if 'error' in summary]
+    if len(shards) < args.workers:
+        errors.append(f'{args.workers - len(shards)} worker(s) exited without a summary')
+    if failure:
+        errors.insert(0, f'Input: {failure}')
+    print(json.dumps({'summary': {
+        **stats,
+        'processed': processed,
+        'failed': sum(summary['failed'] for summary in shards),
+        'codeFixes': sum(summary['codeFixes'] for summary in shards),
+        'alerts': sum(summary['alerts'] for summary in shards),
+        'interrupted': stop.is_set(),
+        'errors': errors,
+        'seconds': round(seconds, 1),
+        'eventsPerSecond': round(processed / seconds, 1) if seconds else None,
+        'shards': shards
+    }}), file=sys.stderr)
+    if errors or stop.is_set():
+        print('Incomplete replay; run again with --resume to continue', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Shared Python modules for the LLM1 diagnostics and LLM2 solution services
+"""
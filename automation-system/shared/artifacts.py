@@ -0,0 +1,43 @@
+"""
+Compiled artifacts
+Rule and mapping tables precompiled into marshal files, built from their
+JSON (or SQLite) source with each module's build-index command. Loading one
+maps the file with mmap and decodes it in a single marshal.loads call: no
+JSON parsing or index construction at startup, and the pages are shared
+through the page cache by every worker on the host.
+"""
+import marshal
+import mmap
+import os
+
+ARTIFACT_SUFFIX = '.idx'
+
+# The marshal format version is part of the header; artifacts are rebuilt, not migrated
+MAGIC = b'AUTOIDX' + bytes([marshal.version])
+
+
+def write_artifact(path, kind, payload):
+    """Atomically write a marshal-able payload as an artifact of the given kind"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC)
+        f.write(marshal.dumps((kind, payload)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def read_artifact(path, kind):
+    """Payload of an artifact, checking its header and kind"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an artifact for this Python version; rebuild it")
+        with memoryview(mapped) as view, view[len(MAGIC):] as body:
+            stored_kind, payload = marshal.loads(body)
+    if stored_kind != kind:
+        raise ValueError(f"{path} holds {stored_kind}, not {kind}")
+    return payload
+
+
+def is_artifact(path):
+    return path.endswith(ARTIFACT_SUFFIX)
@@ -0,0 +1,257 @@
+"""
+TTL/LRU cache for upstream lookups
+Size-bounded LRU eviction, per-cache TTLs, stampede protection and an
+optional SQLite backend so entries survive restarts
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A load in progress that concurrent misses for the same key wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SQLiteBackend:
+    """Persistent second tier for TTLCache, storing JSON values with expiry times"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,'
+            ' expires REAL NOT NULL, PRIMARY KEY (namespace, key))'
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        """Return (value, expires) or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM cache WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, expires):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), expires)
+            )
+            self._conn.commit()
+
+    def delete(self, namespace, key=None):
+        with self._lock:
+            if key is None:
+                self._conn.execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+            else:
+                self._conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?',
+                                   (namespace, key))
+            self._conn.commit()
+
+    def delete_prefix(self, namespace, prefix):
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key >= ? AND key < ?',
+                (namespace, prefix, prefix + '\uffff')
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            self._conn.commit()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a fixed TTL per cache
+
+    Keys are tuples of JSON-serializable values. Falsy results are not
+    cached so that transient upstream failures are retried next time.
+    """
+
+    def __init__(self, name, max_entries=1024, ttl=60.0, backend=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.collapsed = 0
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key, separators=(',', ':'))
+
+    def _get_local(self, key):
+        """Return a fresh in-memory value (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_local(self, key, value, expires):
+        """Insert and evict least-recently-used entries (caller holds the lock)"""
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """Return a cached value or None"""
+        key = self._key(key)
+        with self._lock:
+            entry = self._get_local(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+        if self.backend is not None:
+            stored = self.backend.get(self.name, key)
+            if stored is not None:
+                with self._lock:
+                    self._set_local(key, *stored)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return stored[0]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        key = self._key(key)
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._set_local(key, value, expires)
+        if self.backend is not None:
+            self.backend.set(self.name, key, value, expires)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() on a miss
+
+        Concurrent misses for the same key collapse into a single loader
+        call; the other callers wait for and share its result.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        cache_key = self._key(key)
+        with self._lock:
+            # A load that finished since our miss has already stored the value
+            entry = self._get_local(cache_key)
+            if entry is not None:
+                return entry[0]
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                inflight = self._inflight[cache_key] = _InFlight()
+                owner = True
+            else:
+                self.collapsed += 1
+                owner = False
+
+        if not owner:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            value = loader()
+            if value:
+                self.set(key, value, ttl)
+            inflight.value = value
+            return value
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[cache_key]
+            inflight.event.set()
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(key), None)
+        if self.backend is not None:
+            self.backend.delete(self.name, None if key is None else self._key(key))
+
+    def invalidate_prefix(self, prefix):
+        """Drop every entry whose key tuple starts with the given tuple"""
+        prefix = self._key(list(prefix))[:-1] + ','
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+        if self.backend is not None:
+            self.backend.delete_prefix(self.name, prefix)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'collapsedLoads': self.collapsed,
+                'persistent': self.backend is not None
+            }
+
+
+def build_cache(name, default_ttl, max_entries=None, backend=None):
+    """Create a TTLCache configured from CACHE_* environment variables
+
+    CACHE_TTL_<NAME> overrides the TTL for one cache, CACHE_MAX_ENTRIES
+    bounds every cache.
+    """
+    ttl = float(os.getenv(f"CACHE_TTL_{name.upper()}", default_ttl))
+    if max_entries is None:
+        max_entries = int(os.getenv('CACHE_MAX_ENTRIES', 4096))
+    return TTLCache(name, max_entries=max_entries, ttl=ttl, backend=backend)
+
+
+def build_backend():
+    """Return the SQLite backend when CACHE_DISK_PATH is set, else None"""
+    path = os.getenv('CACHE_DISK_PATH')
+    if not path:
+        return None
+    backend = SQLiteBackend(path)
+    backend.purge_expired()
+    return backend
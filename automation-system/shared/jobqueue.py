@@ -0,0 +1,265 @@
+"""
+Durable job queue
+SQLite (WAL) work queue shared between processes: producers enqueue JSON
+payloads, workers lease jobs for a bounded time, then acknowledge or fail
+them. Failed jobs are retried with exponential backoff and dead-lettered
+after max_attempts; jobs whose lease expires (a crashed worker) are handed
+out again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+STATUSES = (PENDING, LEASED, DONE, DEAD)
+
+# Diagnostics from LLM1 waiting for LLM2 to generate a solution
+SOLUTIONS_QUEUE = 'solutions'
+
+
+class Job:
+    """A leased job; payload and result are decoded JSON"""
+
+    __slots__ = ('id', 'queue', 'payload', 'status', 'attempts', 'max_attempts',
+                 'lease_owner', 'last_error', 'result', 'created_at', 'updated_at')
+
+    def __init__(self, row):
+        (self.id, self.queue, payload, self.status, self.attempts, self.max_attempts,
+         self.lease_owner, self.last_error, result, self.created_at, self.updated_at) = row
+        self.payload = json.loads(payload)
+        self.result = json.loads(result) if result is not None else None
+
+    def to_dict(self, include_payload=False):
+        job = {
+            'id': self.id,
+            'queue': self.queue,
+            'status': self.status,
+            'attempts': self.attempts,
+            'maxAttempts': self.max_attempts,
+            'worker': self.lease_owner,
+            'lastError': self.last_error,
+            'result': self.result,
+            'createdAt': self.created_at,
+            'updatedAt': self.updated_at
+        }
+        if include_payload:
+            job['payload'] = self.payload
+        return job
+
+
+_COLUMNS = ('id, queue, payload, status, attempts, max_attempts, lease_owner,'
+            ' last_error, result, created_at, updated_at')
+
+
+class JobQueue:
+    """Named queues in one SQLite file; safe across threads and processes"""
+
+    def __init__(self, path, max_attempts=5, lease_seconds=120.0, backoff_base=2.0,
+                 backoff_max=300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode so lease() can take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY, queue TEXT NOT NULL, payload TEXT NOT NULL,'
+            ' status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,'
+            ' max_attempts INTEGER NOT NULL, available_at REAL NOT NULL,'
+            ' lease_owner TEXT, lease_expires REAL, last_error TEXT, result TEXT,'
+            ' created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, status, available_at)')
+        self._lock = threading.Lock()
+
+    def enqueue(self, queue, payload, max_attempts=None, delay=0.0):
+        """Add a job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, queue, payload, status, max_attempts, available_at,'
+                ' created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, queue, json.dumps(payload), PENDING,
+                 max_attempts or self.max_attempts, now + delay, now, now)
+            )
+        return job_id
+
+    def enqueue_many(self, queue, payloads, max_attempts=None):
+        """Add several jobs in one transaction and return their ids"""
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, queue, json.dumps(payload), PENDING,
+             max_attempts or self.max_attempts, now, now, now)
+            for payload in payloads
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO jobs (id, queue, payload, status, max_attempts, available_at,'
+                    ' created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [row[0] for row in rows]
+
+    def lease(self, queue, worker, lease_seconds=None):
+        """Claim the oldest ready job (or one whose lease expired), or return None"""
+        now = time.time()
+        expires = now + (lease_seconds or self.lease_seconds)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # A job whose worker keeps dying must not be retried forever
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL,'
+                    ' lease_expires = NULL, updated_at = ? WHERE queue = ? AND status = ?'
+                    ' AND lease_expires <= ? AND attempts >= max_attempts',
+                    (DEAD, 'Lease expired', now, queue, LEASED, now)
+                )
+                row = self._conn.execute(
+                    'SELECT id FROM jobs WHERE queue = ? AND ('
+                    ' (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?))'
+                    ' ORDER BY available_at LIMIT 1',
+                    (queue, PENDING, now, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?,'
+                    ' attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                    (LEASED, worker, expires, now, row[0])
+                )
+                job = self._conn.execute(
+                    f'SELECT {_COLUMNS} FROM jobs WHERE id = ?', (row[0],)).fetchone()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return Job(job)
+
+    def ack(self, job_id, worker, result=None):
+        """Mark a leased job done; returns False if the lease was lost to another worker"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires = NULL,'
+                ' updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?',
+                (DONE, json.dumps(result), time.time(), job_id, LEASED, worker)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Record a failed attempt: retry after a backoff, or dead-letter the job
+
+        Returns the job's new status, or None if the lease was lost.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT attempts, max_attempts FROM jobs'
+                    ' WHERE id = ? AND status = ? AND lease_owner = ?',
+                    (job_id, LEASED, worker)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                attempts, max_attempts = row
+                status = DEAD if attempts >= max_attempts else PENDING
+                delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, available_at = ?, last_error = ?,'
+                    ' lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?',
+                    (status, now + delay, str(error), now, job_id)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return status
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return Job(row) if row else None
+
+    def list(self, queue, status=None, limit=50):
+        """Most recently updated jobs in a queue, optionally filtered by status"""
+        query = f'SELECT {_COLUMNS} FROM jobs WHERE queue = ?'
+        params = [queue]
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        query += ' ORDER BY updated_at DESC LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [Job(row) for row in rows]
+
+    def requeue_dead(self, queue, job_id=None):
+        """Move dead-lettered jobs back to pending with a fresh attempt budget"""
+        now = time.time()
+        query = ('UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ?'
+                 ' WHERE queue = ? AND status = ?')
+        params = [PENDING, now, now, queue, DEAD]
+        if job_id:
+            query += ' AND id = ?'
+            params.append(job_id)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        return cursor.rowcount
+
+    def purge_done(self, older_than):
+        """Delete finished jobs last updated more than older_than seconds ago"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM jobs WHERE status = ? AND updated_at < ?',
+                (DONE, time.time() - older_than)
+            )
+        return cursor.rowcount
+
+    def counts(self, queue):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status',
+                (queue,)
+            ).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def stats(self, queue):
+        return {'path': self.path, 'queue': queue, **self.counts(queue)}
+
+
+def open_job_queue():
+    """JobQueue at JOB_QUEUE_PATH, or None when the queue is not configured"""
+    path = os.getenv('JOB_QUEUE_PATH')
+    if not path:
+        return None
+    return JobQueue(
+        path,
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 5)),
+        lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', 120)),
+        backoff_base=float(os.getenv('JOB_BACKOFF_BASE', 2.0))
+    )
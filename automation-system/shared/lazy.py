@@ -0,0 +1,44 @@
+"""
+Lazy imports
+Heavy optional dependencies (esprima, numpy, requests, msgpack) are bound
+to a proxy at module import and only imported on first attribute access,
+usually from the background warmup, so a worker can start serving before
+they are loaded.
+"""
+import importlib
+import importlib.util
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access (thread-safe)"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """A LazyModule for an installed module, or None when it is not installed"""
+    if importlib.util.find_spec(name.partition('.')[0]) is None:
+        return None
+    return LazyModule(name)
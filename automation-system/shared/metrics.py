@@ -0,0 +1,273 @@
+"""
+Instrumentation
+Counters and histograms in a process-wide registry, stage timing
+decorators, per-request slow traces and a Prometheus text exposition.
+
+With METRICS_ENABLED=0, timed() returns the undecorated function and the
+other helpers return immediately, so disabled instrumentation costs one
+attribute check per call site at most.
+"""
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+
+# Requests slower than this (seconds) are traced with probability SLOW_TRACE_SAMPLE_RATE
+SLOW_TRACE_THRESHOLD = float(os.getenv('SLOW_TRACE_THRESHOLD', '1.0'))
+SLOW_TRACE_SAMPLE_RATE = float(os.getenv('SLOW_TRACE_SAMPLE_RATE', '1.0'))
+SLOW_TRACE_LIMIT = int(os.getenv('SLOW_TRACE_LIMIT', '50'))
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that produce samples at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector() returns lines in Prometheus text format"""
+        self.collectors.append(collector)
+        return collector
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_duration = registry.register(Histogram(
+    'stage_duration_seconds', 'Time spent in an engine stage', ('stage',)))
+stage_errors = registry.register(Counter(
+    'stage_errors_total', 'Exceptions raised by an engine stage', ('stage',)))
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint', 'status')))
+upstream_requests = registry.register(Counter(
+    'upstream_requests_total', 'Upstream HTTP calls by outcome', ('host', 'status')))
+upstream_duration = registry.register(Histogram(
+    'upstream_request_duration_seconds', 'Upstream HTTP call latency', ('host',)))
+
+
+# -- Stage timing and request traces ------------------------------------------
+
+_trace = contextvars.ContextVar('metrics_trace', default=None)
+slow_traces = deque(maxlen=SLOW_TRACE_LIMIT)
+
+
+def _record(name, elapsed):
+    stage_duration.observe(elapsed, name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((name, round(elapsed * 1000, 3)))
+
+
+def timed(name):
+    """Decorator recording a function's duration (and exceptions) as stage ``name``"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                stage_errors.inc(name)
+                raise
+            finally:
+                _record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class stage:
+    """Context manager form of timed() for inline blocks"""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if ENABLED:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            if exc_type is not None:
+                stage_errors.inc(self.name)
+            _record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def record_upstream(host, status, elapsed=None):
+    """Count an upstream call; status is an HTTP code or an error kind"""
+    if ENABLED:
+        upstream_requests.inc(host, str(status))
+        if elapsed is not None:
+            upstream_duration.observe(elapsed, host)
+
+
+def cache_collector(caches):
+    """Collector exposing hit/miss counters and hit ratios for named caches
+
+    caches: dict of name -> callable returning a stats dict with hits and misses
+    """
+    def collect():
+        hits = ['# HELP cache_hits_total Cache hits', '# TYPE cache_hits_total counter']
+        misses = ['# HELP cache_misses_total Cache misses', '# TYPE cache_misses_total counter']
+        ratios = ['# HELP cache_hit_ratio Hits over lookups since start',
+                  '# TYPE cache_hit_ratio gauge']
+        for name, cache_stats in caches.items():
+            stats = cache_stats()
+            hit, miss = stats.get('hits', 0), stats.get('misses', 0)
+            label = _labels(('cache',), (name,))
+            hits.append(f"cache_hits_total{label} {hit}")
+            misses.append(f"cache_misses_total{label} {miss}")
+            ratios.append(f"cache_hit_ratio{label} {hit / (hit + miss) if hit + miss else 0}")
+        return hits + misses + ratios
+    return collect
+
+
+# -- Flask integration -----------------------------------------------------------
+
+def instrument_app(flask_app, service):
+    """Time every request, sample slow-request traces and serve /metrics"""
+    from flask import Response, g, jsonify, request
+
+    @flask_app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.expose(), mimetype='text/plain; version=0.0.4')
+
+    @flask_app.route('/metrics/slow', methods=['GET'])
+    def slow_requests():
+        return jsonify({'service': service, 'thresholdSeconds': SLOW_TRACE_THRESHOLD,
+                        'traces': list(slow_traces)})
+
+    if not ENABLED:
+        return flask_app
+
+    @flask_app.before_request
+    def start_request():
+        g.metrics_started = time.perf_counter()
+        g.metrics_trace = []
+        g.metrics_token = _trace.set(g.metrics_trace)
+
+    @flask_app.teardown_request
+    def finish_request(error=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        _trace.reset(g.pop('metrics_token'))
+        trace = g.pop('metrics_trace')
+        elapsed = time.perf_counter() - started
+        status = getattr(g, 'metrics_status', 500 if error else 200)
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_duration.observe(elapsed, request.method, endpoint, str(status))
+        if elapsed >= SLOW_TRACE_THRESHOLD and random.random() < SLOW_TRACE_SAMPLE_RATE:
+            slow_traces.append({
+                'service': service,
+                'method': request.method,
+                'endpoint': endpoint,
+                'status': status,
+                'durationMs': round(elapsed * 1000, 3),
+                'at': time.time(),
+                'stages': [{'stage': name, 'ms': ms} for name, ms in trace]
+            })
+
+    @flask_app.after_request
+    def capture_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    return flask_app
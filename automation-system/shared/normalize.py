@@ -0,0 +1,21 @@
+"""
+Message normalization shared by error fingerprinting and solution caching
+"""
+import re
+
+# Order matters: UUIDs and hex addresses before bare numbers
+VOLATILE_PATTERNS = (
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b'), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-f]+\b'), '<addr>'),
+    (re.compile(r'\b(?=[0-9a-f]*\d)[0-9a-f]{12,}\b'), '<hex>'),
+    (re.compile(r'\b\d+(?:\.\d+)*\b'), '<n>'),
+    (re.compile(r'\s+'), ' ')
+)
+
+
+def normalize_message(message):
+    """Lowercase a message and replace IDs, numbers and addresses with placeholders"""
+    normalized = (message or '').lower()
+    for pattern, placeholder in VOLATILE_PATTERNS:
+        normalized = pattern.sub(placeholder, normalized)
+    return normalized.strip()
@@ -0,0 +1,226 @@
+"""
+Compact diagnostic records
+A slotted form of the diagnostic dicts LLM1 produces and LLM2 consumes.
+Repeated strings (category, file, role instance) and the pipeline and
+repository mappings are interned so that records for the same service share
+one copy, and stack traces are deduplicated by hash in a StackTable.
+
+On the wire a record is a positional list (see WIRE_FIELDS) that refers to
+its stack by hash; the stacks travel once per message or stream in a
+separate {hash: stack} map.
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+WIRE_VERSION = 1
+
+# Positions in the wire list after the leading WIRE_VERSION
+WIRE_FIELDS = (
+    'message', 'error_type', 'category', 'stack_hash', 'fingerprint', 'container_name',
+    'role_instance', 'occurrence_count', 'first_occurrence', 'last_occurrence', 'pipeline',
+    'repository', 'source_file', 'source_line', 'context_extra', 'extra'
+)
+
+CONTEXT_FIELDS = ('fingerprint', 'containerName', 'roleInstance', 'occurrenceCount',
+                  'firstOccurrence', 'lastOccurrence')
+DIAGNOSTIC_FIELDS = ('error', 'context', 'pipeline', 'repository', 'source')
+
+_MAX_SHARED = 4096
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def intern_string(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_mapping(mapping):
+    """Return a canonical tuple of a small str -> str mapping, shared by equal mappings"""
+    if not mapping:
+        return None
+    items = tuple((sys.intern(key), intern_string(value)) for key, value in mapping.items())
+    with _shared_lock:
+        shared = _shared.get(items)
+        if shared is None:
+            if len(_shared) >= _MAX_SHARED:
+                return items
+            shared = _shared[items] = items
+    return shared
+
+
+def stack_hash(stack):
+    return hashlib.blake2b(stack.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class StackTable:
+    """Bounded hash -> stack trace map that also canonicalizes equal stacks
+
+    Records keep a reference to the canonical string, so evicting an entry
+    only stops further deduplication; it never loses a record's stack.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._stacks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, stack):
+        """Return (hash, canonical stack) for a stack trace"""
+        key = stack_hash(stack)
+        with self._lock:
+            canonical = self._stacks.get(key)
+            if canonical is None:
+                canonical = self._stacks[key] = stack
+                if len(self._stacks) > self.max_entries:
+                    self._stacks.popitem(last=False)
+            else:
+                self._stacks.move_to_end(key)
+        return key, canonical
+
+    def get(self, key):
+        with self._lock:
+            return self._stacks.get(key)
+
+    def __len__(self):
+        return len(self._stacks)
+
+
+# Process-wide table used when the caller does not pass one
+stacks = StackTable()
+
+
+def check_diagnostic(diagnostic):
+    """Raise ValueError unless a diagnostic dict has the nested shape LLM1 produces"""
+    if not isinstance(diagnostic, dict):
+        raise ValueError('diagnostic must be an object')
+    for field in DIAGNOSTIC_FIELDS:
+        if not isinstance(diagnostic.get(field) or {}, dict):
+            raise ValueError(f"{field} must be an object")
+    stack = (diagnostic.get('error') or {}).get('stack')
+    if stack and not isinstance(stack, str):
+        raise ValueError('error.stack must be a string')
+
+
+class DiagnosticRecord:
+    """One diagnostic in compact form; to_dict() restores the nested dict exactly"""
+
+    __slots__ = WIRE_FIELDS + ('stack',)
+
+    @classmethod
+    def from_dict(cls, diagnostic, stack_table=stacks):
+        check_diagnostic(diagnostic)
+        record = cls.__new__(cls)
+        error = diagnostic.get('error') or {}
+        context = diagnostic.get('context') or {}
+        source = diagnostic.get('source') or {}
+        record.message = error.get('message')
+        record.error_type = intern_string(error.get('type'))
+        record.category = intern_string(error.get('category'))
+        stack = error.get('stack')
+        if stack:
+            record.stack_hash, record.stack = stack_table.put(stack)
+        else:
+            record.stack_hash, record.stack = None, stack
+        record.fingerprint = context.get('fingerprint')
+        record.container_name = intern_string(context.get('containerName'))
+        record.role_instance = intern_string(context.get('roleInstance'))
+        record.occurrence_count = context.get('occurrenceCount', 0)
+        record.first_occurrence = context.get('firstOccurrence')
+        record.last_occurrence = context.get('lastOccurrence')
+        record.pipeline = intern_mapping(diagnostic.get('pipeline'))
+        record.repository = intern_mapping(diagnostic.get('repository'))
+        record.source_file = intern_string(source.get('file'))
+        record.source_line = source.get('line')
+        # Context added by batch grouping or streaming ingestion (groupedErrors, window*)
+        record.context_extra = {key: value for key, value in context.items()
+                                if key not in CONTEXT_FIELDS} or None
+        record.extra = {key: value for key, value in diagnostic.items()
+                        if key not in DIAGNOSTIC_FIELDS} or None
+        return record
+
+    def to_dict(self):
+        context = {
+            'fingerprint': self.fingerprint,
+            'containerName': self.container_name,
+            'roleInstance': self.role_instance,
+            'occurrenceCount': self.occurrence_count,
+            'firstOccurrence': self.first_occurrence,
+            'lastOccurrence': self.last_occurrence
+        }
+        if self.context_extra:
+            context.update(self.context_extra)
+        diagnostic = {
+            'error': {
+                'message': self.message,
+                'type': self.error_type,
+                'stack': self.stack,
+                'category': self.category
+            },
+            'context': context,
+            'pipeline': dict(self.pipeline) if self.pipeline else {},
+            'repository': dict(self.repository) if self.repository else {},
+            'source': {
+                'file': self.source_file,
+                'line': self.source_line
+            }
+        }
+        if self.extra:
+            diagnostic.update(self.extra)
+        return diagnostic
+
+    def to_wire(self, stack_map):
+        """Positional list for the wire; adds this record's stack to stack_map"""
+        if self.stack_hash is not None:
+            stack_map.setdefault(self.stack_hash, self.stack)
+        values = [getattr(self, field) for field in WIRE_FIELDS]
+        for position in (WIRE_FIELDS.index('pipeline'), WIRE_FIELDS.index('repository')):
+            values[position] = dict(values[position]) if values[position] else None
+        return [WIRE_VERSION] + values
+
+    @classmethod
+    def from_wire(cls, values, stack_map, stack_table=stacks):
+        """Rebuild a record from to_wire() output and the stacks sent with it
+
+        Stack hashes resolve only against stack_map, never against stacks
+        other messages sent, so a client cannot read back a stack it did
+        not supply.
+        """
+        if not isinstance(values, (list, tuple)) or not values or values[0] != WIRE_VERSION:
+            raise ValueError('Unsupported diagnostic wire format')
+        if len(values) != len(WIRE_FIELDS) + 1:
+            raise ValueError('Malformed diagnostic record')
+        if not isinstance(stack_map, dict):
+            raise ValueError('stacks must be an object')
+        record = cls.__new__(cls)
+        for field, value in zip(WIRE_FIELDS, values[1:]):
+            setattr(record, field, value)
+        for field in ('pipeline', 'repository', 'context_extra', 'extra'):
+            if not isinstance(getattr(record, field) or {}, dict):
+                raise ValueError(f"Malformed diagnostic record: {field} must be an object")
+        for field in ('error_type', 'category', 'container_name', 'role_instance',
+                      'source_file'):
+            setattr(record, field, intern_string(getattr(record, field)))
+        record.pipeline = intern_mapping(record.pipeline)
+        record.repository = intern_mapping(record.repository)
+        record.stack = None
+        if record.stack_hash is not None:
+            stack = stack_map.get(record.stack_hash) if isinstance(record.stack_hash, str) else None
+            if not isinstance(stack, str):
+                raise ValueError(f"Stack {record.stack_hash} missing from message")
+            record.stack_hash, record.stack = stack_table.put(stack)
+        return record
+
+
+def pack_diagnostic(diagnostic, stack_map):
+    """Diagnostic dict -> wire list, collecting its stack into stack_map"""
+    return DiagnosticRecord.from_dict(diagnostic).to_wire(stack_map)
+
+
+def unpack_diagnostic(value, stack_map):
+    """Wire list (or an already nested dict) -> diagnostic dict"""
+    if isinstance(value, dict):
+        check_diagnostic(value)
+        return value
+    return DiagnosticRecord.from_wire(value, stack_map).to_dict()
@@ -0,0 +1,37 @@
+"""
+Service module loading
+Both services name their entry module app.py, so tools that need them in one
+process (benchmarks, offline replay) import each under a distinct module
+name with its own directory on sys.path while it loads.
+"""
+import importlib.util
+import os
+import sys
+
+# Tools start working as soon as a service is loaded, so warm it synchronously
+os.environ.setdefault('WARMUP_MODE', 'blocking')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_service(directory, module_name):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    path = os.path.join(ROOT, directory)
+    sys.path.insert(0, path)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(path, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(path)
+    return module
+
+
+def load_diagnostics():
+    return load_service('llm1-diagnostics', 'llm1_app')
+
+
+def load_solutions():
+    return load_service('llm2-solution', 'llm2_app')
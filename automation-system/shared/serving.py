@@ -0,0 +1,123 @@
+"""
+Serving helpers
+Startup warmup, readiness and graceful-shutdown hooks shared by the service
+app factories and gunicorn.conf.py
+"""
+import atexit
+import os
+import threading
+import time
+
+# background: serve immediately, report ready once warm; blocking: warm inside
+# the app factory; off: skip warmup, ready at once (dependencies load on first use)
+WARMUP_MODE = os.getenv('WARMUP_MODE', 'background').lower()
+
+_lock = threading.Lock()
+_warmed = {}
+_ready = {}
+_failed = {}
+_shutdown_hooks = []
+_shut_down = False
+
+
+def _run_steps(name, steps, timings):
+    for label, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Error during {name} warmup ({label}): {e}")
+            _failed[name][label] = str(e)
+            continue
+        timings[label] = round((time.perf_counter() - started) * 1000, 2)
+    _ready[name].set()
+
+
+def warmup(name, steps, mode=None):
+    """Run named warmup steps once per process and return their timings in ms
+
+    steps: iterable of (label, callable). A failing step is reported and
+    skipped so that a cold dependency never keeps a worker from starting,
+    but the worker is then not ready (see warmup_status).
+    In background mode the steps run on a daemon thread and the returned
+    dict fills in as they finish; is_ready(name) flips when they are done.
+    """
+    mode = mode or WARMUP_MODE
+    with _lock:
+        if name in _warmed:
+            return _warmed[name]
+        timings = _warmed[name] = {}
+        _ready[name] = threading.Event()
+        _failed[name] = {}
+        steps = list(steps) if mode != 'off' else []
+    if mode == 'background' and steps:
+        threading.Thread(target=_run_steps, args=(name, steps, timings),
+                         name=f"{name}-warmup", daemon=True).start()
+    else:
+        _run_steps(name, steps, timings)
+    return timings
+
+
+def warmup_status(name):
+    """'pending' (not started), 'warming', 'ready', or 'failed' when a step raised"""
+    ready = _ready.get(name)
+    if ready is None:
+        return 'pending'
+    if not ready.is_set():
+        return 'warming'
+    return 'failed' if _failed[name] else 'ready'
+
+
+def warmup_failures(name):
+    """{label: error} of the named warmup's failed steps"""
+    return dict(_failed.get(name, {}))
+
+
+def is_ready(name):
+    """Whether the named warmup has finished without a failed step"""
+    return warmup_status(name) == 'ready'
+
+
+def module_app(factory):
+    """A module __getattr__ that builds the module's "app" on first access
+
+    gunicorn's "app:create_app()" then builds only its own app, while
+    "from app import app" (ASGI wrapper, tests) still works.
+    """
+    built = []
+    lock = threading.Lock()
+
+    def __getattr__(name):
+        if name != 'app':
+            raise AttributeError(f"module has no attribute {name!r}")
+        with lock:
+            if not built:
+                built.append(factory())
+        return built[0]
+
+    return __getattr__
+
+
+def on_shutdown(callback):
+    """Register a callback to run once when the process stops serving"""
+    with _lock:
+        _shutdown_hooks.append(callback)
+    return callback
+
+
+def shutdown():
+    """Run shutdown callbacks in reverse registration order (idempotent)"""
+    global _shut_down
+    with _lock:
+        if _shut_down:
+            return
+        _shut_down = True
+        hooks = list(reversed(_shutdown_hooks))
+    for callback in hooks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error during shutdown: {e}")
+
+
+atexit.register(shutdown)
@@ -0,0 +1,122 @@
+"""
+Wire format negotiation
+JSON stays the default. Clients that send "Accept: application/msgpack"
+get MessagePack bodies with diagnostics in compact record form (see
+shared/records.py); request bodies are decoded according to Content-Type.
+Without the msgpack package installed, everything falls back to JSON.
+"""
+import json
+
+from flask import Response, jsonify, request
+
+from shared.lazy import lazy_import
+from shared.records import DiagnosticRecord, pack_diagnostic, unpack_diagnostic
+
+# MessagePack is negotiated only when available
+msgpack = lazy_import('msgpack')
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+
+class BodyError(ValueError):
+    """A request body that cannot be decoded; endpoints answer 400"""
+
+
+def wants_msgpack():
+    """True when the current request prefers MessagePack and it is available"""
+    if msgpack is None:
+        return False
+    accept = request.accept_mimetypes
+    best = accept.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+    return best in MSGPACK_MIMETYPES and accept[best] > accept[JSON_MIMETYPE]
+
+
+def read_body():
+    """Decoded request body (MessagePack or JSON), or None; BodyError if it is corrupt"""
+    if request.mimetype in MSGPACK_MIMETYPES:
+        if msgpack is None:
+            raise BodyError('MessagePack bodies are not supported (install msgpack)')
+        try:
+            return msgpack.unpackb(request.get_data(), raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise BodyError(f"Invalid MessagePack body: {e}") from e
+    return request.get_json(silent=True)
+
+
+def encode(body):
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def respond(body, status=200, binary=None):
+    """Response in the negotiated format; binary overrides negotiation"""
+    if binary is None:
+        binary = wants_msgpack()
+    if binary:
+        return Response(encode(body), status=status, mimetype=MSGPACK_MIMETYPE)
+    response = jsonify(body)
+    response.status_code = status
+    return response
+
+
+def stream_mimetype(binary):
+    """Streams are concatenated MessagePack objects, or NDJSON"""
+    return MSGPACK_MIMETYPE if binary else 'application/x-ndjson'
+
+
+def stream_item(body, binary):
+    return encode(body) if binary else json.dumps(body) + '\n'
+
+
+class DiagnosticPacker:
+    """Packs diagnostics for one message or stream, sending each stack once
+
+    pack() returns the wire list and the stacks not yet sent, so stream
+    items only carry stacks the client has not seen.
+    """
+
+    def __init__(self):
+        self._sent = set()
+
+    def pack(self, diagnostic):
+        stack_map = {}
+        packed = pack_diagnostic(diagnostic, stack_map)
+        new_stacks = {key: stack for key, stack in stack_map.items() if key not in self._sent}
+        self._sent.update(new_stacks)
+        return packed, new_stacks
+
+
+def diagnostic_fields(diagnostic, binary, packer=None):
+    """Response fields for a diagnostic: nested for JSON, compact plus stacks for MessagePack"""
+    if not binary:
+        return {'diagnostic': diagnostic}
+    packed, new_stacks = (packer or DiagnosticPacker()).pack(diagnostic)
+    return {'diagnostic': packed, 'stacks': new_stacks}
+
+
+def check_body(body):
+    if not isinstance(body, dict):
+        raise ValueError('request body must be an object')
+
+
+def body_diagnostic(body):
+    """The diagnostic in a decoded request body as a nested dict, or None
+
+    JSON clients send the dict itself; MessagePack clients send a wire list
+    whose stack is in body['stacks']. ValueError if the body or record is malformed.
+    """
+    check_body(body)
+    value = body.get('diagnostic')
+    return unpack_diagnostic(value, body.get('stacks') or {}) if value else None
+
+
+def body_records(body):
+    """body['diagnostics'] (dicts or wire lists) as compact DiagnosticRecords"""
+    check_body(body)
+    stack_map = body.get('stacks') or {}
+    return [
+        DiagnosticRecord.from_dict(item) if isinstance(item, dict)
+        else DiagnosticRecord.from_wire(item, stack_map)
+        for item in body.get('diagnostics') or []
+    ]
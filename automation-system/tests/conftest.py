@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Modules are imported directly; only app.py is shared between the two service directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('llm2-solution', 'llm1-diagnostics', ''):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+MOCK_CODEBASE = os.path.join(os.path.dirname(ROOT), 'mock-codebase')
+
+
+def read_mock(path):
+    with open(os.path.join(MOCK_CODEBASE, path), encoding='utf-8') as f:
+        return f.read()
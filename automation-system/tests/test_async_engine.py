@@ -0,0 +1,95 @@
+"""
+Async diagnostics: late lookups hold only the dedicated lookup pool, and
+a saturated pool sheds new lookups instead of queueing them
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from async_engine import AsyncDiagnosticsEngine
+
+
+class SlowEngine:
+    """DiagnosticsEngine stand-in whose pipeline lookup blocks until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def context_keys(self, error_data):
+        return 'role', 'service', 'stack'
+
+    def fetch_pipeline_info(self, role_instance):
+        self.release.wait(5)
+        return {'pipelineId': 'p'}
+
+    def fetch_repository_info(self, service_name):
+        return {'repository': 'r'}
+
+    def extract_source_location(self, stack_trace):
+        return 'src/a.js', '3'
+
+    def build_diagnostic(self, error_data, pipeline, repository, source):
+        return {'pipeline': pipeline, 'repository': repository, 'source': source}
+
+
+@pytest.fixture
+def slow():
+    engine = SlowEngine()
+    yield engine
+    engine.release.set()
+
+
+def test_late_lookup_is_reported_and_keeps_only_its_pool_thread(slow):
+    engine = AsyncDiagnosticsEngine(slow, deadline=0.05, threads=2, backlog=8)
+
+    async def run():
+        diagnostic, late = await engine.analyze_error_context({'error': {}})
+        # The default executor is untouched by the stuck lookup
+        assert await asyncio.wait_for(asyncio.to_thread(lambda: 'free'), 1) == 'free'
+        return diagnostic, late
+
+    diagnostic, late = asyncio.run(run())
+    assert late == ['pipeline']
+    assert diagnostic['repository'] == {'repository': 'r'}
+    assert engine.stats()['pending'] == 1
+    slow.release.set()
+    engine.executor.shutdown(wait=True)
+    assert engine.stats()['pending'] == 0
+
+
+def test_full_backlog_sheds_lookups(slow):
+    engine = AsyncDiagnosticsEngine(slow, deadline=0.05, threads=1, backlog=1)
+
+    async def run():
+        first = await engine.analyze_error_context({'error': {}})
+        second = await engine.analyze_error_context({'error': {}})
+        return first, second
+
+    (_, first_late), (_, second_late) = asyncio.run(run())
+    assert first_late == ['pipeline', 'repository', 'source']
+    assert second_late == ['pipeline', 'repository', 'source']
+    assert engine.stats()['shed'] >= 3
+
+
+async def call_asgi(app, body):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({'type': 'http', 'path': '/diagnose', 'method': 'POST'}, receive, send)
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+@pytest.mark.parametrize('body', [b'{not json', b'[1, 2]', b'{"deadlineMs": "soon"}'])
+def test_asgi_invalid_body_is_a_400(body):
+    import asgi
+    status, payload = asyncio.run(call_asgi(asgi.app, body))
+    assert status == 400
+    assert payload['message'].startswith('Invalid request body')
@@ -0,0 +1,150 @@
+"""
+TTL cache: expiry, LRU eviction, stampede collapsing and the SQLite tier
+"""
+import threading
+import types
+
+import pytest
+
+from shared import cache
+from shared.cache import SQLiteBackend, TTLCache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    ttl_cache = TTLCache('t', ttl=10)
+    ttl_cache.set(('a',), 1)
+    ttl_cache.set(('b',), 2, ttl=30)
+    clock.now += 9.9
+    assert ttl_cache.get(('a',)) == 1
+    clock.now += 0.1
+    assert ttl_cache.get(('a',)) is None
+    assert ttl_cache.get(('b',)) == 2
+    assert ttl_cache.stats()['entries'] == 1
+
+
+def test_lru_eviction_keeps_recently_used(clock):
+    ttl_cache = TTLCache('t', max_entries=2, ttl=60)
+    ttl_cache.set(('a',), 1)
+    ttl_cache.set(('b',), 2)
+    ttl_cache.get(('a',))
+    ttl_cache.set(('c',), 3)
+    assert ttl_cache.get(('b',)) is None
+    assert (ttl_cache.get(('a',)), ttl_cache.get(('c',))) == (1, 3)
+    assert ttl_cache.stats()['evictions'] == 1
+
+
+def test_falsy_results_are_not_cached(clock):
+    ttl_cache = TTLCache('t', ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return None if len(calls) == 1 else {'ok': True}
+
+    assert ttl_cache.get_or_load(('k',), loader) is None
+    assert ttl_cache.get_or_load(('k',), loader) == {'ok': True}
+    assert ttl_cache.get_or_load(('k',), loader) == {'ok': True}
+    assert len(calls) == 2
+
+
+def run_concurrently(ttl_cache, loader, callers=8):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(slot):
+        try:
+            results[slot] = ttl_cache.get_or_load(('k',), loader)
+        except Exception as e:
+            errors[slot] = e
+
+    threads = [threading.Thread(target=call, args=(slot,)) for slot in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(ttl_cache, count):
+    for _ in range(500):
+        if ttl_cache.stats()['collapsedLoads'] == count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('callers did not collapse onto the in-flight load')
+
+
+def test_concurrent_misses_share_one_load():
+    ttl_cache = TTLCache('t', ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    threads, results, errors = run_concurrently(ttl_cache, loader)
+    wait_for_waiters(ttl_cache, 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == ['value'] * 8
+    assert errors == [None] * 8
+    assert ttl_cache.get(('k',)) == 'value'
+
+
+def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    ttl_cache = TTLCache('t', ttl=60)
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    threads, results, errors = run_concurrently(ttl_cache, loader, callers=4)
+    wait_for_waiters(ttl_cache, 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert ttl_cache.get_or_load(('k',), lambda: 'recovered') == 'recovered'
+
+
+def test_sqlite_tier_survives_restart_and_honours_expiry(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    first = TTLCache('repos', ttl=10, backend=SQLiteBackend(path))
+    first.set(('svc', 'a'), {'repo': 'a'})
+    first.set(('svc', 'b'), {'repo': 'b'})
+    first.set(('other',), {'repo': 'c'})
+
+    second = TTLCache('repos', ttl=10, backend=SQLiteBackend(path))
+    assert second.get(('svc', 'a')) == {'repo': 'a'}
+    assert second.stats()['diskHits'] == 1
+    assert second.invalidate_prefix(('svc',)) == 1
+    assert SQLiteBackend(path).get('repos', second._key(('svc', 'b'))) is None
+    clock.now += 10
+    assert TTLCache('repos', ttl=10, backend=SQLiteBackend(path)).get(('other',)) is None
+
+
+def test_miss_racing_a_finished_load_reuses_its_value(monkeypatch):
+    ttl_cache = TTLCache('t', ttl=60)
+    # The owner stored the value and left between this caller's miss and its lock
+    ttl_cache.set(('k',), 'value')
+    monkeypatch.setattr(ttl_cache, 'get', lambda key: None)
+    calls = []
+    assert ttl_cache.get_or_load(('k',), lambda: calls.append(1) or 'again') == 'value'
+    assert calls == []
@@ -0,0 +1,43 @@
+"""
+Rule-table categorization: every term occurring in the text is found,
+including terms that partially overlap
+"""
+import random
+
+import pytest
+
+from categorizer import ErrorCategorizer, Rule, TermMatcher
+
+
+@pytest.mark.parametrize('terms, text, expected', [
+    (['out of memory', 'memory leak'], 'out of memory leak', {'out of memory', 'memory leak'}),
+    (['abc', 'bcd', 'cde'], 'abcde', {'abc', 'bcd', 'cde'}),
+    (['null', 'undefined is not', 'null pointer'], 'null pointer', {'null', 'null pointer'}),
+    (['timeout'], 'no match here', set()),
+])
+def test_find_reports_overlapping_terms(terms, text, expected):
+    assert TermMatcher(terms).find(text) == expected
+
+
+def test_find_matches_a_substring_scan_on_random_terms():
+    rng = random.Random(11)
+    for _ in range(200):
+        terms = {''.join(rng.choice('ab ') for _ in range(rng.randint(1, 4))) for _ in range(6)}
+        matcher = TermMatcher(terms)
+        for _ in range(10):
+            text = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 12)))
+            assert matcher.find(text) == {term for term in terms if term in text}, (terms, text)
+
+
+def test_state_round_trip_keeps_overlap_matching():
+    matcher = TermMatcher.from_state(TermMatcher(['out of memory', 'memory leak']).to_state())
+    assert matcher.find('out of memory leak') == {'out of memory', 'memory leak'}
+
+
+def test_rule_needing_overlapping_terms_matches():
+    categorizer = ErrorCategorizer([
+        Rule('MEMORY_LEAK', all_terms=['out of memory', 'memory leak']),
+        Rule('OOM', any_terms=['out of memory'])
+    ])
+    assert categorizer.categorize('Error', 'Out of memory leak in worker 12') == 'MEMORY_LEAK'
+    assert categorizer.categorize('Error', 'out of memory') == 'OOM'
@@ -0,0 +1,96 @@
+"""
+LLM1 /diagnose/batch request validation
+"""
+import json
+
+import pytest
+
+from shared.services import load_diagnostics
+
+
+@pytest.fixture(scope='module')
+def client():
+    return load_diagnostics().app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'transactionIds': 'txn-1'},
+    {'scopeIds': 'scope-1'},
+    {'scopeIds': [{'id': 'scope-1'}]},
+    {'scopeId': ['scope-1']},
+    {'transactionIds': [True]},
+    ['txn-1']
+])
+def test_malformed_ids_are_rejected_with_json(client, body):
+    response = client.post('/diagnose/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {
+        'success': False,
+        'message': 'transactionIds and scopeIds must be lists of ids'
+    }
+
+
+def test_missing_ids_are_rejected(client):
+    response = client.post('/diagnose/batch', json={})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'transactionIds or scopeIds required'
+
+
+def scope_error(record_id, message, count=1, last='2024-03-10T12:00:00Z'):
+    return {'id': record_id, 'scopeId': 'scope', 'occurrenceCount': count,
+            'lastOccurrence': last, 'roleInstance': f'role-{record_id}',
+            'error': {'type': 'TypeError', 'message': message, 'stack': ''}}
+
+
+@pytest.fixture
+def scopes(monkeypatch):
+    """Scope fetches served from a dict, recording the order of calls"""
+    llm1 = load_diagnostics()
+    fetched = []
+    data = {
+        # One full analysis chunk of distinct errors
+        'scope-1': [scope_error('a1', 'x is undefined')] + [
+            scope_error(f'b{n}', f'{"y" * (n + 1)} is null') for n in range(63)],
+        'scope-2': [scope_error('a2', 'x is undefined', count=4, last='2024-03-11T00:00:00Z')],
+    }
+
+    def fetch_scope_errors(self, scope_id, time_range):
+        fetched.append(scope_id)
+        return data[scope_id]
+
+    def analyze_error_context(self, error_data, lookups=None, category=None):
+        return self.build_diagnostic(error_data, {}, {}, (None, None), category)
+
+    monkeypatch.setattr(llm1.DiagnosticsEngine, 'fetch_scope_errors', fetch_scope_errors)
+    monkeypatch.setattr(llm1.DiagnosticsEngine, 'analyze_error_context', analyze_error_context)
+    return fetched
+
+
+def test_dedup_streams_groups_and_reports_growth_at_the_end(client, scopes):
+    response = client.post('/diagnose/batch', json={'scopeIds': ['scope-1', 'scope-2']},
+                           buffered=False)
+    lines = []
+    for chunk in response.response:
+        lines.append(json.loads(chunk))
+        if len(lines) == 1:
+            # Sent before the second scope was fetched
+            assert scopes == ['scope-1']
+    diagnostics = [line['diagnostic'] for line in lines if 'diagnostic' in line]
+    assert len(diagnostics) == 64
+    assert diagnostics[0]['error']['message'] == 'x is undefined'
+    assert diagnostics[0]['context']['groupedErrors'] == 1
+
+    update = next(line['groupUpdate'] for line in lines if 'groupUpdate' in line)
+    assert update['fingerprint'] == diagnostics[0]['context']['fingerprint']
+    assert update['occurrenceCount'] == 5
+    assert update['groupedErrors'] == 2
+    assert update['lastOccurrence'] == '2024-03-11T00:00:00Z'
+    assert update['roleInstances'] == ['role-a1', 'role-a2']
+    assert lines[-1]['summary'] == {'errors': 65, 'diagnosed': 64, 'groupUpdates': 1, 'notFound': 0}
+
+
+def test_without_dedup_every_error_is_diagnosed(client, scopes):
+    response = client.post('/diagnose/batch', json={'scopeIds': ['scope-1', 'scope-2'],
+                                                    'deduplicate': False})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1]['summary'] == {'errors': 65, 'diagnosed': 65, 'groupUpdates': 0, 'notFound': 0}
@@ -0,0 +1,115 @@
+"""
+Historical error index: day partitioning, occurrence deltas, retention
+and tail-only syncing
+"""
+import pytest
+
+from error_index import DAY, ErrorIndex, partition_name
+
+# 2024-03-10T12:00:00Z
+NOON = 1710072000.0
+
+
+def error(record_id, ts, count=1, scope='scope-1', error_type='TypeError'):
+    return {'id': record_id, 'scopeId': scope, 'lastOccurrence': ts, 'occurrenceCount': count,
+            'error': {'type': error_type, 'message': f'boom {record_id}'}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ErrorIndex(str(tmp_path / 'errors.db'), retention_days=3)
+
+
+def test_partition_name_is_utc_day():
+    assert partition_name(NOON) == 'errors_20240310'
+    assert partition_name(NOON + 12 * 3600 - 1) == 'errors_20240310'
+    assert partition_name(NOON + 12 * 3600) == 'errors_20240311'
+
+
+def test_records_land_in_their_day_partition(index):
+    written = index.record([error('a', NOON - DAY), error('b', NOON), error('c', NOON + 60)],
+                           now=NOON + 60)
+    assert written == 3
+    assert index.partitions() == ['errors_20240309', 'errors_20240310']
+    assert [e['id'] for e in index.scope_errors('scope-1', NOON - 2 * DAY, NOON + DAY)] == ['c', 'b', 'a']
+    assert [e['id'] for e in index.scope_errors('scope-1', NOON - 60, NOON + DAY)] == ['c', 'b']
+
+
+def test_repeated_snapshots_store_deltas(index):
+    index.record([error('a', NOON, count=5)], now=NOON)
+    # Unchanged snapshot adds nothing
+    assert index.record([error('a', NOON, count=5)], now=NOON) == 0
+    index.record([error('a', NOON + 60, count=8)], now=NOON + 60)
+    # A lower total means the upstream record was reset
+    index.record([error('a', NOON + 120, count=2)], now=NOON + 120)
+    summary = index.occurrences(NOON - 1, NOON + DAY)
+    assert summary['occurrences'] == 5 + 3 + 2
+    assert summary['records'] == 1
+
+
+def test_new_partition_drops_expired_ones(index):
+    index.record([error('old', NOON - 5 * DAY)], now=NOON - 5 * DAY)
+    index.record([error('kept', NOON - 2 * DAY)], now=NOON - 2 * DAY)
+    assert index.partitions() == ['errors_20240305', 'errors_20240308']
+    # The first write into a new day applies retention_days=3
+    index.record([error('new', NOON)], now=NOON)
+    assert index.partitions() == ['errors_20240308', 'errors_20240310']
+    # Nothing left to drop
+    assert index.drop_expired(now=NOON) == 0
+    assert index.drop_expired(now=NOON + 10 * DAY) == 2
+
+
+def test_query_scope_fetches_only_the_tail(index):
+    fetched = []
+
+    def fetch(time_range):
+        fetched.append(time_range)
+        return [error(f'e{len(fetched)}', NOON + 60 * len(fetched))]
+
+    index.query_scope('scope-1', '24h', fetch, now=NOON)
+    index.query_scope('scope-1', '24h', fetch, now=NOON + 2)
+    errors = index.query_scope('scope-1', '24h', fetch, now=NOON + 600)
+    # Full range once, then nothing within min_tail, then the 600s tail plus overlap
+    assert fetched == ['24h', '601s']
+    stats = index.stats()
+    assert (stats['fullFetches'], stats['localQueries'], stats['tailFetches']) == (1, 1, 1)
+    assert [e['id'] for e in errors] == ['e2', 'e1']
+
+
+def test_unreachable_upstream_keeps_coverage(index):
+    index.query_scope('scope-1', '24h', lambda _: [error('a', NOON)], now=NOON)
+    before = index.coverage('scope-1')
+    errors = index.query_scope('scope-1', '24h', lambda _: None, now=NOON + 600)
+    assert index.coverage('scope-1') == before
+    assert index.upstream_failures == 1
+    assert [e['id'] for e in errors] == ['a']
+
+
+@pytest.mark.parametrize('count, expected', [(' 12 ', 12), ('n/a', 1), (None, 1), ({}, 1), (-3, 1), (7, 7)])
+def test_odd_occurrence_counts_are_coerced(index, count, expected):
+    assert index.record([error('a', NOON, count=count)], now=NOON) == 1
+    assert index.occurrences(NOON - 1, NOON + 1)['occurrences'] == expected
+
+
+def test_retention_trims_coverage(index):
+    kept_from = (NOON - 3 * DAY) // DAY * DAY
+    fetched = []
+
+    def fetch(time_range):
+        fetched.append(time_range)
+        return []
+
+    # Coverage never claims days past retention
+    index.query_scope('scope-1', '7d', fetch, now=NOON)
+    assert index.coverage('scope-1') == (kept_from, NOON)
+    index.query_scope('scope-1', '7d', fetch, now=NOON + 1)
+    assert fetched == ['7d']
+
+    index.query_scope('scope-2', '24h', fetch, now=NOON - 5 * DAY)
+    index.query_scope('scope-3', '24h', fetch, now=NOON - DAY)
+    index._set_coverage('scope-4', NOON - 10 * DAY, NOON)
+    index.drop_expired(now=NOON)
+    # Coverage that ended before the retained days is gone; older starts are trimmed
+    assert index.coverage('scope-2') is None
+    assert index.coverage('scope-3') == (NOON - 2 * DAY, NOON - DAY)
+    assert index.coverage('scope-4') == (kept_from, NOON)
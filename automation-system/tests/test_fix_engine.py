@@ -0,0 +1,136 @@
+"""
+AST fix engine: whole-file fixes against mock-codebase files, and transforms
+that must not touch code away from the faulting line
+"""
+import difflib
+
+import pytest
+
+from conftest import read_mock
+from fix_engine import FixEngine
+
+PAYMENTS = 'src/api/payments.js'
+RADIUS = 20
+
+
+def changed_lines(original, fixed):
+    diff = difflib.unified_diff(original.split('\n'), fixed.split('\n'), lineterm='', n=0)
+    return [line for line in diff if line[:1] in '+-' and line[:3] not in ('---', '+++')]
+
+
+@pytest.fixture
+def engine():
+    return FixEngine()
+
+
+@pytest.fixture
+def payments():
+    return read_mock(PAYMENTS)
+
+
+def fix_payments(engine, payments, category, line, message='', key=None):
+    return engine.fix_file(category, PAYMENTS, key or f"{category}:{line}", lambda: payments,
+                           line, message, RADIUS)
+
+
+@pytest.mark.parametrize('line', [20, 45])
+def test_window_does_not_parse_but_file_does(engine, payments, line):
+    lines = payments.split('\n')
+    window = '\n'.join(lines[max(line - RADIUS, 1) - 1:line + RADIUS])
+    assert engine.fix('MATH_ERROR', window, PAYMENTS, line, '', max(line - RADIUS, 1)) is None
+    assert fix_payments(engine, payments, 'MATH_ERROR', 39) is not None
+
+
+def test_math_error_guards_the_faulting_division(engine, payments):
+    first_line, original, fixed = fix_payments(engine, payments, 'MATH_ERROR', 39)
+    assert original == '\n'.join(payments.split('\n')[first_line - 1:first_line - 1 + RADIUS * 2 + 1])
+    assert changed_lines(original, fixed) == [
+        '-    const averageAmount = totalAmount / transactions.length; // Division by zero if empty',
+        '+    const averageAmount = (transactions.length !== 0 ? totalAmount / transactions.length : 0);'
+        ' // Division by zero if empty'
+    ]
+
+
+def test_math_error_without_division_at_line_is_not_applied(engine, payments):
+    # Line 61 subtracts; the division at line 39 is in another handler
+    assert fix_payments(engine, payments, 'MATH_ERROR', 61) is None
+
+
+@pytest.mark.parametrize('line', [13, 16, 22])
+def test_unhandled_promise_catches_the_faulting_chain(engine, payments, line):
+    _, original, fixed = fix_payments(engine, payments, 'UNHANDLED_PROMISE', line)
+    assert changed_lines(original, fixed) == ['-      });', '+      })', '+      .catch(next);']
+
+
+def test_unhandled_promise_away_from_chains_is_not_applied(engine, payments):
+    assert fix_payments(engine, payments, 'UNHANDLED_PROMISE', 39) is None
+
+
+def test_unrelated_function_is_untouched(engine):
+    code = ('function average(a) {\n'
+            '  return a.sum;\n'
+            '}\n'
+            'function other(c) {\n'
+            '  fetchIt().then(x => x);\n'
+            '  return c.total / c.n;\n'
+            '}\n')
+    assert engine.fix('MATH_ERROR', code, 'stats.js', 2, '') is None
+    assert engine.fix('UNHANDLED_PROMISE', code, 'stats.js', 2, '') is None
+    assert '(c.n !== 0 ? c.total / c.n : 0)' in engine.fix('MATH_ERROR', code, 'stats.js', 6, '')
+
+
+def test_null_reference_guard(engine):
+    code = read_mock('src/api/users.js')
+    first_line, original, fixed = engine.fix_file(
+        'NULL_REFERENCE', 'src/api/users.js', 'users', lambda: code, 14,
+        "Cannot read property 'id' of undefined", RADIUS)
+    assert first_line == 1
+    assert changed_lines(original, fixed) == [
+        '+    if (!user) {',
+        "+      return res.status(404).json({ error: 'user not found' });",
+        '+    }',
+        '+'
+    ]
+
+
+def test_file_is_parsed_once_per_key(engine, payments):
+    reads = []
+
+    def read():
+        reads.append(True)
+        return payments
+
+    for line in (39, 16, 39):
+        engine.fix_file('MATH_ERROR', PAYMENTS, 'payments-once', read, line, '', RADIUS)
+    assert len(reads) == 1
+
+
+def test_python_math_error(engine):
+    code = 'def mean(items):\n    total = sum(items)\n    return total / len(items)\n'
+    assert engine.fix('MATH_ERROR', code, 'stats.py', 3, '') == (
+        'def mean(items):\n    total = sum(items)\n'
+        '    return (total / len(items) if len(items) else 0)\n')
+
+
+@pytest.mark.parametrize('divisor', ['next()', 'counts[i++]', 'await total()'])
+def test_javascript_math_error_skips_divisors_with_side_effects(engine, divisor):
+    code = f'async function f(counts, i) {{\n  return counts.sum / {divisor};\n}}\n'
+    assert engine.fix('MATH_ERROR', code, 'stats.js', 2, '') is None
+
+
+def test_javascript_math_error_guards_property_reads(engine):
+    code = 'function f(c, k) {\n  return c.total / c.by[k];\n}\n'
+    assert '(c.by[k] !== 0 ? c.total / c.by[k] : 0)' in engine.fix('MATH_ERROR', code, 'stats.js', 2, '')
+
+
+def test_python_math_error_skips_divisors_with_side_effects(engine):
+    code = 'def mean(items):\n    return sum(items) / next(counter)\n'
+    assert engine.fix('MATH_ERROR', code, 'stats.py', 2, '') is None
+
+
+def test_python_edits_land_on_ast_lines_past_form_feeds(engine):
+    # str.splitlines() would count the \x0c and \u2028 as line breaks
+    code = 'x = 1  # \x0c page\ns = "\u2028"\n\ndef mean(items):\n    return sum(items) / len(items)\n'
+    fixed = engine.fix('MATH_ERROR', code, 'stats.py', 5, '')
+    assert fixed == code.replace('sum(items) / len(items)',
+                                 '(sum(items) / len(items) if len(items) else 0)')
@@ -0,0 +1,91 @@
+"""
+Upstream pool: retry backoff, per-host settings and circuit-breaker probes
+"""
+import pytest
+import requests
+
+import http_pool
+from http_pool import CircuitBreaker, CircuitOpenError, UpstreamHost, UpstreamPool
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class Session:
+    """Replays a script of responses and exceptions"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    def request(self, method, url, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_pool.time, 'sleep', sleeps.append)
+    # Always the upper bound of the jitter range
+    monkeypatch.setattr(http_pool.random, 'uniform', lambda low, high: high)
+    return sleeps
+
+
+def host_with(session, **kwargs):
+    host = UpstreamHost('test', 'http://upstream', **kwargs)
+    host._session = session
+    return host
+
+
+def test_backoff_starts_at_base_and_doubles_up_to_max(sleeps):
+    host = host_with(Session(503, 503, 503, 503, 200), max_retries=4,
+                     backoff_base=0.2, backoff_max=1.0)
+    assert host.get('/x').status_code == 200
+    assert sleeps == [0.2, 0.4, 0.8, 1.0]
+
+
+def test_backoff_max_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('HTTP_BACKOFF_MAX', '5.0')
+    monkeypatch.setenv('NEWRELIC_BACKOFF_MAX', '0.5')
+    pool = UpstreamPool({'newrelic': 'http://nr', 'gitlab': 'http://gl'})
+    assert pool['newrelic'].backoff_max == 0.5
+    assert pool['gitlab'].backoff_max == 5.0
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_unexpected_probe_error_reopens_the_breaker(sleeps):
+    breaker = open_breaker()
+    host = host_with(Session(RuntimeError('adapter broke'), 200), breaker=breaker)
+    with pytest.raises(RuntimeError):
+        host.get('/x')
+    # The failed probe reopened the breaker instead of leaving it half-open
+    assert breaker.state == CircuitBreaker.OPEN
+    assert host.get('/x').status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_rejects_calls_while_the_probe_is_out():
+    breaker = open_breaker()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    host = host_with(Session(200), breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        host.get('/x')
+
+
+def test_connection_errors_are_retried_then_raised(sleeps):
+    host = host_with(Session(requests.ConnectionError(), requests.ConnectionError()),
+                     max_retries=1, backoff_base=0.1)
+    with pytest.raises(requests.ConnectionError):
+        host.get('/x')
+    assert sleeps == [0.1]
+    assert host.failures == 1
@@ -0,0 +1,73 @@
+"""
+Streaming ingestion: file tailing and per-fingerprint windowing
+"""
+import json
+
+from ingest import TICK, IngestStats, WindowedCounter, tail_file, window_events
+
+
+def test_no_follow_yields_a_final_line_without_newline(tmp_path):
+    path = tmp_path / 'errors.ndjson'
+    path.write_bytes(b'{"a": 1}\n{"b": 2}')
+    lines = list(tail_file(str(path), follow=False, from_start=True))
+    assert [json.loads(line) for line in lines] == [{'a': 1}, {'b': 2}]
+
+
+def test_no_follow_on_newline_terminated_file(tmp_path):
+    path = tmp_path / 'errors.ndjson'
+    path.write_bytes(b'{"a": 1}\n')
+    assert list(tail_file(str(path), follow=False, from_start=True)) == ['{"a": 1}\n']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed(clock, items):
+    """(seconds, item) pairs -> items, advancing the clock before each"""
+    for at, item in items:
+        clock.now = at
+        yield item
+
+
+def event(fingerprint):
+    return fingerprint, {'error': {'type': 'TypeError', 'message': fingerprint}}
+
+
+def test_burst_that_stops_reports_its_final_count_at_eof():
+    clock = Clock()
+    stats = IngestStats()
+    counter = WindowedCounter(window=300, clock=clock)
+    items = [(0, event('a')), (1, event('a')), (2, event('a')), (3, event('b'))]
+    emitted = [(fingerprint, occurrences) for fingerprint, _, occurrences, _ in
+               window_events(timed(clock, items), counter, stats, emit_interval=30)]
+    assert emitted == [('a', 1), ('b', 1), ('a', 3)]
+    assert (stats.suppressed, stats.flushed) == (2, 1)
+
+
+def test_idle_ticks_flush_once_the_emit_interval_passes():
+    clock = Clock()
+    stats = IngestStats()
+    counter = WindowedCounter(window=300, clock=clock)
+    items = [(0, event('a')), (1, event('a')), (10, TICK), (31, TICK), (40, TICK)]
+    windowed = window_events(timed(clock, items), counter, stats, emit_interval=30)
+    assert next(windowed)[2] == 1
+    fingerprint, _, occurrences, events = next(windowed)
+    assert (fingerprint, occurrences, clock.now) == ('a', 2, 31)
+    # Nothing left to report at the end
+    assert list(windowed) == []
+
+
+def test_later_event_reports_suppressed_ones_without_a_flush():
+    clock = Clock()
+    stats = IngestStats()
+    counter = WindowedCounter(window=300, clock=clock)
+    items = [(0, event('a')), (1, event('a')), (40, event('a'))]
+    emitted = [occurrences for _, _, occurrences, _ in
+               window_events(timed(clock, items), counter, stats, emit_interval=30)]
+    assert emitted == [1, 3]
+    assert stats.flushed == 0
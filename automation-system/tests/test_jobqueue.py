@@ -0,0 +1,161 @@
+"""
+Durable job queue: leases, retries, dead-lettering, purge, and a consumer
+that survives queue write errors
+"""
+import threading
+import types
+
+import pytest
+
+from queue_worker import QueueConsumer
+from shared import jobqueue
+from shared.jobqueue import DEAD, DONE, LEASED, PENDING, JobQueue
+
+QUEUE = 'solutions'
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(jobqueue, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2, lease_seconds=60,
+                    backoff_base=2.0)
+
+
+def test_lease_ack(queue):
+    job_id = queue.enqueue(QUEUE, {'n': 1})
+    job = queue.lease(QUEUE, 'w1')
+    assert (job.id, job.payload, job.attempts, job.status) == (job_id, {'n': 1}, 1, LEASED)
+    assert queue.lease(QUEUE, 'w2') is None
+    assert queue.ack(job_id, 'w1', {'ok': True})
+    assert queue.get(job_id).status == DONE
+    assert queue.get(job_id).result == {'ok': True}
+
+
+def test_jobs_are_leased_oldest_first(queue, clock):
+    first = queue.enqueue(QUEUE, 1)
+    clock.now += 1
+    second = queue.enqueue(QUEUE, 2)
+    assert [queue.lease(QUEUE, 'w').id, queue.lease(QUEUE, 'w').id] == [first, second]
+
+
+def test_expired_lease_is_handed_out_again(queue, clock):
+    job_id = queue.enqueue(QUEUE, {})
+    queue.lease(QUEUE, 'crashed')
+    clock.now += 59
+    assert queue.lease(QUEUE, 'w2') is None
+    clock.now += 2
+    job = queue.lease(QUEUE, 'w2')
+    assert (job.id, job.attempts, job.lease_owner) == (job_id, 2, 'w2')
+    # The first worker lost its lease and cannot settle the job
+    assert not queue.ack(job_id, 'crashed')
+    assert queue.fail(job_id, 'crashed', 'late') is None
+    assert queue.ack(job_id, 'w2')
+
+
+def test_expired_lease_after_last_attempt_is_dead_lettered(queue, clock):
+    job_id = queue.enqueue(QUEUE, {})
+    for _ in range(2):
+        queue.lease(QUEUE, 'crashed')
+        clock.now += 61
+    assert queue.lease(QUEUE, 'w') is None
+    job = queue.get(job_id)
+    assert (job.status, job.last_error) == (DEAD, 'Lease expired')
+
+
+def test_failed_job_retries_with_backoff_then_dead_letters(queue, clock):
+    job_id = queue.enqueue(QUEUE, {})
+    queue.lease(QUEUE, 'w')
+    assert queue.fail(job_id, 'w', ValueError('boom')) == PENDING
+    assert queue.lease(QUEUE, 'w') is None
+    clock.now += 2
+    assert queue.lease(QUEUE, 'w').attempts == 2
+    assert queue.fail(job_id, 'w', 'boom again') == DEAD
+    job = queue.get(job_id)
+    assert (job.status, job.last_error) == (DEAD, 'boom again')
+    assert queue.counts(QUEUE) == {PENDING: 0, LEASED: 0, DONE: 0, DEAD: 1}
+
+
+def test_requeue_dead_resets_attempts(queue, clock):
+    job_id = queue.enqueue(QUEUE, {})
+    for _ in range(2):
+        queue.lease(QUEUE, 'w')
+        queue.fail(job_id, 'w', 'boom')
+        clock.now += 10
+    assert queue.requeue_dead(QUEUE) == 1
+    job = queue.lease(QUEUE, 'w')
+    assert (job.id, job.attempts) == (job_id, 1)
+
+
+def test_purge_done_keeps_recent_and_unfinished_jobs(queue, clock):
+    old = queue.enqueue(QUEUE, {})
+    queue.lease(QUEUE, 'w')
+    queue.ack(old, 'w')
+    clock.now += 100
+    recent = queue.enqueue(QUEUE, {})
+    queue.lease(QUEUE, 'w')
+    queue.ack(recent, 'w')
+    pending = queue.enqueue(QUEUE, {})
+    assert queue.purge_done(older_than=50) == 1
+    assert queue.get(old) is None
+    assert queue.get(recent).status == DONE
+    assert queue.get(pending).status == PENDING
+
+
+class FlakyQueue:
+    """Delegates to a JobQueue; ack raises the first time, like a locked database"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.ack_errors = 1
+        self.purges = []
+        self.acked = threading.Event()
+
+    def lease(self, *args):
+        return self.queue.lease(*args)
+
+    def ack(self, *args):
+        if self.ack_errors:
+            self.ack_errors -= 1
+            raise jobqueue.sqlite3.OperationalError('database is locked')
+        result = self.queue.ack(*args)
+        self.acked.set()
+        return result
+
+    def fail(self, *args):
+        return self.queue.fail(*args)
+
+    def purge_done(self, older_than):
+        self.purges.append(older_than)
+        return 0
+
+
+def test_consumer_survives_queue_write_errors(tmp_path):
+    flaky = FlakyQueue(JobQueue(str(tmp_path / 'jobs.db')))
+    flaky.queue.enqueue(QUEUE, {'n': 1})
+    flaky.queue.enqueue(QUEUE, {'n': 2})
+    consumer = QueueConsumer(flaky, QUEUE, lambda payload: payload['n'], workers=1,
+                             poll_interval=0.01, retention_days=2).start()
+    try:
+        assert flaky.acked.wait(5)
+    finally:
+        consumer.stop(5)
+    stats = consumer.stats()
+    assert (stats['processed'], stats['queueErrors']) == (2, 1)
+    assert flaky.queue.counts(QUEUE)[DONE] == 1
+    # The job whose ack failed stays leased until its lease expires
+    assert flaky.queue.counts(QUEUE)[LEASED] == 1
+    assert flaky.purges == [2 * 86400]
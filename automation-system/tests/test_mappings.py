@@ -0,0 +1,63 @@
+"""
+Service -> repository matching: the Aho-Corasick index must return the same
+earliest-registered substring match as a linear scan
+"""
+import json
+import random
+
+import pytest
+
+from mappings import MappingIndex, SubstringIndex
+
+
+def linear_first(names, text):
+    """Reference: value of the first (lowest rank) name contained in text"""
+    for name, rank, value in sorted(names, key=lambda entry: entry[1]):
+        if name in text:
+            return value
+    return None
+
+
+@pytest.mark.parametrize('names, text, expected', [
+    # The earlier-registered name wins even when a later one is longer
+    ([('pay', 0, 'pay-repo'), ('payments', 1, 'payments-repo')], 'payments-api', 'pay-repo'),
+    ([('payments', 0, 'payments-repo'), ('pay', 1, 'pay-repo')], 'payments-api', 'payments-repo'),
+    # A match that starts later in the text can still outrank an earlier one
+    ([('api', 1, 'api-repo'), ('gateway', 0, 'gateway-repo')], 'api-gateway', 'gateway-repo'),
+    # Reached only through a fail link while matching a longer name
+    ([('abcd', 1, 'long'), ('bc', 0, 'short')], 'xabcx', 'short'),
+    ([('abcd', 0, 'long'), ('bc', 1, 'short')], 'abcd', 'long'),
+    ([('aab', 0, 'aab')], 'aaab', 'aab'),
+    # Duplicate names keep the lower rank
+    ([('auth', 2, 'late'), ('auth', 0, 'early')], 'auth-service', 'early'),
+    ([('auth', 0, 'auth-repo')], 'billing', None),
+])
+def test_find_first(names, text, expected):
+    assert SubstringIndex(names).find_first(text) == expected
+    assert linear_first(names, text) == expected
+
+
+def test_matches_linear_scan_on_random_names():
+    rng = random.Random(7)
+    for _ in range(200):
+        names = [(''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))), rank, f'repo-{rank}')
+                 for rank in range(rng.randint(1, 12))]
+        index = SubstringIndex(names)
+        for _ in range(20):
+            text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 12)))
+            assert index.find_first(text) == linear_first(names, text), (names, text)
+
+
+def test_repository_for_prefers_exact_then_first_substring():
+    index = MappingIndex({}, [('orders', 'orders-repo'), ('Order', 'order-repo'),
+                              ('orders-api', 'orders-api-repo')])
+    assert index.repository_for('ORDERS-API') == 'orders-api-repo'
+    assert index.repository_for('legacy-orders-worker') == 'orders-repo'
+    assert index.repository_for('order-worker') == 'order-repo'
+    assert index.repository_for(None) is None
+
+
+def test_state_round_trip_keeps_ranking():
+    index = MappingIndex({}, [('pay', 'pay-repo'), ('payments', 'payments-repo')])
+    restored = MappingIndex.from_state(json.loads(json.dumps(index.to_state())))
+    assert restored.repository_for('payments-worker') == 'pay-repo'
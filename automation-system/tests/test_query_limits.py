@@ -0,0 +1,51 @@
+"""
+?limit= on listing endpoints: non-integers get a JSON 400, out-of-range values are clamped
+"""
+import pytest
+
+from shared.jobqueue import JobQueue
+from shared.services import load_solutions
+
+
+@pytest.fixture(scope='module')
+def llm2():
+    return load_solutions().app.test_client()
+
+
+@pytest.mark.parametrize('limit', ['abc', '1.5', ''])
+def test_alert_series_rejects_non_integer_limit(llm2, limit):
+    response = llm2.get('/alerts/series', query_string={'limit': limit})
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'message': 'limit must be an integer'}
+
+
+@pytest.mark.parametrize('limit, expected', [('-5', 0), ('0', 0), ('20', 20), ('100000', 500)])
+def test_alert_series_clamps_limit(llm2, monkeypatch, limit, expected):
+    engine = load_solutions().alert_engine
+    seen = []
+    monkeypatch.setattr(engine, 'top', lambda kind, limit: seen.append(limit) or [])
+    response = llm2.get('/alerts/series', query_string={'limit': limit})
+    assert response.status_code == 200
+    assert seen == [expected]
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(load_solutions(), 'job_queue', queue)
+    for n in range(3):
+        queue.enqueue('solutions', {'n': n})
+    return queue
+
+
+def test_list_jobs_rejects_non_integer_limit(llm2, jobs):
+    response = llm2.get('/jobs', query_string={'limit': 'abc'})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'limit must be an integer'
+
+
+@pytest.mark.parametrize('limit, expected', [('-1', 0), ('2', 2), ('9999', 3)])
+def test_list_jobs_clamps_limit(llm2, jobs, limit, expected):
+    response = llm2.get('/jobs', query_string={'limit': limit})
+    assert response.status_code == 200
+    assert len(response.get_json()['jobs']) == expected
@@ -0,0 +1,76 @@
+"""
+Replay input: streamed JSON arrays survive malformed elements without
+buffering the rest of the file
+"""
+import importlib.util
+import io
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+
+spec = importlib.util.spec_from_file_location('replay', os.path.join(ROOT, 'replay', 'replay.py'))
+replay = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(replay)
+
+
+def event(index):
+    return {'error': {'message': f"error {index} " + 'x' * 200, 'type': 'TypeError'}}
+
+
+def events_text(count, broken=()):
+    items = [json.dumps(event(index)) if index not in broken else '{"error": {"message": "bad", }}'
+             for index in range(count)]
+    return '[\n' + ',\n'.join(items) + '\n]\n'
+
+
+def read(text, stats=None):
+    stats = stats if stats is not None else {'malformed': 0}
+    return list(replay.read_events(io.StringIO(text), stats)), stats
+
+
+@pytest.fixture(autouse=True)
+def small_reads(monkeypatch):
+    monkeypatch.setattr(replay, 'READ_SIZE', 1024)
+
+
+def test_elements_split_across_reads():
+    events, stats = read(events_text(50))
+    assert events == [event(index) for index in range(50)]
+    assert stats['malformed'] == 0
+
+
+@pytest.mark.parametrize('wrap', [False, True])
+def test_malformed_element_is_counted_and_skipped(wrap):
+    text = events_text(50, broken={3, 49})
+    if wrap:
+        text = '{\n  "errors": ' + text + '}\n'
+    events, stats = read(text)
+    assert events == [event(index) for index in range(50) if index not in (3, 49)]
+    assert stats['malformed'] == 2
+
+
+def test_malformed_element_does_not_buffer_the_rest():
+    handle = io.StringIO(events_text(5000, broken={3}))
+    records = replay.read_records(handle)
+    for _ in range(3):
+        next(records)
+    assert next(records) is replay.MALFORMED
+    assert handle.tell() < 8 * replay.READ_SIZE
+
+
+def test_oversized_malformed_element_is_skipped_while_streaming(monkeypatch):
+    monkeypatch.setattr(replay, 'MAX_ELEMENT_SIZE', 4096)
+    # Larger than MAX_ELEMENT_SIZE: skipped chunk by chunk instead of buffered
+    huge = '{"error": {"message": "' + 'y' * 50000 + '",, "type": "X"}}'
+    text = '[' + json.dumps(event(0)) + ',' + huge + ',' + json.dumps(event(1)) + ']'
+    events, stats = read(text)
+    assert events == [event(0), event(1)]
+    assert stats['malformed'] == 1
+
+
+def test_truncated_array_raises():
+    with pytest.raises(ValueError):
+        read(events_text(20)[:-300])
@@ -0,0 +1,68 @@
+"""
+Serving helpers: warmup readiness and the lazily built module app
+"""
+import uuid
+
+import pytest
+
+from shared import serving
+
+
+def name():
+    return f"test-{uuid.uuid4().hex}"
+
+
+def test_blocking_warmup_is_ready():
+    service = name()
+    timings = serving.warmup(service, [('a', lambda: None)], mode='blocking')
+    assert list(timings) == ['a']
+    assert serving.warmup_status(service) == 'ready'
+    assert serving.is_ready(service)
+
+
+def test_failed_step_keeps_the_worker_unready():
+    service = name()
+
+    def broken():
+        raise RuntimeError('mirror unreachable')
+
+    timings = serving.warmup(service, [('a', lambda: None), ('mirror', broken)], mode='blocking')
+    assert list(timings) == ['a']
+    assert serving.warmup_status(service) == 'failed'
+    assert not serving.is_ready(service)
+    assert serving.warmup_failures(service) == {'mirror': 'mirror unreachable'}
+
+
+def test_warmup_runs_once_per_name():
+    service = name()
+    calls = []
+    serving.warmup(service, [('a', lambda: calls.append(1))], mode='blocking')
+    serving.warmup(service, [('a', lambda: calls.append(1))], mode='blocking')
+    assert calls == [1]
+
+
+def test_unknown_warmup_is_pending():
+    assert serving.warmup_status(name()) == 'pending'
+
+
+def test_background_warmup_becomes_ready():
+    service = name()
+    serving.warmup(service, [('a', lambda: None)], mode='background')
+    serving._ready[service].wait(5)
+    assert serving.is_ready(service)
+
+
+def test_off_is_ready_at_once():
+    service = name()
+    assert serving.warmup(service, [('a', lambda: 1 / 0)], mode='off') == {}
+    assert serving.is_ready(service)
+
+
+def test_module_app_is_built_once_on_first_access():
+    built = []
+    getattr_ = serving.module_app(lambda: built.append(object()) or built[-1])
+    assert built == []
+    assert getattr_('app') is getattr_('app')
+    assert len(built) == 1
+    with pytest.raises(AttributeError):
+        getattr_('other')
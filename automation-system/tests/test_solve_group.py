@@ -0,0 +1,54 @@
+"""
+Batch solving: each diagnostic is observed and decided exactly once
+"""
+import pytest
+
+from shared.records import DiagnosticRecord
+from shared.services import load_solutions
+
+
+@pytest.fixture(scope='module')
+def solutions():
+    return load_solutions()
+
+
+def diagnostic(index, category='NULL_REFERENCE'):
+    return {
+        'error': {'message': "Cannot read property 'id' of undefined", 'type': 'TypeError',
+                  'category': category},
+        'context': {'fingerprint': f"{index:016x}", 'containerName': 'api',
+                    'occurrenceCount': 1},
+        'source': {'file': 'src/api/users.js', 'line': 14}
+    }
+
+
+def test_each_diagnostic_is_observed_and_decided_once(solutions, monkeypatch):
+    observed, decided = [], []
+    observe = solutions.alert_engine.observe
+    analyze = solutions.CodeFixGenerator.analyze_error
+    monkeypatch.setattr(solutions.alert_engine, 'observe',
+                        lambda item: observed.append(item) or observe(item))
+    monkeypatch.setattr(solutions.CodeFixGenerator, 'analyze_error',
+                        lambda self, item: decided.append(item) or analyze(self, item))
+
+    group = [(index, DiagnosticRecord.from_dict(diagnostic(index))) for index in range(3)]
+    results = solutions.solve_group(group)
+
+    assert [result['success'] for result in results] == [True] * 3
+    assert len(observed) == len(decided) == 3
+    assert {result['solutionType'] for result in results} == {'CODE_FIX'}
+
+
+def test_solution_follows_the_single_decision(solutions, monkeypatch):
+    decisions = iter(['ALERT_SUGGESTION', 'CODE_FIX'])
+    monkeypatch.setattr(solutions.CodeFixGenerator, 'analyze_error',
+                        lambda self, item: next(decisions))
+    windows = []
+    get_code_window = solutions.CodeFixGenerator.get_code_window
+    monkeypatch.setattr(solutions.CodeFixGenerator, 'get_code_window',
+                        lambda self, *args: windows.append(args) or get_code_window(self, *args))
+
+    results = solutions.solve_group([(0, DiagnosticRecord.from_dict(diagnostic(100)))])
+
+    assert results[0]['solutionType'] == 'ALERT_SUGGESTION'
+    assert windows == []
@@ -0,0 +1,110 @@
+"""
+Corrupt or invalid request bodies get a JSON 400, never a bare 500
+"""
+import msgpack
+import pytest
+
+from shared.jobqueue import JobQueue
+from shared.records import WIRE_FIELDS, DiagnosticRecord
+from shared.services import load_diagnostics, load_solutions
+
+MSGPACK = 'application/msgpack'
+CORRUPT = b'\x85\xa3abc'  # a map header promising more than the body holds
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope='module')
+def llm1():
+    return load_diagnostics().app.test_client()
+
+
+@pytest.fixture(scope='module')
+def llm2(tmp_path_factory, monkeypatch_module):
+    solutions = load_solutions()
+    queue = JobQueue(str(tmp_path_factory.mktemp('jobs') / 'jobs.db'))
+    monkeypatch_module.setattr(solutions, 'job_queue', queue)
+    return solutions.app.test_client()
+
+
+@pytest.mark.parametrize('path', ['/diagnose', '/diagnose/batch'])
+def test_llm1_corrupt_msgpack(llm1, path):
+    response = llm1.post(path, data=CORRUPT, content_type=MSGPACK)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid MessagePack body')
+
+
+@pytest.mark.parametrize('path', ['/generate-solution', '/generate-solution/batch', '/jobs'])
+def test_llm2_corrupt_msgpack(llm2, path):
+    response = llm2.post(path, data=CORRUPT, content_type=MSGPACK)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid MessagePack body')
+
+
+def test_enqueue_rejects_bad_wire_records(llm2):
+    body = msgpack.packb({'diagnostics': [[99, 'wrong version']]})
+    response = llm2.post('/jobs', data=body, content_type=MSGPACK)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid diagnostic')
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'diagnostics', {'diagnostics': {}}])
+def test_batch_requires_a_diagnostics_list(llm2, body):
+    response = llm2.post('/generate-solution/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'message': 'diagnostics list required'}
+
+
+@pytest.mark.parametrize('item', [
+    {'error': 'x'},
+    {'context': ['a']},
+    {'pipeline': 'p'},
+    {'error': {'message': 'm', 'stack': 42}},
+])
+def test_batch_rejects_malformed_dict_diagnostics(llm2, item):
+    response = llm2.post('/generate-solution/batch', json={'diagnostics': [item]})
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid diagnostic')
+
+
+def wire_record(stack_hash=None):
+    values = [1] + [None] * len(WIRE_FIELDS)
+    values[1 + WIRE_FIELDS.index('stack_hash')] = stack_hash
+    return values
+
+
+@pytest.mark.parametrize('body', [
+    {'diagnostics': [wire_record('abc')], 'stacks': ['not', 'a', 'map']},
+    {'diagnostics': [wire_record('abc')], 'stacks': {'abc': 7}},
+])
+def test_batch_rejects_malformed_stacks(llm2, body):
+    response = llm2.post('/generate-solution/batch', data=msgpack.packb(body), content_type=MSGPACK)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid diagnostic')
+
+
+@pytest.mark.parametrize('body', [
+    {'diagnostic': 'str'},
+    {'diagnostic': [1, 'too short']},
+    {'diagnostic': {'error': 'x'}},
+    [1, 2],
+])
+def test_generate_solution_rejects_bad_diagnostics(llm2, body):
+    response = llm2.post('/generate-solution', data=msgpack.packb(body), content_type=MSGPACK)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Invalid diagnostic')
+
+
+def test_stack_hashes_resolve_only_from_the_same_message():
+    secret = 'Error: secret\n    at other-tenant.js:1'
+    stack_map = {}
+    DiagnosticRecord.from_dict({'error': {'message': 'm', 'stack': secret}}).to_wire(stack_map)
+    leaked_hash = next(iter(stack_map))
+    # The stack is in the process-wide table, but this message never sent it
+    with pytest.raises(ValueError, match='missing from message'):
+        DiagnosticRecord.from_wire(wire_record(leaked_hash), {})
+    assert DiagnosticRecord.from_wire(wire_record(leaked_hash), stack_map).stack == secret